@@ -0,0 +1,19 @@
+from . import cassettes, tracing
+from .tool_cache import tool_cache
+
+
+def agent_callbacks(github_token):
+    """Callback lists shared by every agent that talks to the GitHub MCP server.
+
+    Tracing comes first so every tool call and model turn gets a span, even when a
+    later callback short-circuits it. Cassette replay comes before the cache so
+    recorded responses bypass the live cache.
+    """
+    cache_before, cache_after, cache_error = tool_cache.callbacks(github_token)
+    return {
+        "before_tool_callback": [tracing.before_tool, cassettes.before_tool, cache_before],
+        "after_tool_callback": [tracing.after_tool, cache_after, cassettes.after_tool],
+        "on_tool_error_callback": [cache_error],
+        "before_model_callback": [tracing.before_model, cassettes.before_model],
+        "after_model_callback": [tracing.after_model, cassettes.after_model],
+    }
@@ -0,0 +1,184 @@
+import contextlib
+import contextvars
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from .run_context import get_run
+
+# off | record | replay
+AGENT_CASSETTE_MODE = os.getenv("AGENT_CASSETTE_MODE", "off").lower()
+AGENT_CASSETTE_DIR = os.getenv("AGENT_CASSETTE_DIR", "cassettes")
+# What replay does for a tool call that is not in the cassette: "error" keeps runs
+# deterministic, "live" falls through to the real MCP server.
+AGENT_CASSETTE_REPLAY_MISS = os.getenv("AGENT_CASSETTE_REPLAY_MISS", "error").lower()
+
+# Only prize-judging runs are recorded and replayed; chat and code review always run live.
+_judging = contextvars.ContextVar("cassette_judging", default=False)
+
+
+@contextlib.contextmanager
+def judging():
+    """Marks the agent runs started inside this block as judging runs."""
+    token = _judging.set(True)
+    try:
+        yield
+    finally:
+        _judging.reset(token)
+
+
+def cassette_path(agent_name, prompt, directory=None):
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory or AGENT_CASSETTE_DIR, f"{agent_name}-{digest}.jsonl.gz")
+
+
+def tool_key(tool_name, args):
+    return json.dumps({"tool": tool_name, "args": args or {}}, sort_keys=True, default=str)
+
+
+def _dump(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True, mode="json")
+    return value
+
+
+class Cassette:
+    """Tool calls and model turns of one agent run, stored as gzipped JSON lines.
+
+    The first line is a header with the prompt, timing and final result; every
+    following line is one "tool" or "model" entry in the order it happened.
+    """
+
+    def __init__(self, agent_name, prompt, header=None, entries=None):
+        self.agent_name = agent_name
+        self.prompt = prompt
+        self.header = header or {}
+        self.entries = entries or []
+        self._pending = {}
+        self._replay = {}
+        for entry in self.entries:
+            if entry["type"] == "tool":
+                self._replay.setdefault(entry["key"], []).append(entry["response"])
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            entries = [json.loads(line) for line in f if line.strip()]
+        return cls(header["agent"], header["prompt"], header, entries)
+
+    def save(self, result, duration, directory=None):
+        path = cassette_path(self.agent_name, self.prompt, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = {
+            "agent": self.agent_name,
+            "prompt": self.prompt,
+            "recorded_at": time.time(),
+            "duration_seconds": round(duration, 3),
+            "result": result,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header, default=str) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+        return path
+
+    def next_tool_response(self, tool_name, args):
+        responses = self._replay.get(tool_key(tool_name, args))
+        if not responses:
+            return None
+        # Repeated identical calls are served in recorded order; the last one repeats.
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def start_tool(self, call_id, args):
+        # The arguments as the model sent them; the tool cache later pins their ref to a SHA,
+        # and replay looks calls up by what the model asks for.
+        self._pending[call_id] = (time.perf_counter(), dict(args))
+
+    def record_tool(self, call_id, tool_name, args, response):
+        started, args = self._pending.pop(call_id, (None, args))
+        self.entries.append({
+            "type": "tool",
+            "key": tool_key(tool_name, args),
+            "tool": tool_name,
+            "args": args,
+            "response": _dump(response),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1) if started else None,
+        })
+
+    def start_model(self, request):
+        self._pending["@model"] = (time.perf_counter(), request)
+
+    def record_model(self, response):
+        started, request = self._pending.pop("@model", (None, None))
+        self.entries.append({
+            "type": "model",
+            "request": request,
+            "response": _dump(response),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1) if started else None,
+        })
+
+
+def begin_run(run):
+    if not _judging.get():
+        return
+    if AGENT_CASSETTE_MODE == "record":
+        run.cassette = Cassette(run.agent_name, run.prompt)
+    elif AGENT_CASSETTE_MODE == "replay":
+        path = cassette_path(run.agent_name, run.prompt)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No cassette recorded for this run: {path}")
+        run.cassette = Cassette.load(path)
+
+
+def end_run(run, result, duration):
+    if AGENT_CASSETTE_MODE == "record" and run.cassette is not None:
+        run.cassette.save(result, duration)
+
+
+def _cassette():
+    run = get_run()
+    return run.cassette if run is not None else None
+
+
+async def before_tool(tool, args, tool_context):
+    cassette = _cassette()
+    if cassette is None:
+        return None
+    if AGENT_CASSETTE_MODE == "record":
+        cassette.start_tool(tool_context.function_call_id, args)
+        return None
+    response = cassette.next_tool_response(tool.name, args)
+    if response is None and AGENT_CASSETTE_REPLAY_MISS != "live":
+        text = f"No recorded response for {tool.name} {json.dumps(args)}"
+        return {"isError": True, "content": [{"type": "text", "text": text}]}
+    return response
+
+
+async def after_tool(tool, args, tool_context, tool_response):
+    cassette = _cassette()
+    if cassette is not None and AGENT_CASSETTE_MODE == "record":
+        cassette.record_tool(tool_context.function_call_id, tool.name, args, tool_response)
+    return None
+
+
+async def before_model(callback_context, llm_request):
+    cassette = _cassette()
+    if cassette is not None and AGENT_CASSETTE_MODE == "record":
+        contents = llm_request.contents or []
+        # The full conversation is rebuilt from earlier entries; only the newest turn is kept.
+        cassette.start_model({
+            "model": llm_request.model,
+            "contents": len(contents),
+            "last_content": _dump(contents[-1]) if contents else None,
+        })
+    return None
+
+
+async def after_model(callback_context, llm_response):
+    cassette = _cassette()
+    if cassette is not None and AGENT_CASSETTE_MODE == "record":
+        cassette.record_model(llm_response)
+    return None
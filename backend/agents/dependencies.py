@@ -0,0 +1,502 @@
+import asyncio
+import json
+import os
+import re
+import tomllib
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, namedtuple
+
+from .snapshots import get_snapshot
+
+# Commits whose parsed dependency sets are kept in memory.
+DEPENDENCY_CACHE_SIZE = int(os.getenv("DEPENDENCY_CACHE_SIZE", "256"))
+MAX_MANIFEST_BYTES = 5 * 1024 * 1024
+
+DIRECT = "direct"
+TRANSITIVE = "transitive"
+
+Dependency = namedtuple("Dependency", "ecosystem package version scope manifest")
+
+# Packages whose presence is direct evidence for a prize, per ecosystem.
+PRIZE_PACKAGES = {
+    "Gemini": {
+        "pypi": {
+            "google-generativeai", "google-genai", "google-cloud-aiplatform", "vertexai",
+            "langchain-google-genai", "langchain-google-vertexai", "llama-index-llms-gemini",
+        },
+        "npm": {
+            "@google/generative-ai", "@google/genai", "@google-cloud/vertexai",
+            "@langchain/google-genai", "@langchain/google-vertexai", "@ai-sdk/google",
+        },
+        "go": {"github.com/google/generative-ai-go", "google.golang.org/genai"},
+        "maven": {
+            "com.google.cloud:google-cloud-vertexai",
+            "com.google.ai.client.generativeai:generativeai",
+        },
+        "pub": {"google_generative_ai", "firebase_vertexai", "firebase_ai"},
+    },
+    "MongoDB": {
+        "pypi": {
+            "pymongo", "motor", "mongoengine", "djongo", "beanie", "odmantic",
+            "flask-pymongo", "langchain-mongodb",
+        },
+        "npm": {
+            "mongodb", "mongoose", "monk", "mongoskin", "@typegoose/typegoose", "connect-mongo",
+            "@langchain/mongodb",
+        },
+        "maven": {
+            "org.mongodb:mongodb-driver-sync", "org.mongodb:mongodb-driver-reactivestreams",
+            "org.mongodb:mongodb-driver-core", "org.mongodb:mongo-java-driver",
+            "org.springframework.boot:spring-boot-starter-data-mongodb",
+            "org.springframework.boot:spring-boot-starter-data-mongodb-reactive",
+        },
+        "go": {"go.mongodb.org/mongo-driver", "go.mongodb.org/mongo-driver/v2"},
+        "rubygems": {"mongo", "mongoid"},
+        "cargo": {"mongodb"},
+        "composer": {"mongodb/mongodb", "mongodb/laravel-mongodb", "jenssegers/mongodb"},
+        "nuget": {"mongodb.driver"},
+        "pub": {"mongo_dart"},
+    },
+    "ElevenLabs": {
+        "pypi": {"elevenlabs"},
+        "npm": {
+            "elevenlabs", "@elevenlabs/elevenlabs-js", "@elevenlabs/client", "@elevenlabs/react",
+            "@11labs/client", "@11labs/react",
+        },
+    },
+}
+
+_PEP508_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*([^;#]*)")
+_GRADLE_RE = re.compile(r"""\b\w+\s*\(?\s*['"]([\w.\-]+):([\w.\-]+)(?::([^'"@]+))?['"]""")
+_GEMFILE_RE = re.compile(
+    r"""^\s*gem\s+['"]([^'"]+)['"](?:\s*,\s*['"]([^'"]+)['"])?""", re.MULTILINE
+)
+_GO_REQUIRE_RE = re.compile(r"^\s*(?:require\s+)?([\w.\-]+\.[\w.\-/]+)\s+(v[^\s]+)(.*)$")
+_PNPM_PACKAGE_RE = re.compile(r"^  '?/?((?:@[^@/\s']+/)?[^@/\s':(]+)[@/](\d[^:'(\s]*)")
+_GEMFILE_LOCK_SPEC_RE = re.compile(r"^    ([\w.\-]+) \(([^)]+)\)")
+
+
+def normalize_package(ecosystem, name):
+    name = name.strip()
+    if ecosystem == "pypi":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    if ecosystem in ("npm", "nuget", "composer", "rubygems", "cargo", "pub"):
+        return name.lower()
+    return name
+
+
+def _dep(ecosystem, name, version, scope, manifest):
+    version = (version or "").strip() or None
+    return Dependency(ecosystem, normalize_package(ecosystem, name), version, scope, manifest)
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_requirements(text, manifest):
+    deps = []
+    for line in text.splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if not line or line.startswith(("#", "-", "git+", "http")):
+            continue
+        match = _PEP508_RE.match(line)
+        if match:
+            deps.append(_dep("pypi", match.group(1), match.group(2), DIRECT, manifest))
+    return deps
+
+
+def _pep508_list(requirements, manifest):
+    deps = []
+    for requirement in requirements or []:
+        match = _PEP508_RE.match(requirement) if isinstance(requirement, str) else None
+        if match:
+            deps.append(_dep("pypi", match.group(1), match.group(2), DIRECT, manifest))
+    return deps
+
+
+def _version_of(spec):
+    if isinstance(spec, dict):
+        return spec.get("version")
+    return spec if isinstance(spec, str) else None
+
+
+def parse_pyproject(text, manifest):
+    data = tomllib.loads(text)
+    project = data.get("project", {})
+    deps = _pep508_list(project.get("dependencies"), manifest)
+    for group in project.get("optional-dependencies", {}).values():
+        deps += _pep508_list(group, manifest)
+    for group in data.get("dependency-groups", {}).values():
+        deps += _pep508_list(group, manifest)
+
+    poetry = data.get("tool", {}).get("poetry", {})
+    tables = [poetry.get("dependencies", {}), poetry.get("dev-dependencies", {})]
+    tables += [group.get("dependencies", {}) for group in poetry.get("group", {}).values()]
+    for table in tables:
+        for name, spec in table.items():
+            if name.lower() != "python":
+                deps.append(_dep("pypi", name, _version_of(spec), DIRECT, manifest))
+    return deps
+
+
+def parse_pipfile(text, manifest):
+    data = tomllib.loads(text)
+    return [
+        _dep("pypi", name, _version_of(spec), DIRECT, manifest)
+        for section in ("packages", "dev-packages")
+        for name, spec in data.get(section, {}).items()
+    ]
+
+
+def parse_toml_lock(ecosystem):
+    """poetry.lock, uv.lock and Cargo.lock all list resolved packages as [[package]]."""
+    def parse(text, manifest):
+        data = tomllib.loads(text)
+        return [
+            _dep(ecosystem, package["name"], package.get("version"), TRANSITIVE, manifest)
+            for package in data.get("package", []) if "name" in package
+        ]
+    return parse
+
+
+NPM_DEPENDENCY_SECTIONS = (
+    "dependencies", "devDependencies", "peerDependencies", "optionalDependencies",
+)
+
+
+def parse_package_json(text, manifest):
+    data = json.loads(text)
+    return [
+        _dep("npm", name, version if isinstance(version, str) else None, DIRECT, manifest)
+        for section in NPM_DEPENDENCY_SECTIONS
+        for name, version in (data.get(section) or {}).items()
+    ]
+
+
+def parse_package_lock(text, manifest):
+    data = json.loads(text)
+    deps = []
+    for path, info in (data.get("packages") or {}).items():
+        if "node_modules/" in path:
+            name = info.get("name") or path.rsplit("node_modules/", 1)[-1]
+            deps.append(_dep("npm", name, info.get("version"), TRANSITIVE, manifest))
+    if deps:
+        return deps
+
+    # lockfileVersion 1 nests resolved packages under "dependencies".
+    stack = [data.get("dependencies") or {}]
+    while stack:
+        for name, info in stack.pop().items():
+            deps.append(_dep("npm", name, info.get("version"), TRANSITIVE, manifest))
+            if info.get("dependencies"):
+                stack.append(info["dependencies"])
+    return deps
+
+
+def parse_yarn_lock(text, manifest):
+    deps = []
+    names = []
+    for line in text.splitlines():
+        if line and not line.startswith((" ", "#")) and line.rstrip().endswith(":"):
+            names = []
+            for spec in line.rstrip()[:-1].split(","):
+                spec = spec.strip().strip('"')
+                name = spec.rsplit("@", 1)[0] if spec.rfind("@") > 0 else spec
+                # Yarn Berry lockfiles start with a "__metadata:" block that is not a package.
+                if name and name != "__metadata" and name not in names:
+                    names.append(name)
+        elif names and line.strip().startswith("version"):
+            fields = line.split(None, 1)
+            version = fields[1].strip().strip('"') if len(fields) > 1 else None
+            deps += [_dep("npm", name, version, TRANSITIVE, manifest) for name in names]
+            names = []
+    return deps
+
+
+def parse_pnpm_lock(text, manifest):
+    deps = []
+    in_packages = False
+    for line in text.splitlines():
+        if line and not line.startswith(" "):
+            in_packages = line.startswith(("packages:", "snapshots:"))
+            continue
+        if in_packages:
+            match = _PNPM_PACKAGE_RE.match(line)
+            if match:
+                deps.append(_dep("npm", match.group(1), match.group(2), TRANSITIVE, manifest))
+    return deps
+
+
+def parse_pom(text, manifest):
+    root = ET.fromstring(text)
+    deps = []
+    for element in root.iter():
+        if _local_name(element.tag) != "dependency":
+            continue
+        fields = {_local_name(child.tag): (child.text or "").strip() for child in element}
+        if fields.get("groupId") and fields.get("artifactId"):
+            name = f"{fields['groupId']}:{fields['artifactId']}"
+            deps.append(_dep("maven", name, fields.get("version"), DIRECT, manifest))
+    return deps
+
+
+def parse_gradle(text, manifest):
+    return [
+        _dep("maven", f"{group}:{artifact}", version, DIRECT, manifest)
+        for group, artifact, version in _GRADLE_RE.findall(text)
+    ]
+
+
+def parse_go_mod(text, manifest):
+    deps = []
+    in_block = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("require ("):
+            in_block = True
+            continue
+        if in_block and stripped == ")":
+            in_block = False
+            continue
+        if in_block or stripped.startswith("require "):
+            match = _GO_REQUIRE_RE.match(stripped)
+            if match:
+                scope = TRANSITIVE if "// indirect" in match.group(3) else DIRECT
+                deps.append(_dep("go", match.group(1), match.group(2), scope, manifest))
+    return deps
+
+
+def parse_gemfile(text, manifest):
+    return [
+        _dep("rubygems", name, version, DIRECT, manifest)
+        for name, version in _GEMFILE_RE.findall(text)
+    ]
+
+
+def parse_gemfile_lock(text, manifest):
+    deps = []
+    direct = set()
+    section = None
+    for line in text.splitlines():
+        if line and not line.startswith(" "):
+            section = line.strip()
+            continue
+        if section in ("GEM", "PATH", "GIT"):
+            match = _GEMFILE_LOCK_SPEC_RE.match(line)
+            if match:
+                deps.append((match.group(1), match.group(2)))
+        elif section == "DEPENDENCIES" and line.startswith("  ") and line.strip():
+            direct.add(line.split()[0].rstrip("!").lower())
+    return [
+        _dep("rubygems", name, version, DIRECT if name.lower() in direct else TRANSITIVE, manifest)
+        for name, version in deps
+    ]
+
+
+def parse_cargo_toml(text, manifest):
+    data = tomllib.loads(text)
+    sections = ("dependencies", "dev-dependencies", "build-dependencies")
+    tables = [data.get(s, {}) for s in sections]
+    for target in data.get("target", {}).values():
+        tables += [target.get(s, {}) for s in sections]
+    deps = []
+    for table in tables:
+        for name, spec in table.items():
+            # `foo = { package = "real-name" }` renames a dependency.
+            package = spec.get("package", name) if isinstance(spec, dict) else name
+            deps.append(_dep("cargo", package, _version_of(spec), DIRECT, manifest))
+    return deps
+
+
+def parse_composer_json(text, manifest):
+    data = json.loads(text)
+    return [
+        _dep("composer", name, version, DIRECT, manifest)
+        for section in ("require", "require-dev")
+        for name, version in (data.get(section) or {}).items()
+        if name != "php" and not name.startswith("ext-")
+    ]
+
+
+def parse_composer_lock(text, manifest):
+    data = json.loads(text)
+    return [
+        _dep("composer", package["name"], package.get("version"), TRANSITIVE, manifest)
+        for section in ("packages", "packages-dev")
+        for package in data.get(section) or []
+    ]
+
+
+def parse_csproj(text, manifest):
+    root = ET.fromstring(text)
+    deps = []
+    for element in root.iter():
+        if _local_name(element.tag) != "PackageReference":
+            continue
+        name = element.get("Include") or element.get("Update")
+        version = element.get("Version")
+        if version is None:
+            version = next((c.text for c in element if _local_name(c.tag) == "Version"), None)
+        if name:
+            deps.append(_dep("nuget", name, version, DIRECT, manifest))
+    return deps
+
+
+def parse_packages_config(text, manifest):
+    root = ET.fromstring(text)
+    return [
+        _dep("nuget", element.get("id"), element.get("version"), DIRECT, manifest)
+        for element in root.iter("package") if element.get("id")
+    ]
+
+
+def parse_pubspec(text, manifest):
+    deps = []
+    section = None
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line.startswith(" "):
+            section = line.split(":", 1)[0].strip()
+            continue
+        if section not in ("dependencies", "dev_dependencies"):
+            continue
+        if re.match(r"^  [A-Za-z_]\w*\s*:", line):
+            name, _, version = line.strip().partition(":")
+            if name not in ("flutter", "flutter_test"):
+                version = version.strip().strip("'\"") or None
+                deps.append(_dep("pub", name, version, DIRECT, manifest))
+    return deps
+
+
+MANIFEST_PARSERS = {
+    "requirements.txt": parse_requirements,
+    "pyproject.toml": parse_pyproject,
+    "Pipfile": parse_pipfile,
+    "poetry.lock": parse_toml_lock("pypi"),
+    "uv.lock": parse_toml_lock("pypi"),
+    "package.json": parse_package_json,
+    "package-lock.json": parse_package_lock,
+    "yarn.lock": parse_yarn_lock,
+    "pnpm-lock.yaml": parse_pnpm_lock,
+    "pom.xml": parse_pom,
+    "build.gradle": parse_gradle,
+    "build.gradle.kts": parse_gradle,
+    "go.mod": parse_go_mod,
+    "Gemfile": parse_gemfile,
+    "Gemfile.lock": parse_gemfile_lock,
+    "Cargo.toml": parse_cargo_toml,
+    "Cargo.lock": parse_toml_lock("cargo"),
+    "composer.json": parse_composer_json,
+    "composer.lock": parse_composer_lock,
+    "packages.config": parse_packages_config,
+    "pubspec.yaml": parse_pubspec,
+}
+
+
+def parser_for(filename):
+    if filename in MANIFEST_PARSERS:
+        return MANIFEST_PARSERS[filename]
+    if filename.endswith(".csproj"):
+        return parse_csproj
+    # requirements-dev.txt, requirements/base.txt and similar.
+    if filename.startswith("requirements") and filename.endswith(".txt"):
+        return parse_requirements
+    return None
+
+
+def parse_manifests(snapshot):
+    """Parses every manifest and lockfile in a snapshot into one deduplicated dependency list.
+
+    A package listed both in a manifest and in a lockfile is reported once, as direct.
+    Manifests too large to parse (or to extract) are returned as skipped, not dropped.
+    """
+    found = {}
+    manifests = []
+    errors = {}
+    skipped = {
+        relative: f"{size} bytes; larger than the snapshot file limit, not parsed"
+        for relative, size in snapshot.skipped_files().items()
+        if parser_for(os.path.basename(relative)) is not None
+    }
+    for relative, absolute in snapshot.iter_files():
+        parse = parser_for(os.path.basename(relative))
+        if parse is None:
+            continue
+        size = os.path.getsize(absolute)
+        if size > MAX_MANIFEST_BYTES:
+            skipped[relative] = f"{size} bytes; larger than {MAX_MANIFEST_BYTES}, not parsed"
+            continue
+        manifests.append(relative)
+        try:
+            with open(absolute, "r", encoding="utf-8", errors="replace") as f:
+                deps = parse(f.read(), relative)
+        except Exception as e:
+            errors[relative] = str(e)
+            continue
+        for dep in deps:
+            key = (dep.ecosystem, dep.package)
+            existing = found.get(key)
+            if existing is None or (existing.scope == TRANSITIVE and dep.scope == DIRECT):
+                found[key] = dep._replace(version=dep.version or (existing and existing.version))
+    return sorted(found.values()), sorted(manifests), errors, skipped
+
+
+def detect_prizes(dependencies):
+    """Matches the dependency set against PRIZE_PACKAGES; one set lookup per dependency."""
+    detected = {prize: [] for prize in PRIZE_PACKAGES}
+    for dep in dependencies:
+        for prize, ecosystems in PRIZE_PACKAGES.items():
+            if dep.package in ecosystems.get(dep.ecosystem, ()):
+                detected[prize].append(dep._asdict())
+    return detected
+
+
+_cache = OrderedDict()
+
+
+async def repository_dependencies(repo_url, token, ref=None):
+    """Normalized dependencies of a repository at one commit, parsed once per commit."""
+    snapshot = await get_snapshot(repo_url, token, ref)
+    if snapshot.key in _cache:
+        _cache.move_to_end(snapshot.key)
+        return _cache[snapshot.key]
+
+    dependencies, manifests, errors, skipped = await asyncio.to_thread(parse_manifests, snapshot)
+    summary = {
+        "commit": snapshot.sha,
+        "manifests": manifests,
+        "direct": [d._asdict() for d in dependencies if d.scope == DIRECT],
+        "transitive_count": sum(1 for d in dependencies if d.scope == TRANSITIVE),
+        "prize_packages": detect_prizes(dependencies),
+        "parse_errors": errors,
+        "skipped_manifests": skipped,
+    }
+    _cache[snapshot.key] = summary
+    while len(_cache) > DEPENDENCY_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return summary
+
+
+def dependency_tool(token):
+    """Function tool that gives an agent the parsed dependency set of a repository."""
+    async def list_dependencies(repo_url: str) -> dict:
+        """Lists the dependencies declared in every manifest and lockfile of a GitHub repository
+        (package.json, lockfiles, requirements.txt, pyproject.toml, pom.xml, build.gradle, go.mod,
+        Gemfile, Cargo.toml, composer.json, *.csproj, pubspec.yaml and others).
+
+        Returns the commit, the manifest paths, the direct dependencies with ecosystem and version,
+        the number of transitive dependencies, and under prize_packages the known Gemini, MongoDB
+        and ElevenLabs SDKs found anywhere in the dependency tree. Manifests listed under
+        skipped_manifests were too large to read, so the dependency set may be incomplete.
+
+        Args:
+            repo_url: The GitHub repository URL, e.g. https://github.com/owner/repo.
+        """
+        try:
+            return await repository_dependencies(repo_url, token)
+        except Exception as e:
+            return {"error": str(e)}
+
+    return list_dependencies
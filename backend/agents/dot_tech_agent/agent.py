@@ -2,8 +2,9 @@ import os
 import requests
 from dotenv import load_dotenv
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from ..prompts import DOT_TECH_INSTRUCTION
+from ..models import openrouter_model
+from ..tracing import tracing_callbacks
 
 import streamlit as st
 
@@ -21,14 +22,10 @@ def check_website_status(url: str) -> str:
         return f'{{"reachable": false, "error": "{str(e)}"}}'
 
 tech_agent = Agent(
-    model=LiteLlm(
-        # Using 1.5 Pro to ensure stable tool execution
-        model="openrouter/google/gemini-2.5-flash",
-        api_key=OPENROUTER_API_KEY,
-        api_base="https://openrouter.ai/api/v1"
-    ),
+    model=openrouter_model(OPENROUTER_API_KEY),
     name="dot_tech_prize_checker",
     description="Validates .Tech prize submissions by checking TLD and website uptime.",
     instruction=DOT_TECH_INSTRUCTION,
-    tools=[check_website_status] 
+    tools=[check_website_status],
+    **tracing_callbacks(),
 )
\ No newline at end of file
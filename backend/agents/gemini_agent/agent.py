@@ -3,34 +3,26 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from google.adk.agents import Agent
-from google.adk.tools.mcp_tool import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
-from google.adk.models.lite_llm import LiteLlm
 from ..prompts import GEMINI_CHECKER_INSTRUCTION
+from ..models import openrouter_model
+from ..github_mcp import github_toolset
+from ..callbacks import agent_callbacks
+from ..dependencies import dependency_tool
+from ..scanner import signature_scan_tool
 import streamlit as st
 
 GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
 OPENROUTER_API_KEY = st.secrets["OPENROUTER_API_KEY"]
 
 root_agent = Agent(
-    model=LiteLlm(
-        model="openrouter/google/gemini-2.5-flash",
-        api_key=OPENROUTER_API_KEY,
-        api_base="https://openrouter.ai/api/v1"
-    ),
+    model=openrouter_model(OPENROUTER_API_KEY),
     name="gemini_prize_checker",
     description="Validates Gemini prize submissions by checking Project Numbers and API usage in code.",
     instruction=GEMINI_CHECKER_INSTRUCTION,
     tools=[
-        McpToolset(
-            connection_params=StreamableHTTPConnectionParams(
-                url= "https://api.githubcopilot.com/mcp/",
-                headers={
-                    "Authorization": f"Bearer {GITHUB_TOKEN}",
-                    "X-MCP-Readonly": "true",
-                    "X-MCP-Toolsets": "repos,search,files"
-                },
-            )
-        )
+        github_toolset(GITHUB_TOKEN, "repos,search,files"),
+        dependency_tool(GITHUB_TOKEN),
+        signature_scan_tool(GITHUB_TOKEN),
     ],
+    **agent_callbacks(GITHUB_TOKEN),
 )
\ No newline at end of file
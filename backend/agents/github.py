@@ -0,0 +1,146 @@
+import os
+import re
+import time
+
+import httpx
+
+GITHUB_API_URL = "https://api.github.com"
+# How long a branch/tag -> SHA resolution is trusted before asking GitHub again.
+REF_TTL_SECONDS = 60
+# Resolutions made when an upload is prefetched are kept until its batch has been judged.
+# The tool cache pins the ref of every file, tree and commit-list call to the resolved SHA,
+# so every check of a submission reads the commit that was resolved at upload time.
+REF_PREFETCH_TTL_SECONDS = float(os.getenv("REF_PREFETCH_TTL_SECONDS", "21600"))
+REF_CACHE_SIZE = 4096
+# Repositories resolved per GraphQL request by resolve_default_branches.
+GRAPHQL_BATCH_SIZE = 50
+
+_REPO_URL_RE = re.compile(
+    r"^(?:https?://)?(?:www\.)?github\.com[/:]"
+    r"([A-Za-z0-9_.-]+)/([A-Za-z0-9_.-]+?)(?:\.git)?(?:[/?#].*)?$"
+)
+_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+_client = None
+_ref_cache = {}
+
+
+class GraphQLError(Exception):
+    """A GitHub GraphQL request answered with errors other than missing repositories."""
+
+
+def github_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            timeout=httpx.Timeout(20.0, connect=10.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_github_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def parse_repo_url(url):
+    """Returns (owner, repo) for a GitHub repository URL, or None if it is not one."""
+    match = _REPO_URL_RE.match(str(url or "").strip())
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+
+def is_sha(ref):
+    return bool(ref) and bool(_SHA_RE.match(str(ref).lower()))
+
+
+async def resolve_ref(owner, repo, ref, token, ttl=REF_TTL_SECONDS):
+    """Resolves a branch, tag or HEAD to a commit SHA, caching the answer for `ttl` seconds."""
+    ref = ref or "HEAD"
+    if is_sha(ref):
+        return ref.lower()
+    key = (owner.lower(), repo.lower(), ref)
+    cached = _ref_cache.get(key)
+    if cached and time.monotonic() < cached[1]:
+        return cached[0]
+
+    headers = {"Accept": "application/vnd.github.sha"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    response = await github_client().get(f"/repos/{owner}/{repo}/commits/{ref}", headers=headers)
+    response.raise_for_status()
+    sha = response.text.strip()
+    _remember_ref(key, sha, ttl)
+    return sha
+
+
+def _remember_ref(key, sha, ttl):
+    _ref_cache.pop(key, None)
+    if len(_ref_cache) >= REF_CACHE_SIZE:
+        _ref_cache.pop(next(iter(_ref_cache)))
+    _ref_cache[key] = (sha, time.monotonic() + ttl)
+
+
+async def resolve_default_branches(repos, token, ttl=REF_TTL_SECONDS):
+    """Resolves the default-branch head of many repositories with one GraphQL request per batch.
+
+    Returns {(owner, repo): {"sha", "branch", "private"}}, with None for repositories that do
+    not exist or are not visible to the token, and seeds the resolve_ref cache for HEAD for
+    `ttl` seconds.
+    """
+    repos = list(repos)
+    variables = {}
+    fields = []
+    for i, (owner, repo) in enumerate(repos):
+        variables[f"o{i}"], variables[f"n{i}"] = owner, repo
+        fields.append(
+            f"r{i}: repository(owner: $o{i}, name: $n{i}) "
+            "{ isPrivate defaultBranchRef { name target { oid } } }"
+        )
+    declarations = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(len(repos)))
+    query = f"query({declarations}) {{ {' '.join(fields)} }}"
+
+    response = await github_client().post(
+        "/graphql",
+        json={"query": query, "variables": variables},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    response.raise_for_status()
+    body = response.json()
+    # Missing repositories come back as null data entries alongside NOT_FOUND errors on their
+    # alias. Rate limits, query complexity and token scope errors also arrive with HTTP 200;
+    # they must not read as every repository being missing.
+    missing = set()
+    for error in body.get("errors") or []:
+        path = error.get("path") or []
+        if error.get("type") != "NOT_FOUND" or not path:
+            raise GraphQLError(f"GitHub GraphQL error: {error.get('message') or error}")
+        missing.add(path[0])
+    data = body.get("data")
+    if data is None:
+        raise GraphQLError("GitHub GraphQL response has no data")
+
+    resolved = {}
+    for i, (owner, repo) in enumerate(repos):
+        node = data.get(f"r{i}")
+        if not node:
+            if f"r{i}" not in missing:
+                raise GraphQLError(f"GitHub GraphQL returned no result for {owner}/{repo}")
+            resolved[(owner, repo)] = None
+            continue
+        branch = node.get("defaultBranchRef")
+        sha = branch["target"]["oid"] if branch else None
+        resolved[(owner, repo)] = {
+            "sha": sha,
+            "branch": branch["name"] if branch else None,
+            "private": node.get("isPrivate"),
+        }
+        if sha:
+            _remember_ref((owner.lower(), repo.lower(), "HEAD"), sha, ttl)
+            _remember_ref((owner.lower(), repo.lower(), branch["name"]), sha, ttl)
+    return resolved
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from google.adk.tools.mcp_tool import McpToolset
+from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
+
+GITHUB_MCP_URL = "https://api.githubcopilot.com/mcp/"
+
+# Tool schemas rarely change, so discovery is only repeated after this many seconds.
+TOOL_SCHEMA_TTL_SECONDS = 3600
+
+
+class CachedMcpToolset(McpToolset):
+    """McpToolset that keeps the discovered tool list instead of listing tools on every run."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached_tools = None
+        self._cached_at = 0.0
+        self._discovery_lock = asyncio.Lock()
+
+    def _fresh(self):
+        age = time.monotonic() - self._cached_at
+        return self._cached_tools is not None and age < TOOL_SCHEMA_TTL_SECONDS
+
+    async def get_tools(self, readonly_context=None):
+        if self._fresh():
+            return self._cached_tools
+
+        async with self._discovery_lock:
+            if not self._fresh():
+                self._cached_tools = await super().get_tools(readonly_context)
+                self._cached_at = time.monotonic()
+        return self._cached_tools
+
+
+def github_toolset(token, toolsets):
+    return CachedMcpToolset(
+        connection_params=StreamableHTTPConnectionParams(
+            url=GITHUB_MCP_URL,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "X-MCP-Readonly": "true",
+                "X-MCP-Toolsets": toolsets,
+            },
+        )
+    )
@@ -0,0 +1,195 @@
+import asyncio
+import copy
+import os
+import time
+from collections import deque
+
+from google.adk.models.lite_llm import LiteLlm
+
+from .run_context import get_run
+
+OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "openrouter/google/gemini-2.5-flash"
+
+# Hedging is opt-in: a duplicate request costs tokens.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+# A turn slower than this percentile of recent turns gets a duplicate request.
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "2"))
+# Optional alternate model/provider for the duplicate,
+# e.g. "openrouter/google/gemini-2.5-flash-lite".
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")
+# Long-run fraction of turns that may be hedged; caps the extra cost.
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "5"))
+
+# Marks the first message (the agent's static instruction) with cache_control so providers
+# with explicit prompt caching (Gemini and Anthropic through OpenRouter) reuse it as a
+# cached prefix. Providers with automatic prefix caching ignore the marker.
+LLM_PROMPT_CACHE_ENABLED = os.getenv("LLM_PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_INJECTION_POINTS = [{"location": "message", "index": 0}]
+
+hedge_stats = {"turns": 0, "hedged": 0, "hedge_wins": 0, "budget_exhausted": 0}
+usage_stats = {"turns": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0}
+
+
+class _LatencyWindow:
+    def __init__(self, size=512):
+        self.samples = deque(maxlen=size)
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, pct):
+        if len(self.samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class _HedgeBudget:
+    """Token bucket: every turn earns LLM_HEDGE_BUDGET tokens, every hedge spends one."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+
+    def earn(self):
+        self.tokens = min(self.burst, self.tokens + self.rate)
+
+    def try_spend(self):
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+_latencies = {}
+_budget = _HedgeBudget(LLM_HEDGE_BUDGET, LLM_HEDGE_BURST)
+_alternates = {}
+
+
+def record_usage(response):
+    """Adds a turn's token counts to the process totals and to the current run."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    turn = {
+        "turns": 1,
+        "input_tokens": usage.prompt_token_count or 0,
+        "cached_input_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+        "output_tokens": usage.candidates_token_count or 0,
+    }
+    run = get_run()
+    for key, value in turn.items():
+        usage_stats[key] += value
+        if run is not None:
+            run.usage[key] += value
+
+
+def usage_snapshot():
+    cached = usage_stats["cached_input_tokens"]
+    total = usage_stats["input_tokens"]
+    return {
+        **usage_stats,
+        "uncached_input_tokens": total - cached,
+        "cached_input_ratio": round(cached / total, 4) if total else None,
+    }
+
+
+def _copy_request(llm_request):
+    """A deep copy for the hedge, so callbacks and cache_control injection on one request do
+    not change the other. The tool objects hold MCP sessions and locks; they are shared."""
+    return copy.deepcopy(llm_request, {id(llm_request.tools_dict): llm_request.tools_dict})
+
+
+async def _collect(model, llm_request):
+    responses = LiteLlm.generate_content_async(model, llm_request, stream=False)
+    return [response async for response in responses]
+
+
+class HedgedLiteLlm(LiteLlm):
+    """LiteLlm that re-issues a turn when it runs past the recent latency percentile.
+
+    Whichever copy answers first is used and the other is cancelled. Latencies are
+    tracked per model across all agents in the process.
+    """
+
+    @property
+    def api_key(self):
+        """The OpenRouter key this model was built with, for the readiness probe."""
+        return self._additional_args.get("api_key")
+
+    def _hedge_target(self):
+        if not LLM_HEDGE_MODEL or LLM_HEDGE_MODEL == self.model:
+            return self
+        if LLM_HEDGE_MODEL not in _alternates:
+            _alternates[LLM_HEDGE_MODEL] = LiteLlm(model=LLM_HEDGE_MODEL, **self._additional_args)
+        return _alternates[LLM_HEDGE_MODEL]
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if stream or not LLM_HEDGE_ENABLED:
+            async for response in super().generate_content_async(llm_request, stream=stream):
+                record_usage(response)
+                yield response
+            return
+
+        window = _latencies.setdefault(self.model, _LatencyWindow())
+        threshold = window.percentile(LLM_HEDGE_PERCENTILE)
+        hedge_stats["turns"] += 1
+        _budget.earn()
+
+        started = time.perf_counter()
+
+        def observe(task):
+            # A primary cancelled by its hedge or failed early is a censored sample;
+            # counting it would pull the threshold down and hedge more and more turns.
+            if not task.cancelled() and task.exception() is None:
+                window.observe(time.perf_counter() - started)
+
+        primary = asyncio.create_task(_collect(self, llm_request))
+        primary.add_done_callback(observe)
+        tasks = {primary}
+        try:
+            if threshold is not None:
+                delay = max(threshold, LLM_HEDGE_MIN_DELAY_SECONDS)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if _budget.try_spend():
+                        hedge_stats["hedged"] += 1
+                        hedge = _collect(self._hedge_target(), _copy_request(llm_request))
+                        tasks.add(asyncio.create_task(hedge))
+                    else:
+                        hedge_stats["budget_exhausted"] += 1
+
+            responses = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.exception()), None)
+                if winner is not None:
+                    responses = winner.result()
+                    if winner is not primary:
+                        hedge_stats["hedge_wins"] += 1
+                    break
+            if responses is None:
+                # Every copy failed; surface the primary's error.
+                raise primary.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # Only the winning copy's tokens are counted; a cancelled hedge may still be billed.
+        for response in responses:
+            record_usage(response)
+            yield response
+
+
+def openrouter_model(api_key, model=DEFAULT_MODEL):
+    extra = {}
+    if LLM_PROMPT_CACHE_ENABLED:
+        extra["cache_control_injection_points"] = PROMPT_CACHE_INJECTION_POINTS
+    return HedgedLiteLlm(model=model, api_key=api_key, api_base=OPENROUTER_API_BASE, **extra)
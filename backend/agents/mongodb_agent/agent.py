@@ -3,10 +3,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from google.adk.agents import Agent
-from google.adk.tools.mcp_tool import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
-from google.adk.models.lite_llm import LiteLlm
 from ..prompts import MONGODB_CHECKER_INSTRUCTION
+from ..models import openrouter_model
+from ..github_mcp import github_toolset
+from ..callbacks import agent_callbacks
+from ..dependencies import dependency_tool
+from ..scanner import signature_scan_tool
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
@@ -18,24 +20,14 @@ if not OPENROUTER_API_KEY:
     raise ValueError("OPENROUTER_API_KEY environment variable is required for the MongoDB checker agent")
 
 root_agent = Agent(
-    model=LiteLlm(
-        model="openrouter/google/gemini-2.5-flash",
-        api_key=OPENROUTER_API_KEY,
-        api_base="https://openrouter.ai/api/v1"
-    ),
+    model=openrouter_model(OPENROUTER_API_KEY),
     name="mongodb_prize_checker",
     description="Validates MongoDB prize submissions by checking for MongoDB driver usage in code.",
     instruction=MONGODB_CHECKER_INSTRUCTION,
     tools=[
-        McpToolset(
-            connection_params=StreamableHTTPConnectionParams(
-                url="https://api.githubcopilot.com/mcp/",
-                headers={
-                    "Authorization": f"Bearer {GITHUB_TOKEN}",
-                    "X-MCP-Readonly": "true",
-                    "X-MCP-Toolsets": "repos,search,files"
-                },
-            )
-        )
+        github_toolset(GITHUB_TOKEN, "repos,search,files"),
+        dependency_tool(GITHUB_TOKEN),
+        signature_scan_tool(GITHUB_TOKEN),
     ],
+    **agent_callbacks(GITHUB_TOKEN),
 )
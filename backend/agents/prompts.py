@@ -128,6 +128,13 @@ Using the GitHub MCP tool:
   - *.tsx
   - *.ipynb
   - *.env.example
+- Call the `list_dependencies` tool once with the repository URL instead of
+  opening manifest files one by one. It parses every manifest and lockfile
+  and returns the direct dependencies; `prize_packages.Gemini` lists the
+  known Gemini SDK packages found anywhere in the dependency tree.
+- Call the `scan_repository` tool once to search every file for known
+  imports, model names, connection strings and endpoints; it returns
+  file:line hits per signature. Open those files to confirm real usage.
 
 Step 3: Inspect Code for Gemini Usage
 You MUST open and inspect files for evidence of Gemini usage.
@@ -292,6 +299,13 @@ Using the GitHub MCP tool:
   - *.csproj / packages.config (C#/.NET)
   - pubspec.yaml (Dart/Flutter)
   - .env.example / .env.sample
+- Call the `list_dependencies` tool once with the repository URL instead of
+  opening manifest files one by one. It parses every manifest and lockfile
+  and returns the direct dependencies; `prize_packages.MongoDB` lists the
+  known MongoDB driver and ODM packages found anywhere in the dependency tree.
+- Call the `scan_repository` tool once to search every file for known
+  imports, model names, connection strings and endpoints; it returns
+  file:line hits per signature. Open those files to confirm real usage.
 
 Step 2: Identify Primary Language
 Examine the repository structure and files to determine the primary programming language.
@@ -457,6 +471,13 @@ Using the GitHub MCP tool:
   - .env.example / .env.sample
   - Source code files (*.py, *.js, *.ts, *.tsx)
   - Configuration files
+- Call the `list_dependencies` tool once with the repository URL instead of
+  opening manifest files one by one. It parses every manifest and lockfile
+  and returns the direct dependencies; `prize_packages.ElevenLabs` lists the
+  known ElevenLabs SDK packages found anywhere in the dependency tree.
+- Call the `scan_repository` tool once to search every file for known
+  imports, model names, connection strings and endpoints; it returns
+  file:line hits per signature. Open those files to confirm real usage.
 
 Step 2: Identify Primary Language
 Examine the repository structure and files to determine the primary programming language.
@@ -0,0 +1,54 @@
+import contextvars
+import time
+import uuid
+
+# The agent run the current task belongs to. Set by the API around each run so
+# callbacks shared by all agents can attach per-run state (cassettes, traces, usage).
+current_run = contextvars.ContextVar("current_run", default=None)
+
+
+class RunContext:
+    def __init__(self, agent_name, prompt):
+        self.id = uuid.uuid4().hex
+        self.agent_name = agent_name
+        self.prompt = prompt
+        self.started_at = time.time()
+        self.cassette = None
+        self.trace = None
+        # Compact {"tool", "owner", "repo", "path", ...} references to the tool calls made.
+        self.evidence = []
+        # Most payload bytes (texts, evidence, tool responses in the session) held at once.
+        self.retained_payload_bytes = 0
+        # function_call_id -> size of its tool response, measured once for every consumer.
+        self.tool_response_sizes = {}
+        self.usage = {"turns": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0}
+
+
+def get_run():
+    return current_run.get()
+
+
+def payload_size(value):
+    """Approximate bytes of a payload: the length of its strings and a few bytes per other
+    value. It walks the structure instead of serializing it, so nothing is copied."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + payload_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(payload_size(item) for item in value)
+    if hasattr(value, "model_dump"):
+        return payload_size(vars(value))
+    return 0 if value is None else 8
+
+
+def tool_response_size(call_id, response):
+    """payload_size of a tool response, measured once per call and shared by tracing, the
+    tool cache and the run transcript."""
+    run = get_run()
+    if run is None:
+        return payload_size(response)
+    size = run.tool_response_sizes.get(call_id)
+    if size is None:
+        size = run.tool_response_sizes[call_id] = payload_size(response)
+    return size
@@ -0,0 +1,218 @@
+import asyncio
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .snapshots import get_snapshot
+
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", str(os.cpu_count() or 2)))
+# Files are handed to the pool in batches of about this many bytes.
+SCAN_BATCH_BYTES = int(os.getenv("SCAN_BATCH_BYTES", str(8 * 1024 * 1024)))
+# Hits kept per signature; enough to cite evidence without returning every occurrence.
+SCAN_MAX_HITS = int(os.getenv("SCAN_MAX_HITS", "20"))
+SCAN_CACHE_SIZE = int(os.getenv("SCAN_CACHE_SIZE", "256"))
+# Workers start from a clean interpreter instead of forking the threaded server process,
+# which can deadlock on locks held by other threads at fork time.
+SCAN_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Files at least this large are memory-mapped instead of read.
+MMAP_THRESHOLD_BYTES = 256 * 1024
+BINARY_SNIFF_BYTES = 8192
+MAX_MATCH_CHARS = 120
+
+# (prize, signature name, pattern). Patterns are bytes regexes applied to raw file contents.
+SIGNATURES = [
+    ("Gemini", "gemini_python_sdk",
+     rb"import\s+google\.generativeai|from\s+google\s+import\s+(?:genai|generativeai)"
+     rb"|from\s+google\.genai\b"),
+    ("Gemini", "gemini_js_sdk", rb"@google/(?:generative-ai|genai)\b"),
+    ("Gemini", "gemini_vertex_sdk",
+     rb"vertexai(?:\.preview)?\.generative_models|@google-cloud/vertexai"),
+    ("Gemini", "gemini_langchain", rb"ChatGoogleGenerativeAI|langchain[-_]google[-_]genai"),
+    ("Gemini", "gemini_rest_endpoint", rb"generativelanguage\.googleapis\.com"),
+    ("Gemini", "gemini_model_name", rb"(?<![\w-])(?:models/|google/)?gemini-[0-9a-z][\w.\-]*"),
+    ("MongoDB", "mongodb_connection_string", rb"mongodb(?:\+srv)?://"),
+    ("MongoDB", "mongodb_python_driver",
+     rb"(?:import|from)\s+(?:pymongo|motor|mongoengine|beanie)\b"),
+    ("MongoDB", "mongodb_js_driver", rb"(?:require\(\s*|from\s+)['\"](?:mongodb|mongoose)['\"]"),
+    ("MongoDB", "mongodb_client", rb"\bMongoClient\b"),
+    ("MongoDB", "mongodb_jvm_driver",
+     rb"com\.mongodb\.|org\.mongodb|spring-boot-starter-data-mongodb"),
+    ("MongoDB", "mongodb_go_driver", rb"go\.mongodb\.org/mongo-driver"),
+    ("ElevenLabs", "elevenlabs_python_sdk",
+     rb"import\s+elevenlabs|from\s+elevenlabs(?:\.[\w.]+)?\s+import"),
+    ("ElevenLabs", "elevenlabs_js_sdk", rb"@elevenlabs/[\w-]+|@11labs/[\w-]+|['\"]elevenlabs['\"]"),
+    ("ElevenLabs", "elevenlabs_rest_endpoint", rb"api\.elevenlabs\.io"),
+    ("ElevenLabs", "elevenlabs_api_key_header", rb"xi-api-key"),
+]
+SIGNATURE_PRIZES = {name: prize for prize, name, _ in SIGNATURES}
+
+# One alternation of every signature finds the files without a single hit in one search.
+# An alternation reports one match per position and resumes after it, so signatures that
+# overlap or share a prefix would hide each other: files with a hit are then searched once
+# per signature.
+COMBINED_PATTERN = re.compile(b"|".join(b"(?:%s)" % pattern for _, _, pattern in SIGNATURES))
+SIGNATURE_PATTERNS = [(name, re.compile(pattern)) for _, name, pattern in SIGNATURES]
+
+_pool = None
+_cache = OrderedDict()
+
+
+def _scan_buffer(buffer, relative, hits, counts):
+    if COMBINED_PATTERN.search(buffer) is None:
+        return
+    for name, pattern in SIGNATURE_PATTERNS:
+        line = 1
+        position = 0
+        for match in pattern.finditer(buffer):
+            counts[name] = counts.get(name, 0) + 1
+            if len(hits.setdefault(name, [])) >= SCAN_MAX_HITS:
+                continue
+            # mmap has no count(); slicing copies only the stretch since the previous hit.
+            line += buffer[position:match.start()].count(b"\n")
+            position = match.start()
+            hits[name].append({
+                "file": relative,
+                "line": line,
+                "match": match.group(0)[:MAX_MATCH_CHARS].decode("utf-8", errors="replace"),
+            })
+
+
+def scan_files(root, relatives):
+    """Scans a batch of files under `root`. Runs in a pool worker process.
+
+    Returns (hits, counts, bytes scanned, files scanned, files skipped as binary or unreadable).
+    """
+    hits = {}
+    counts = {}
+    scanned = 0
+    files = 0
+    skipped = 0
+    for relative in relatives:
+        path = os.path.join(root, relative)
+        try:
+            size = os.path.getsize(path)
+            if size == 0:
+                files += 1
+                continue
+            with open(path, "rb") as f:
+                if b"\0" in f.read(BINARY_SNIFF_BYTES):
+                    skipped += 1
+                    continue
+                f.seek(0)
+                if size >= MMAP_THRESHOLD_BYTES:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        _scan_buffer(mapped, relative, hits, counts)
+                else:
+                    _scan_buffer(f.read(), relative, hits, counts)
+            scanned += size
+            files += 1
+        except OSError:
+            skipped += 1
+    return hits, counts, scanned, files, skipped
+
+
+def _batches(snapshot):
+    batch, batch_bytes = [], 0
+    for relative, absolute in snapshot.iter_files():
+        try:
+            size = os.path.getsize(absolute)
+        except OSError:
+            continue
+        batch.append(relative)
+        batch_bytes += size
+        if batch_bytes >= SCAN_BATCH_BYTES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def process_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=SCAN_WORKERS, mp_context=multiprocessing.get_context(SCAN_START_METHOD)
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+async def scan_snapshot(snapshot):
+    """Matches every signature against a snapshot on the process pool, keeping the event loop
+    free."""
+    if snapshot.key in _cache:
+        _cache.move_to_end(snapshot.key)
+        return _cache[snapshot.key]
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    batches = await asyncio.to_thread(lambda: list(_batches(snapshot)))
+    too_large = await asyncio.to_thread(snapshot.skipped_files)
+    pool = process_pool()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, scan_files, snapshot.path, batch) for batch in batches
+    ))
+
+    hits = {}
+    counts = {}
+    scanned = files = skipped = 0
+    for batch_hits, batch_counts, batch_bytes, batch_files, batch_skipped in results:
+        scanned += batch_bytes
+        files += batch_files
+        skipped += batch_skipped
+        for name, count in batch_counts.items():
+            counts[name] = counts.get(name, 0) + count
+        for name, found in batch_hits.items():
+            hits[name] = (hits.get(name, []) + found)[:SCAN_MAX_HITS]
+
+    by_prize = {}
+    for name, count in counts.items():
+        by_prize[SIGNATURE_PRIZES[name]] = by_prize.get(SIGNATURE_PRIZES[name], 0) + count
+    summary = {
+        "commit": snapshot.sha,
+        "files_scanned": files,
+        # Binary or unreadable; files over SNAPSHOT_MAX_FILE_BYTES are never extracted.
+        "files_skipped": skipped,
+        "files_too_large": len(too_large),
+        "bytes_scanned": scanned,
+        "seconds": round(time.perf_counter() - started, 3),
+        "matches_by_prize": by_prize,
+        "matches_by_signature": counts,
+        "hits": hits,
+    }
+    _cache[snapshot.key] = summary
+    while len(_cache) > SCAN_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return summary
+
+
+def signature_scan_tool(token):
+    """Function tool that scans a repository snapshot for prize signatures."""
+    async def scan_repository(repo_url: str) -> dict:
+        """Scans every file of a GitHub repository for Gemini, MongoDB and ElevenLabs signatures:
+        SDK imports, model names such as gemini-2.5-flash, mongodb:// and mongodb+srv://
+        connection strings, @elevenlabs/* packages and REST endpoints.
+
+        Returns match counts per prize and per signature, and file:line hits for each signature.
+
+        Args:
+            repo_url: The GitHub repository URL, e.g. https://github.com/owner/repo.
+        """
+        try:
+            return await scan_snapshot(await get_snapshot(repo_url, token))
+        except Exception as e:
+            return {"error": str(e)}
+
+    return scan_repository
@@ -1,8 +1,10 @@
 from google.adk.agents import Agent
+from ..tracing import tracing_callbacks
 
 root_agent = Agent(
     model="gemini-flash-latest",
     name="root_agent",
     description="A helpful assistant for user questions.",
     instruction="Answer user questions to the best of your knowledge",
+    **tracing_callbacks(),
 )
@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+from .github import github_client, parse_repo_url, resolve_ref
+
+SNAPSHOT_DIR = os.getenv(
+    "SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "mlh-sidekick-snapshots")
+)
+# Snapshots kept on disk; the least recently used are deleted beyond this.
+SNAPSHOT_MAX_REPOS = int(os.getenv("SNAPSHOT_MAX_REPOS", "500"))
+# Files above this size (minified bundles, datasets, binaries) are not extracted.
+SNAPSHOT_MAX_FILE_BYTES = int(os.getenv("SNAPSHOT_MAX_FILE_BYTES", str(2 * 1024 * 1024)))
+SNAPSHOT_MAX_TARBALL_BYTES = int(os.getenv("SNAPSHOT_MAX_TARBALL_BYTES", str(200 * 1024 * 1024)))
+
+SKIPPED_DIRS = {
+    ".git", "node_modules", "vendor", "dist", "build", ".next", "__pycache__", ".venv", "venv",
+}
+# Lists the files left out of a snapshot for their size, as JSON {path: size}.
+SKIPPED_FILES_NAME = ".sidekick-skipped.json"
+# Staging directories left behind by a crashed process are removed after this long.
+STALE_STAGING_SECONDS = 3600
+
+# target path -> [lock, number of callers holding or waiting for it]
+_locks = {}
+
+
+class SnapshotError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Snapshot:
+    """A repository extracted on local disk at one commit."""
+
+    def __init__(self, owner, repo, sha, path):
+        self.owner = owner
+        self.repo = repo
+        self.sha = sha
+        self.path = path
+
+    @property
+    def key(self):
+        return f"{self.owner.lower()}/{self.repo.lower()}@{self.sha}"
+
+    def iter_files(self):
+        """Yields (relative path, absolute path) for every extracted file."""
+        for root, dirs, files in os.walk(self.path):
+            dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
+            for name in files:
+                if root == self.path and name == SKIPPED_FILES_NAME:
+                    continue
+                absolute = os.path.join(root, name)
+                yield os.path.relpath(absolute, self.path), absolute
+
+    def skipped_files(self):
+        """{relative path: size} of the files not extracted because of SNAPSHOT_MAX_FILE_BYTES."""
+        path = os.path.join(self.path, SKIPPED_FILES_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _snapshot_path(owner, repo, sha):
+    return os.path.join(SNAPSHOT_DIR, owner.lower(), repo.lower(), sha)
+
+
+def _evict():
+    candidates = []
+    for owner in os.listdir(SNAPSHOT_DIR):
+        for repo in os.listdir(os.path.join(SNAPSHOT_DIR, owner)):
+            repo_dir = os.path.join(SNAPSHOT_DIR, owner, repo)
+            for sha in os.listdir(repo_dir):
+                path = os.path.join(repo_dir, sha)
+                if not os.path.isdir(path):
+                    continue
+                if ".partial-" not in sha:
+                    candidates.append((os.path.getatime(path), path))
+                elif time.time() - os.path.getmtime(path) > STALE_STAGING_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+    candidates.sort()
+    for _, path in candidates[:max(0, len(candidates) - SNAPSHOT_MAX_REPOS)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _extract(archive_path, target):
+    # Every attempt gets its own staging directory, so no two extractions share files.
+    staging = tempfile.mkdtemp(
+        prefix=f"{os.path.basename(target)}.partial-", dir=os.path.dirname(target)
+    )
+    try:
+        with tarfile.open(archive_path, "r:gz") as archive:
+            members = []
+            skipped = {}
+            for member in archive.getmembers():
+                if not member.isfile():
+                    continue
+                # Tarballs wrap everything in "<owner>-<repo>-<sha>/"; drop that prefix.
+                parts = member.name.split("/", 1)
+                if len(parts) < 2 or any(p in SKIPPED_DIRS for p in parts[1].split("/")):
+                    continue
+                if member.size > SNAPSHOT_MAX_FILE_BYTES:
+                    skipped[parts[1]] = member.size
+                    continue
+                member.name = parts[1]
+                members.append(member)
+            archive.extractall(staging, members=members, filter="data")
+        with open(os.path.join(staging, SKIPPED_FILES_NAME), "w", encoding="utf-8") as f:
+            json.dump(skipped, f)
+        if os.path.isdir(target):
+            # Another process finished the same commit first.
+            shutil.rmtree(staging, ignore_errors=True)
+        else:
+            os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _evict()
+
+
+@contextlib.asynccontextmanager
+async def _target_lock(target):
+    """Serializes work on one snapshot path; the lock is dropped once nobody holds or awaits it."""
+    entry = _locks.setdefault(target, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _locks.pop(target, None)
+
+
+async def get_snapshot(repo_url, token, ref=None):
+    """Downloads and extracts the repository at `ref` (default branch if unset) once per commit."""
+    parsed = parse_repo_url(repo_url)
+    if parsed is None:
+        raise SnapshotError(f"Not a GitHub repository URL: {repo_url}", 400)
+    owner, repo = parsed
+    try:
+        sha = await resolve_ref(owner, repo, ref, token)
+    except Exception as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        raise SnapshotError(f"Could not resolve {owner}/{repo}@{ref or 'HEAD'}: {e}", status) from e
+
+    target = _snapshot_path(owner, repo, sha)
+    async with _target_lock(target):
+        if os.path.isdir(target):
+            os.utime(target)
+            return Snapshot(owner, repo, sha, target)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        fd, archive_path = tempfile.mkstemp(suffix=".tar.gz", dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, "wb") as archive:
+                url = f"/repos/{owner}/{repo}/tarball/{sha}"
+                async with github_client().stream(
+                    "GET", url, headers=headers, follow_redirects=True
+                ) as response:
+                    if response.status_code != 200:
+                        raise SnapshotError(
+                            f"Tarball download for {owner}/{repo}@{sha} failed: "
+                            f"HTTP {response.status_code}",
+                            response.status_code,
+                        )
+                    written = 0
+                    async for chunk in response.aiter_bytes():
+                        written += len(chunk)
+                        if written > SNAPSHOT_MAX_TARBALL_BYTES:
+                            raise SnapshotError(
+                                f"{owner}/{repo} is larger than the snapshot limit", 413
+                            )
+                        archive.write(chunk)
+            await asyncio.to_thread(_extract, archive_path, target)
+        finally:
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+    return Snapshot(owner, repo, sha, target)
@@ -0,0 +1,224 @@
+import asyncio
+import copy
+import json
+import os
+import time
+from collections import OrderedDict
+
+from . import tracing
+from .github import resolve_ref
+from .run_context import tool_response_size
+
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "900"))
+# TTL for tools whose result is not pinned to a commit (search, issues, pull requests);
+# their answer can change at any time, so they are only shared briefly.
+TOOL_CACHE_UNPINNED_TTL_SECONDS = float(os.getenv("TOOL_CACHE_UNPINNED_TTL_SECONDS", "60"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "4096"))
+# Responses larger than this are not kept; they would evict many small hot entries.
+TOOL_CACHE_MAX_ENTRY_BYTES = int(os.getenv("TOOL_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+# How long a caller waits for an identical in-flight call before running its own.
+TOOL_CACHE_COALESCE_SECONDS = float(os.getenv("TOOL_CACHE_COALESCE_SECONDS", "60"))
+
+# Tools whose result depends on a git ref. The ref argument is pinned to a commit SHA
+# in the cache key, so "main" today and "main" after a push are different entries.
+REF_ARGUMENTS = {
+    "get_file_contents": "ref",
+    "get_repository_tree": "tree_sha",
+    "list_commits": "sha",
+}
+# get_file_contents reads a commit from "sha"; its "ref" argument only names branches and tags.
+PINNED_ARGUMENTS = {"get_file_contents": "sha"}
+
+
+def _ref_argument(tool_name, args):
+    """Returns the ref a ref-aware call reads, or False for other tools."""
+    ref_field = REF_ARGUMENTS.get(tool_name)
+    if not ref_field or not args.get("owner") or not args.get("repo"):
+        return False
+    ref = args.get(ref_field) or args.get("sha") or None
+    if isinstance(ref, str) and ref.startswith("refs/"):
+        ref = ref.split("/", 2)[-1]
+    return ref
+
+
+async def pin_ref(tool_name, args, token):
+    """Rewrites the ref of a ref-aware call to the commit it resolves to, in place.
+
+    The tool then reads the commit the cache key names, and the one a prefetch resolved for
+    the upload, instead of wherever the branch has moved since. Left as is if it cannot be
+    resolved.
+    """
+    ref = _ref_argument(tool_name, args)
+    if ref is False:
+        return
+    try:
+        sha = await resolve_ref(args["owner"], args["repo"], ref, token)
+    except Exception:
+        return
+    args.pop(REF_ARGUMENTS[tool_name], None)
+    args[PINNED_ARGUMENTS.get(tool_name, REF_ARGUMENTS[tool_name])] = sha
+
+
+def _is_error(response):
+    return isinstance(response, dict) and (response.get("isError") or response.get("error"))
+
+
+class ToolCallCache:
+    """Memoizes GitHub MCP tool calls across agents and concurrent requests.
+
+    Entries are keyed by tool name and canonicalized arguments, expire after a TTL
+    (a short one unless the key is pinned to a commit) and are evicted
+    least-recently-used. Identical calls that arrive while the first one is still
+    running wait for its result instead of hitting GitHub again.
+    """
+
+    def __init__(self, ttl, max_entries, unpinned_ttl=TOOL_CACHE_UNPINNED_TTL_SECONDS):
+        self.ttl = ttl
+        self.unpinned_ttl = unpinned_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.pending_keys = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "uncacheable": 0}
+
+    async def cache_key(self, tool_name, args, token):
+        """Returns (key, ttl), or (None, None) when the call must not be cached."""
+        canonical = {k: v for k, v in sorted((args or {}).items()) if v not in (None, "")}
+        for field in ("owner", "repo"):
+            if isinstance(canonical.get(field), str):
+                canonical[field] = canonical[field].lower()
+
+        ttl = self.unpinned_ttl
+        ref = _ref_argument(tool_name, canonical)
+        if ref is not False:
+            canonical.pop(REF_ARGUMENTS[tool_name], None)
+            canonical.pop("sha", None)
+            try:
+                canonical["@commit"] = await resolve_ref(
+                    canonical["owner"], canonical["repo"], ref, token
+                )
+            except Exception:
+                # Without a pinned commit the entry could go stale silently; do not cache.
+                return None, None
+            ttl = self.ttl
+        key = json.dumps({"tool": tool_name, "args": canonical}, sort_keys=True, default=str)
+        return key, ttl
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        response, expires_at = entry
+        if time.monotonic() > expires_at:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return response
+
+    def _put(self, key, response, ttl):
+        self.entries[key] = (response, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def callbacks(self, token):
+        async def before_tool(tool, args, tool_context):
+            started = time.perf_counter()
+            call_id = tool_context.function_call_id
+            await pin_ref(tool.name, args, token)
+            key, ttl = await self.cache_key(tool.name, args, token)
+            if key is None:
+                self.stats["uncacheable"] += 1
+                tracing.record_cache_lookup(call_id, "uncacheable", started)
+                return None
+
+            cached = self._get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                tracing.record_cache_lookup(call_id, "hit", started)
+                # Each caller gets its own copy; callbacks may edit the response they receive.
+                return copy.deepcopy(cached)
+
+            waiter = self.inflight.get(key)
+            if waiter is not None and not waiter.done():
+                try:
+                    response = await asyncio.wait_for(
+                        asyncio.shield(waiter), TOOL_CACHE_COALESCE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # The first call was probably cancelled with its run; take over.
+                    waiter.cancel()
+                except asyncio.CancelledError:
+                    if not waiter.cancelled():
+                        raise
+                else:
+                    self.stats["coalesced"] += 1
+                    tracing.record_cache_lookup(call_id, "coalesced", started)
+                    return copy.deepcopy(response)
+
+            self.stats["misses"] += 1
+            tracing.record_cache_lookup(call_id, "miss", started)
+            self.inflight[key] = asyncio.get_running_loop().create_future()
+            self._prune_pending()
+            self.pending_keys[call_id] = (key, ttl, time.monotonic())
+            return None
+
+        def release(call_id):
+            """Forgets a call that produced no cacheable result; coalesced callers run their own."""
+            key, _, _ = self.pending_keys.pop(call_id, (None, None, None))
+            waiter = self.inflight.pop(key, None) if key is not None else None
+            if waiter is not None and not waiter.done():
+                waiter.cancel()
+
+        async def after_tool(tool, args, tool_context, tool_response):
+            call_id = tool_context.function_call_id
+            if call_id not in self.pending_keys:
+                return None
+            too_large = tool_response_size(call_id, tool_response) > TOOL_CACHE_MAX_ENTRY_BYTES
+            if _is_error(tool_response) or too_large:
+                release(call_id)
+                return None
+            key, ttl, _ = self.pending_keys.pop(call_id)
+            waiter = self.inflight.pop(key, None)
+            # Stored separately from the response handed back to the agent that made the call.
+            self._put(key, copy.deepcopy(tool_response), ttl)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(tool_response)
+            return None
+
+        async def on_tool_error(tool, args, tool_context, error):
+            # A raising tool never reaches after_tool; release its waiters right away
+            # instead of leaving them to wait out TOOL_CACHE_COALESCE_SECONDS.
+            release(tool_context.function_call_id)
+            return None
+
+        return before_tool, after_tool, on_tool_error
+
+    def _prune_pending(self):
+        """Drops bookkeeping for calls abandoned without any callback (their run was cancelled).
+
+        Only entries older than the entry TTL go, so calls still in flight keep their keys.
+        """
+        if len(self.pending_keys) <= self.max_entries:
+            return
+        cutoff = time.monotonic() - self.ttl
+        stale = [c for c, (_, _, started) in self.pending_keys.items() if started < cutoff]
+        for call_id in stale:
+            key, _, _ = self.pending_keys.pop(call_id)
+            if all(other != key for other, _, _ in self.pending_keys.values()):
+                waiter = self.inflight.pop(key, None)
+                if waiter is not None and not waiter.done():
+                    waiter.cancel()
+
+    def snapshot(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        served = self.stats["hits"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_rate": round(served / lookups, 4) if lookups else None,
+        }
+
+
+tool_cache = ToolCallCache(TOOL_CACHE_TTL_SECONDS, TOOL_CACHE_MAX_ENTRIES)
@@ -0,0 +1,281 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+from .run_context import get_run, payload_size, tool_response_size
+
+AGENT_TRACING_ENABLED = os.getenv("AGENT_TRACING_ENABLED", "true").lower() == "true"
+# Runs whose traces are kept; the oldest are dropped first.
+TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", "500"))
+# Spans kept per run; a runaway agent loop cannot grow a trace without bound.
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "1000"))
+MAX_ARGUMENT_CHARS = 500
+
+
+def _compact(value):
+    text = json.dumps(value, default=str, sort_keys=True)
+    return text if len(text) <= MAX_ARGUMENT_CHARS else text[:MAX_ARGUMENT_CHARS] + "…"
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "kind", "start_us", "end_us", "attributes")
+
+    def __init__(self, span_id, parent, name, kind, start_us, attributes):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.start_us = start_us
+        self.end_us = None
+        self.attributes = attributes
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": self.start_us / 1000,
+            "duration_ms": (
+                (self.end_us - self.start_us) / 1000 if self.end_us is not None else None
+            ),
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Span tree of one agent run. Times are microseconds since the run started."""
+
+    def __init__(self, run):
+        self.run_id = run.id
+        self.agent_name = run.agent_name
+        self.started_at = run.started_at
+        # perf_counter() value that span times are measured from.
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+        self._counts = {}
+        self._open = {}
+        self.root = Span(0, None, "request", "request", 0, {"agent": run.agent_name})
+        self.spans.append(self.root)
+        # Parent of spans opened without an explicit one; the runner points it at the agent run.
+        self.scope = self.root.id
+
+    def _now(self):
+        return self.offset_us(time.perf_counter())
+
+    def offset_us(self, perf_counter):
+        """Converts a time.perf_counter() reading to microseconds since the run started."""
+        return int((perf_counter - self.origin) * 1_000_000)
+
+    def start(self, name, kind, parent=None, key=None, **attributes):
+        """Opens a span under `parent` (the current scope by default); `key` lets a later
+        callback close it."""
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        parent = self.scope if parent is None else parent
+        span = Span(len(self.spans), parent, name, kind, self._now(), attributes)
+        self.spans.append(span)
+        if key is not None:
+            self._open[key] = span
+        return span
+
+    def end(self, span, **attributes):
+        if span is None:
+            return
+        span.end_us = self._now()
+        span.attributes.update(attributes)
+
+    def end_key(self, key, **attributes):
+        self.end(self._open.pop(key, None), **attributes)
+
+    def open_span(self, key):
+        return self._open.get(key)
+
+    def count(self, kind):
+        """Spans of `kind` opened so far, including any dropped over TRACE_MAX_SPANS."""
+        return self._counts.get(kind, 0)
+
+    def finish(self, **attributes):
+        for key in list(self._open):
+            self.end_key(key, unfinished=True)
+        self.end(self.root, **attributes)
+
+    @property
+    def duration_ms(self):
+        if self.root.end_us is None:
+            return None
+        return (self.root.end_us - self.root.start_us) / 1000
+
+    def summary(self):
+        return {
+            "run_id": self.run_id,
+            "agent": self.agent_name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": len(self.spans),
+            **{k: v for k, v in self.root.attributes.items() if k != "agent"},
+        }
+
+    def as_dict(self):
+        return {**self.summary(), "dropped_spans": self.dropped, "tree": self.tree()}
+
+    def tree(self):
+        nodes = {span.id: {**span.as_dict(), "children": []} for span in self.spans}
+        for span in self.spans:
+            if span.parent is not None and span.parent in nodes:
+                nodes[span.parent]["children"].append(nodes[span.id])
+        return nodes[self.root.id]
+
+    def chrome_trace(self):
+        """Chrome trace-event JSON, for chrome://tracing, Perfetto or speedscope.
+
+        Spans that overlap without nesting (parallel tool calls) are put on separate lanes.
+        """
+        lanes = []
+        events = []
+        # Parents sort before children that start at the same time.
+        for span in sorted(self.spans, key=lambda s: (s.start_us, -(s.end_us or s.start_us))):
+            end = span.end_us if span.end_us is not None else span.start_us
+            for lane, stack in enumerate(lanes):
+                while stack and stack[-1] <= span.start_us:
+                    stack.pop()
+                if not stack or stack[-1] >= end:
+                    break
+            else:
+                lanes.append([])
+                lane, stack = len(lanes) - 1, lanes[-1]
+            stack.append(end)
+            events.append({
+                "name": span.name,
+                "cat": span.kind,
+                "ph": "X",
+                "ts": span.start_us,
+                "dur": end - span.start_us,
+                "pid": 1,
+                "tid": lane + 1,
+                "args": span.attributes,
+            })
+        events.append({
+            "name": "process_name", "ph": "M", "pid": 1,
+            "args": {"name": f"{self.agent_name} {self.run_id}"},
+        })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class TraceStore:
+    def __init__(self, retention):
+        self.retention = retention
+        self.traces = OrderedDict()
+
+    def add(self, trace):
+        self.traces[trace.run_id] = trace
+        while len(self.traces) > self.retention:
+            self.traces.popitem(last=False)
+
+    def get(self, run_id):
+        return self.traces.get(run_id)
+
+    def recent(self, agent=None, min_duration_ms=None, limit=50):
+        traces = [
+            t for t in reversed(self.traces.values())
+            if (agent is None or t.agent_name == agent)
+            and (min_duration_ms is None or (t.duration_ms or 0) >= min_duration_ms)
+        ]
+        return [t.summary() for t in traces[:limit]]
+
+
+trace_store = TraceStore(TRACE_RETENTION)
+
+
+def begin_run(run):
+    if AGENT_TRACING_ENABLED:
+        run.trace = Trace(run)
+        trace_store.add(run.trace)
+    return run.trace
+
+
+def _trace():
+    run = get_run()
+    return run.trace if run is not None else None
+
+
+async def before_tool(tool, args, tool_context):
+    trace = _trace()
+    if trace is not None:
+        trace.start(
+            tool.name, "tool", key=tool_context.function_call_id,
+            arguments=_compact(args or {}), request_bytes=payload_size(args or {}),
+        )
+    return None
+
+
+async def after_tool(tool, args, tool_context, tool_response):
+    trace = _trace()
+    if trace is not None:
+        error = isinstance(tool_response, dict) and bool(
+            tool_response.get("isError") or tool_response.get("error")
+        )
+        call_id = tool_context.function_call_id
+        trace.end_key(
+            call_id, response_bytes=tool_response_size(call_id, tool_response), error=error
+        )
+    return None
+
+
+async def before_model(callback_context, llm_request):
+    trace = _trace()
+    if trace is not None:
+        turn = trace.count("llm") + 1
+        trace.start(
+            f"llm turn {turn}", "llm", key="@model",
+            model=llm_request.model, contents=len(llm_request.contents or []),
+        )
+    return None
+
+
+async def after_model(callback_context, llm_response):
+    trace = _trace()
+    if trace is None:
+        return None
+    usage = getattr(llm_response, "usage_metadata", None)
+    tokens = {}
+    if usage is not None:
+        tokens = {
+            "input_tokens": usage.prompt_token_count,
+            "output_tokens": usage.candidates_token_count,
+            "cached_input_tokens": getattr(usage, "cached_content_token_count", None),
+        }
+    parts = llm_response.content.parts if llm_response.content else []
+    calls = [p.function_call.name for p in parts or [] if p.function_call]
+    trace.end_key("@model", tool_calls=calls, **{k: v for k, v in tokens.items() if v is not None})
+    return None
+
+
+def record_cache_lookup(function_call_id, outcome, started):
+    """Adds a cache-lookup child span under the open tool span of this call."""
+    trace = _trace()
+    if trace is None:
+        return
+    parent = trace.open_span(function_call_id)
+    span = trace.start(
+        "cache lookup", "cache", parent=parent.id if parent else None, outcome=outcome
+    )
+    if span is not None:
+        span.start_us = trace.offset_us(started)
+        trace.end(span)
+    if parent is not None:
+        parent.attributes["cache"] = outcome
+
+
+def tracing_callbacks():
+    """Callbacks for agents that do not use agent_callbacks (no GitHub MCP tools)."""
+    return {
+        "before_tool_callback": [before_tool],
+        "after_tool_callback": [after_tool],
+        "before_model_callback": [before_model],
+        "after_model_callback": [after_model],
+    }
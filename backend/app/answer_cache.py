@@ -0,0 +1,117 @@
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+# Cosine similarity above which a new question is treated as a repeat of a cached one.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+
+EMBEDDING_DIMENSIONS = 4096
+CHAR_NGRAM = 3
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_question(text):
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def embed(text):
+    """Hashed bag of character trigrams, words and word pairs, L2-normalized.
+
+    Cheap enough to run on every request, and robust to casing, punctuation and
+    small rewordings of the same question.
+    """
+    normalized = normalize_question(text)
+    words = normalized.split()
+    padded = f" {normalized} "
+    features = [padded[i:i + CHAR_NGRAM] for i in range(len(padded) - CHAR_NGRAM + 1)]
+    features += [f"w:{w}" for w in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        # The top bit picks a sign so that hash collisions tend to cancel out.
+        vector[h % EMBEDDING_DIMENSIONS] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """Serves stored answers to questions that are near-duplicates of earlier ones.
+
+    Embeddings live in one preallocated matrix, so a lookup is a single
+    matrix-vector product. Entries expire after a TTL and the least recently
+    used one is replaced when the cache is full.
+    """
+
+    def __init__(self, max_entries, ttl, threshold):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.vectors = np.zeros((max_entries, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        self.entries = OrderedDict()  # slot -> (question, answer, stored_at)
+        self.free = list(range(max_entries - 1, -1, -1))
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _release(self, slot):
+        del self.entries[slot]
+        self.vectors[slot] = 0
+        self.free.append(slot)
+
+    def lookup(self, question):
+        if not self.entries:
+            self.stats["misses"] += 1
+            return None
+        vector = embed(question)
+        scores = self.vectors @ vector
+        now = time.monotonic()
+        for slot in np.argsort(scores)[::-1]:
+            slot = int(slot)
+            if scores[slot] < self.threshold:
+                break
+            if slot not in self.entries:
+                continue
+            _, answer, stored_at = self.entries[slot]
+            if now - stored_at > self.ttl:
+                self._release(slot)
+                self.stats["expired"] += 1
+                continue
+            self.entries.move_to_end(slot)
+            self.stats["hits"] += 1
+            return {"answer": answer, "similarity": round(float(scores[slot]), 4)}
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, question, answer):
+        if not self.free:
+            slot, _ = next(iter(self.entries.items()))
+            self._release(slot)
+            self.stats["evictions"] += 1
+        slot = self.free.pop()
+        self.vectors[slot] = embed(question)
+        self.entries[slot] = (question, answer, time.monotonic())
+
+    def clear(self):
+        for slot in list(self.entries):
+            self._release(slot)
+
+    def snapshot(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "threshold": self.threshold,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+answer_cache = AnswerCache(
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_THRESHOLD
+)
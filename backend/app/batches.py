@@ -0,0 +1,337 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from agents import cassettes
+from agents.code_reviewer_agent.agent import GITHUB_TOKEN
+
+from .db import result_writer
+from .prizes import PRIZES
+from .results import RESULT_COLUMNS, flatten_result, result_store
+from .runner import run_agent
+from .scheduler import BULK
+from .similarity import index_in_background
+from .submissions import CsvRecordParser, CsvValidationError, missing_columns, submission_fields
+from .tasks import (
+    FAILED, TASK_POLL_SECONDS, TASK_SETTLE_SECONDS, cancel_tasks, decode, enqueue_tasks,
+    finished_tasks, queue_enabled, task_record,
+)
+
+BATCH_SPOOL_DIR = os.getenv(
+    "BATCH_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "mlh-sidekick-batches")
+)
+# Batch tasks handed to the scheduler at once; the scheduler still decides what actually runs.
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "32"))
+# Finished batches kept (with their spool files) before the oldest is dropped.
+BATCH_RETENTION = int(os.getenv("BATCH_RETENTION", "50"))
+BATCH_FORMATS = ("csv", "jsonl")
+
+
+class Batch:
+    def __init__(self, prizes, event_id=None, prefetch=None):
+        self.id = uuid.uuid4().hex
+        self.prizes = prizes
+        self.event_id = event_id
+        # The upload's PrefetchJob, whose resolved SHAs are stored on the submissions.
+        self.prefetch = prefetch
+        self.status = "uploading"
+        self.created_at = time.time()
+        self.rows = 0
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.error = None
+        self.path = os.path.join(BATCH_SPOOL_DIR, f"{self.id}.jsonl")
+        self.tasks = deque()
+        self.changed = asyncio.Event()
+        self._workers = []
+        self._uploaded = False
+
+    @property
+    def done(self):
+        return self._uploaded and self.completed + self.failed >= self.total
+
+    @property
+    def finished(self):
+        """No more results will be written: every check ran, or the batch failed or was
+        cancelled."""
+        return self.done or self.status in ("failed", "cancelled")
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "prizes": self.prizes,
+            "event_id": self.event_id,
+            "rows": self.rows,
+            "total_checks": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def _commit_sha(self, fields):
+        return self.prefetch.sha_for(fields["repo_url"]) if self.prefetch else None
+
+    def _index(self, fields):
+        # Every submission is indexed, so the originality checks see the whole event.
+        index_in_background(fields["repo_url"], GITHUB_TOKEN, self._commit_sha(fields))
+
+    def enqueue(self, row_number, fields):
+        if self.status == "cancelled":
+            return
+        self.rows += 1
+        self._index(fields)
+        submission_id = None
+        if self.event_id:
+            submission_id = result_writer.add_submission(
+                self.event_id, fields, self.id, row_number, self._commit_sha(fields),
+            )
+        for prize in self.prizes:
+            self.tasks.append((row_number, prize, fields, submission_id))
+            self.total += 1
+        while len(self._workers) < BATCH_MAX_IN_FLIGHT and len(self._workers) < len(self.tasks):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def _work(self):
+        with open(self.path, "a", encoding="utf-8") as out:
+            while self.tasks:
+                row_number, prize_name, fields, submission_id = self.tasks.popleft()
+                prize = PRIZES[prize_name]
+                try:
+                    with cassettes.judging():
+                        result = await run_agent(prize.agent, prize.build_prompt(fields), BULK)
+                    self.completed += 1
+                except Exception as e:
+                    print(f"Batch {self.id}: {prize_name} check for row {row_number} failed: {e}")
+                    result = {"error": str(e)}
+                    self.failed += 1
+                row = flatten_result(
+                    prize_name, result,
+                    batch_id=self.id, row_number=row_number,
+                    project_title=fields["project_title"], submission_url=fields["repo_url"],
+                )
+                result_store.add(row)
+                if submission_id:
+                    result_writer.add_prize_check(self.event_id, submission_id, row, result)
+                out.write(json.dumps({**row, "result": result}) + "\n")
+                out.flush()
+                if self.done:
+                    self.status = "done"
+                self._notify()
+        current = asyncio.current_task()
+        self._workers = [w for w in self._workers if not w.done() and w is not current]
+
+    async def flush_enqueued(self):
+        """Called after each upload chunk; checks already run as they are enqueued."""
+
+    def finish_upload(self):
+        self._uploaded = True
+        if self.status != "cancelled":
+            self.status = "done" if self.done else "running"
+        self._notify()
+
+    async def cancel(self):
+        """Drops the checks not started yet and cancels the running ones; results already
+        written stay in the spool."""
+        if self.finished:
+            return
+        self.status = "cancelled"
+        self.tasks.clear()
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._notify()
+
+    def fail(self, error):
+        self.status = "failed"
+        self.error = error
+        self.tasks.clear()
+        self._uploaded = True
+        self._notify()
+
+    async def ingest(self, chunks):
+        """Parses the upload chunk by chunk, enqueueing checks as soon as each row is complete."""
+        parser = CsvRecordParser()
+        header = None
+
+        def handle(records):
+            nonlocal header
+            for record in records:
+                if header is None:
+                    header = [c.strip() for c in record]
+                    missing = missing_columns(header)
+                    if missing:
+                        raise CsvValidationError(f"Missing expected columns: {missing}")
+                    self.status = "running"
+                    continue
+                row = dict(zip(header, record))
+                self.enqueue(self.rows + 1, submission_fields(row))
+
+        async for chunk in chunks:
+            if self.status == "cancelled":
+                break
+            handle(parser.feed(chunk))
+            await self.flush_enqueued()
+        handle(parser.close())
+        await self.flush_enqueued()
+        if header is None:
+            raise CsvValidationError("The uploaded CSV is empty.")
+        self.finish_upload()
+
+    async def stream_results(self, fmt):
+        """Yields result lines as they are written, until every check has finished."""
+        if fmt == "csv":
+            yield _csv_line(RESULT_COLUMNS)
+        position = 0
+        while True:
+            changed = self.changed
+            finished = self.finished
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as spool:
+                    spool.seek(position)
+                    for line in iter(spool.readline, ""):
+                        if not line.endswith("\n"):
+                            break
+                        position += len(line.encode("utf-8"))
+                        if fmt == "jsonl":
+                            yield line
+                        else:
+                            record = json.loads(line)
+                            yield _csv_line([record[c] for c in RESULT_COLUMNS])
+            if finished:
+                return
+            await changed.wait()
+
+
+class QueuedBatch(Batch):
+    """A batch judged by `app.worker` processes (JUDGING_MODE=queue).
+
+    Rows become JudgingTask rows after each upload chunk; finished tasks are
+    followed from the table into the spool, so results stream as with Batch.
+    """
+
+    def __init__(self, prizes, event_id=None, prefetch=None):
+        super().__init__(prizes, event_id, prefetch)
+        self._records = []
+        self._follower = None
+
+    def enqueue(self, row_number, fields):
+        self.rows += 1
+        self._index(fields)
+        submission_id = result_writer.add_submission(
+            self.event_id, fields, self.id, row_number, self._commit_sha(fields),
+        )
+        for prize in self.prizes:
+            self._records.append(task_record(
+                prize, fields, BULK,
+                event_id=self.event_id, batch_id=self.id, submission_id=submission_id,
+                row_number=row_number,
+            ))
+            self.total += 1
+
+    async def flush_enqueued(self):
+        if not self._records or self.status == "cancelled":
+            return
+        records, self._records = self._records, []
+        # Workers write PrizeCheck rows that reference these submissions.
+        await result_writer.flush()
+        await enqueue_tasks(records)
+        if self._follower is None:
+            self._follower = asyncio.create_task(self._follow())
+
+    async def cancel(self):
+        """Cancels the batch's unfinished JudgingTasks; workers running one stop it when
+        their next heartbeat finds the lease gone."""
+        if self.finished:
+            return
+        await super().cancel()
+        self._records = []
+        await cancel_tasks(self.id)
+
+    async def _follow(self):
+        # Every finish up to `cursor` has been read. `recent` maps the ids read above it to
+        # (finishedSeq, when they were read); the cursor passes them once they are older
+        # than TASK_SETTLE_SECONDS, when no finish with a lower value can still commit.
+        cursor, recent = 0, {}
+        while not self.finished:
+            settled_at = time.monotonic() - TASK_SETTLE_SECONDS
+            settled = [seq for seq, read_at in recent.values() if read_at <= settled_at]
+            if settled:
+                cursor = max(settled)
+                recent = {k: v for k, v in recent.items() if v[0] > cursor}
+            try:
+                tasks = await finished_tasks(self.id, cursor, recent)
+            except Exception as e:
+                print(f"Batch {self.id}: error reading finished tasks: {e}")
+                tasks = []
+            if not tasks:
+                await asyncio.sleep(TASK_POLL_SECONDS)
+                continue
+            read_at = time.monotonic()
+            with open(self.path, "a", encoding="utf-8") as out:
+                for task in tasks:
+                    recent[task["id"]] = (task["finishedSeq"], read_at)
+                    record = decode(task["result"])
+                    if record is None:
+                        # Leases expired too often for any worker to store a result.
+                        fields = decode(task["fields"])
+                        result = {"error": task["error"]}
+                        record = {**flatten_result(
+                            task["prize"], result,
+                            batch_id=self.id, row_number=task["rowNumber"],
+                            project_title=fields.get("project_title"),
+                            submission_url=fields.get("repo_url"),
+                        ), "result": result}
+                    if task["status"] == FAILED:
+                        self.failed += 1
+                    else:
+                        self.completed += 1
+                    result_store.add({k: v for k, v in record.items() if k != "result"})
+                    out.write(json.dumps(record) + "\n")
+            if self.done:
+                self.status = "done"
+            self._notify()
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+class BatchRegistry:
+    def __init__(self, retention):
+        self.retention = retention
+        self.batches = OrderedDict()
+
+    def create(self, prizes, event_id=None, prefetch=None):
+        os.makedirs(BATCH_SPOOL_DIR, exist_ok=True)
+        batch = (QueuedBatch if queue_enabled() else Batch)(prizes, event_id, prefetch)
+        self.batches[batch.id] = batch
+        while len(self.batches) > self.retention:
+            oldest = next(iter(self.batches.values()))
+            if not oldest.finished:
+                break
+            self.batches.popitem(last=False)
+            if os.path.exists(oldest.path):
+                os.remove(oldest.path)
+        return batch
+
+    def get(self, batch_id):
+        return self.batches.get(batch_id)
+
+
+batches = BatchRegistry(BATCH_RETENTION)
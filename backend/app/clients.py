@@ -0,0 +1,24 @@
+import httpx
+import litellm
+
+# One pooled client for the whole process so DNS/TLS setup is paid once per upstream
+# host instead of once per request. LiteLLM is pointed at the same pool.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=120)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+_http_client = None
+
+
+def get_http_client():
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        litellm.aclient_session = _http_client
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
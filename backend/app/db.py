@@ -0,0 +1,392 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+import uuid
+from datetime import datetime, timezone
+
+import asyncpg
+
+from .results import FilterError, flatten_result, result_store
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Rows buffered before a COPY is forced, and the longest a row waits in the buffer.
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+DB_FLUSH_INTERVAL_SECONDS = float(os.getenv("DB_FLUSH_INTERVAL_SECONDS", "2"))
+DEFAULT_EVENT_NAME = os.getenv("DEFAULT_EVENT_NAME", "Ad-hoc checks")
+# Rows Postgres rejects (e.g. a NUL byte or an out-of-range integer) are appended here
+# instead of blocking every later write.
+DB_QUARANTINE_PATH = os.getenv(
+    "DB_QUARANTINE_PATH", os.path.join(tempfile.gettempdir(), "mlh-sidekick-quarantine.jsonl")
+)
+
+SUBMISSION_COLUMNS = [
+    "id", "eventId", "batchId", "rowNumber", "projectTitle", "repoUrl",
+    "commitSha", "projectNumber", "projectUrl",
+]
+# PrizeCheck column -> flattened result column (see app/results.py).
+PRIZE_CHECK_FIELDS = {
+    "prize": "prize",
+    "finalDetermination": "final_determination",
+    "usageDetected": "usage_detected",
+    "usageEvidence": "usage_evidence",
+    "modelUsed": "model_used",
+    "projectNumberValid": "project_number_valid",
+    "isAiStudioPrototype": "is_ai_studio_prototype",
+    "domainUrl": "domain_url",
+    "detectedTld": "detected_tld",
+    "isActive": "is_active",
+    "httpStatus": "http_status",
+    "primaryLanguage": "primary_language",
+    "driverLibrary": "driver_library",
+    "usesAtlas": "uses_atlas",
+    "connectionMethod": "connection_method",
+    "integrationType": "integration_type",
+    "featuresDetected": "features_detected",
+    "apiKeyFound": "api_key_found",
+    "error": "error",
+}
+PRIZE_CHECK_COLUMNS = ["id", "eventId", "submissionId", *PRIZE_CHECK_FIELDS, "result", "checkedAt"]
+EVIDENCE_COLUMNS = ["id", "prizeCheckId", "kind", "filePath", "line", "detail"]
+# Written in this order, so rows only ever reference rows already in the database.
+TABLE_COLUMNS = {
+    "Submission": SUBMISSION_COLUMNS,
+    "PrizeCheck": PRIZE_CHECK_COLUMNS,
+    "Evidence": EVIDENCE_COLUMNS,
+}
+
+# Flattened result column -> expression over the PrizeCheck (pc) / Submission (s) join.
+RESULT_SQL_COLUMNS = {
+    **{column: f'pc."{field}"' for field, column in PRIZE_CHECK_FIELDS.items()},
+    "batch_id": 's."batchId"',
+    "row_number": 's."rowNumber"',
+    "project_title": 's."projectTitle"',
+    "submission_url": 's."repoUrl"',
+    "checked_at": 'extract(epoch from pc."checkedAt")',
+}
+
+# Errors caused by the rows themselves; writing the same rows again can never succeed.
+BAD_ROW_ERRORS = (
+    asyncpg.DataError, asyncpg.IntegrityConstraintViolationError,
+    ValueError, TypeError, OverflowError,
+)
+
+# "src/db.js line 12" / "src/db.js:12" style references inside usage_evidence.
+_FILE_LINE_RE = re.compile(r"([\w./-]+\.\w+)(?::|,?\s+line\s+)(\d+)")
+
+_pool = None
+_event_ids = {}
+
+
+def database_configured():
+    return DATABASE_URL.startswith(("postgres://", "postgresql://"))
+
+
+async def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=DB_POOL_MAX_SIZE)
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+    _pool = None
+
+
+def new_id():
+    return str(uuid.uuid4())
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "event"
+
+
+async def ensure_event(name):
+    """Returns the id of the event with this name, creating it on first use."""
+    pool = await get_pool()
+    return await pool.fetchval(
+        'INSERT INTO "Event" ("id", "name", "slug") VALUES ($1, $2, $3) '
+        'ON CONFLICT ("slug") DO UPDATE SET "name" = EXCLUDED."name" RETURNING "id"',
+        new_id(), name, slugify(name),
+    )
+
+
+async def event_id_for(name):
+    if name not in _event_ids:
+        _event_ids[name] = await ensure_event(name)
+    return _event_ids[name]
+
+
+def evidence_records(prize_check_id, row):
+    evidence = row.get("usage_evidence")
+    if not evidence:
+        return []
+    refs = _FILE_LINE_RE.findall(evidence)
+    if not refs:
+        return [(new_id(), prize_check_id, "usage", None, None, evidence)]
+    return [(new_id(), prize_check_id, "usage", path, int(line), evidence) for path, line in refs]
+
+
+class ResultWriter:
+    """Buffers judging results and writes them with COPY instead of one INSERT per row.
+
+    Submissions are always flushed before the prize checks that reference them, in
+    the same transaction.
+    """
+
+    def __init__(self):
+        self.submissions = []
+        self.prize_checks = []
+        self.evidence = []
+        self._lock = asyncio.Lock()
+        self._flusher = None
+        # The flush started early because the buffers filled up, if one is running.
+        self._size_flush = None
+        self.enabled = database_configured()
+
+    def start(self):
+        if self.enabled and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._size_flush is not None:
+            await self._size_flush
+            self._size_flush = None
+        await self.flush()
+
+    def _pending(self):
+        return len(self.submissions) + len(self.prize_checks) + len(self.evidence)
+
+    def add_submission(self, event_id, fields, batch_id=None, row_number=None, commit_sha=None):
+        submission_id = new_id()
+        if self.enabled:
+            self.submissions.append((
+                submission_id, event_id, batch_id, row_number, fields.get("project_title"),
+                fields.get("repo_url") or fields.get("project_url") or "", commit_sha,
+                fields.get("project_number"), fields.get("project_url"),
+            ))
+            self._maybe_flush()
+        return submission_id
+
+    def add_prize_check(self, event_id, submission_id, row, result):
+        if not self.enabled:
+            return None
+        prize_check_id = new_id()
+        # Prisma DateTime columns are timestamp(3) without time zone, holding UTC.
+        checked_at = datetime.fromtimestamp(row.get("checked_at") or 0, tz=timezone.utc)
+        checked_at = checked_at.replace(tzinfo=None)
+        self.prize_checks.append((
+            prize_check_id, event_id, submission_id,
+            *(row.get(field) for field in PRIZE_CHECK_FIELDS.values()),
+            json.dumps(result, default=str), checked_at,
+        ))
+        self.evidence.extend(evidence_records(prize_check_id, row))
+        self._maybe_flush()
+        return prize_check_id
+
+    def _maybe_flush(self):
+        if self._pending() < DB_WRITE_BATCH_SIZE:
+            return
+        # One at a time: a running flush takes whatever is buffered when it starts, and
+        # holding the task keeps it from being garbage-collected mid-COPY.
+        if self._size_flush is None or self._size_flush.done():
+            self._size_flush = asyncio.create_task(self._safe_flush())
+
+    async def _safe_flush(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Error flushing results to the database: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(DB_FLUSH_INTERVAL_SECONDS)
+            await self._safe_flush()
+
+    def _take_units(self):
+        """Empties the buffers into write units: a submission, or a prize check and its evidence."""
+        evidence = {}
+        for record in self.evidence:
+            evidence.setdefault(record[1], []).append(record)
+        units = [{"Submission": [record]} for record in self.submissions]
+        units.extend(
+            {"PrizeCheck": [record], "Evidence": evidence.pop(record[0], [])}
+            for record in self.prize_checks
+        )
+        units.extend({"Evidence": records} for records in evidence.values())
+        self.submissions, self.prize_checks, self.evidence = [], [], []
+        return units
+
+    def _restore(self, units):
+        """Puts unwritten units back at the front of the buffers for the next flush."""
+        self.submissions[:0] = [r for unit in units for r in unit.get("Submission", [])]
+        self.prize_checks[:0] = [r for unit in units for r in unit.get("PrizeCheck", [])]
+        self.evidence[:0] = [r for unit in units for r in unit.get("Evidence", [])]
+
+    async def _copy(self, units):
+        pool = await get_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            for table, columns in TABLE_COLUMNS.items():
+                records = [r for unit in units for r in unit.get(table, [])]
+                if records:
+                    await conn.copy_records_to_table(table, records=records, columns=columns)
+
+    def _quarantine(self, unit, error):
+        print(f"Quarantining rows rejected by the database ({error}) in {DB_QUARANTINE_PATH}")
+        entry = {
+            "error": f"{type(error).__name__}: {error}",
+            "rows": {
+                table: [dict(zip(TABLE_COLUMNS[table], record)) for record in records]
+                for table, records in unit.items() if records
+            },
+        }
+        with open(DB_QUARANTINE_PATH, "a", encoding="utf-8") as out:
+            out.write(json.dumps(entry, default=str) + "\n")
+
+    async def _write(self, units):
+        """Writes units in order, bisecting a rejected batch so only the bad rows are quarantined.
+
+        Returns how many leading units were written or quarantined before an error that is
+        not about the rows (e.g. the database is down) stopped it.
+        """
+        try:
+            await self._copy(units)
+        except BAD_ROW_ERRORS as e:
+            if len(units) == 1:
+                self._quarantine(units[0], e)
+                return 1
+            middle = len(units) // 2
+            done = await self._write(units[:middle])
+            if done < middle:
+                return done
+            return middle + await self._write(units[middle:])
+        except Exception as e:
+            print(f"Error writing results to the database: {e}")
+            return 0
+        return len(units)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending():
+                return
+            units = self._take_units()
+            # One immediate retry covers a dropped connection; after that the rows wait for
+            # the next flush, and rows the database rejects are quarantined, not retried.
+            for _ in range(2):
+                done = await self._write(units)
+                units = units[done:]
+                if not units:
+                    return
+            self._restore(units)
+            raise RuntimeError(f"{len(units)} result rows could not be written; will retry")
+
+
+async def record_check(prize, fields, result, event=DEFAULT_EVENT_NAME):
+    """Stores a single (non-batch) check in memory and, when configured, in Postgres."""
+    row = flatten_result(
+        prize, result,
+        project_title=fields.get("project_title"),
+        submission_url=fields.get("repo_url") or fields.get("project_url"),
+    )
+    result_store.add(row)
+    if result_writer.enabled:
+        try:
+            event_id = await event_id_for(event)
+            submission_id = result_writer.add_submission(event_id, fields)
+            result_writer.add_prize_check(event_id, submission_id, row, result)
+        except Exception as e:
+            print(f"Error recording {prize} check: {e}")
+    return row
+
+
+async def query_prize_checks(event_id, prize=None, determination=None, offset=0, limit=100):
+    """Paginated verdicts for one event, served by the (event, prize, determination) index."""
+    conditions = ['pc."eventId" = $1']
+    args = [event_id]
+    if prize:
+        args.append(prize)
+        conditions.append(f'pc."prize" = ${len(args)}')
+    if determination:
+        args.append(determination)
+        conditions.append(f'pc."finalDetermination" = ${len(args)}')
+    where = " AND ".join(conditions)
+    args.extend([limit, offset])
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        total = await conn.fetchval(
+            f'SELECT count(*) FROM "PrizeCheck" pc WHERE {where}', *args[:-2]
+        )
+        rows = await conn.fetch(
+            f'SELECT pc.*, s."repoUrl", s."projectTitle", s."commitSha" '
+            f'FROM "PrizeCheck" pc JOIN "Submission" s ON s."id" = pc."submissionId" '
+            f'WHERE {where} ORDER BY pc."checkedAt" DESC '
+            f'LIMIT ${len(args) - 1} OFFSET ${len(args)}',
+            *args,
+        )
+    items = []
+    for record in rows:
+        item = dict(record)
+        if isinstance(item["result"], str):
+            item["result"] = json.loads(item["result"])
+        items.append(item)
+    return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+def _result_conditions(filters):
+    conditions, args = [], []
+    for column, expected in filters.items():
+        if column not in RESULT_SQL_COLUMNS:
+            raise FilterError(f"{column} is not stored in the database and cannot be filtered on")
+        args.append(list(expected) if isinstance(expected, (list, tuple, set)) else expected)
+        operator = "= ANY" if isinstance(args[-1], list) else "="
+        conditions.append(f"{RESULT_SQL_COLUMNS[column]} {operator}(${len(args)})")
+    return " AND ".join(conditions) or "TRUE", args
+
+
+def _stored_row(record):
+    result = json.loads(record["result"]) if isinstance(record["result"], str) else record["result"]
+    return flatten_result(
+        record["prize"], result,
+        batch_id=record["batchId"], row_number=record["rowNumber"],
+        project_title=record["projectTitle"], submission_url=record["repoUrl"],
+        checked_at=record["checkedAt"].replace(tzinfo=timezone.utc).timestamp(),
+    )
+
+
+async def query_stored_results(filters=None, offset=0, limit=None):
+    """Flattened judgments from Postgres, filtered and paginated like ResultStore.query."""
+    where, args = _result_conditions(filters or {})
+    joined = 'FROM "PrizeCheck" pc JOIN "Submission" s ON s."id" = pc."submissionId"'
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        total = await conn.fetchval(f"SELECT count(*) {joined} WHERE {where}", *args)
+        rows = await conn.fetch(
+            f'SELECT pc."prize", pc."result", pc."checkedAt", s."batchId", s."rowNumber", '
+            f's."projectTitle", s."repoUrl" {joined} WHERE {where} '
+            f'ORDER BY pc."checkedAt", pc."id" LIMIT ${len(args) + 1} OFFSET ${len(args) + 2}',
+            *args, limit, offset,
+        )
+    items = [_stored_row(r) for r in rows]
+    return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+async def list_events():
+    pool = await get_pool()
+    rows = await pool.fetch(
+        'SELECT e."id", e."name", e."slug", e."createdAt", count(s."id") AS "submissions" '
+        'FROM "Event" e LEFT JOIN "Submission" s ON s."eventId" = e."id" '
+        'GROUP BY e."id" ORDER BY e."createdAt" DESC'
+    )
+    return [dict(r) for r in rows]
+
+
+result_writer = ResultWriter()
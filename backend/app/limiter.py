@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+
+from .metrics import registry
+from .scheduler import scheduler, AGENT_MAX_CONCURRENCY
+
+AGENT_MIN_CONCURRENCY = int(os.getenv("AGENT_MIN_CONCURRENCY", "2"))
+AGENT_INITIAL_CONCURRENCY = int(os.getenv("AGENT_INITIAL_CONCURRENCY", "8"))
+# p95 run latency above which the limit stops growing.
+AGENT_LATENCY_TARGET_SECONDS = float(os.getenv("AGENT_LATENCY_TARGET_SECONDS", "120"))
+# Error rate over the recent window above which the limit stops growing.
+AGENT_ERROR_RATE_TARGET = float(os.getenv("AGENT_ERROR_RATE_TARGET", "0.05"))
+AGENT_BACKOFF_FACTOR = float(os.getenv("AGENT_BACKOFF_FACTOR", "0.5"))
+# Minimum time between two multiplicative decreases, so one burst of 429s only halves once.
+AGENT_BACKOFF_COOLDOWN_SECONDS = float(os.getenv("AGENT_BACKOFF_COOLDOWN_SECONDS", "10"))
+
+# GitHub reports both primary and secondary rate limits as 403/429 with one of these.
+_RATE_LIMIT_RE = re.compile(r"rate.?limit|too many requests|\b429\b", re.IGNORECASE)
+
+OK = "ok"
+THROTTLED = "throttled"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+def classify_exception(exc):
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return TIMEOUT
+    name = type(exc).__name__
+    text = str(exc)
+    if "RateLimit" in name or "429" in text or "rate limit" in text.lower():
+        return THROTTLED
+    if "Timeout" in name or "timed out" in text.lower():
+        return TIMEOUT
+    return ERROR
+
+
+def classify_tool_result(response):
+    """MCP tools report upstream failures, GitHub rate limits included, as isError results
+    rather than exceptions, and the function tools return {"error": ...}."""
+    if not isinstance(response, dict) or not (response.get("isError") or response.get("error")):
+        return OK
+    if _RATE_LIMIT_RE.search(json.dumps(response, default=str)):
+        return THROTTLED
+    return ERROR
+
+
+class AdaptiveLimiter:
+    """AIMD controller for the scheduler's capacity.
+
+    The limit grows by one after a full window of healthy runs (p95 latency and
+    error rate under target, and enough demand to use the extra slot), and is cut
+    multiplicatively on throttling or timeouts.
+    """
+
+    def __init__(self, target, minimum, maximum, initial):
+        self.target = target
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(maximum, initial))
+        self.latencies = deque(maxlen=256)
+        self.outcomes = deque(maxlen=256)
+        self.successes_since_change = 0
+        self.last_decrease = 0.0
+        self._apply()
+
+    def _apply(self):
+        self.target.capacity = self.limit
+        registry.gauge("agent_concurrency_limit").set(self.limit)
+
+    def _p95(self):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for o in self.outcomes if o != OK) / len(self.outcomes)
+
+    def backoff(self):
+        now = time.monotonic()
+        if now - self.last_decrease >= AGENT_BACKOFF_COOLDOWN_SECONDS:
+            self.last_decrease = now
+            self.limit = max(self.minimum, int(self.limit * AGENT_BACKOFF_FACTOR))
+            self.successes_since_change = 0
+            self._apply()
+
+    def record_throttled_tool(self, tool):
+        """Backs off as soon as a tool call is rate limited, without waiting for the run to end."""
+        registry.counter("tool_calls_throttled_total", tool=tool).inc()
+        self.backoff()
+
+    def record(self, latency, outcome, backed_off=False):
+        """Records a finished run; `backed_off` when its throttling was already acted on."""
+        self.outcomes.append(outcome)
+        registry.counter("agent_runs_total", outcome=outcome).inc()
+
+        if outcome in (THROTTLED, TIMEOUT):
+            if not backed_off:
+                self.backoff()
+            return
+
+        if outcome != OK:
+            return
+
+        self.latencies.append(latency)
+        self.successes_since_change += 1
+        # Only grow when the extra slot would actually be used.
+        saturated = (
+            any(self.target.waiters.values())
+            or sum(self.target.in_use.values()) >= self.limit - 1
+        )
+        if (
+            self.successes_since_change >= self.limit
+            and saturated
+            and self.limit < self.maximum
+            and self._p95() <= AGENT_LATENCY_TARGET_SECONDS
+            and self._error_rate() <= AGENT_ERROR_RATE_TARGET
+        ):
+            self.limit += 1
+            self.successes_since_change = 0
+            self._apply()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "min": self.minimum,
+            "max": self.maximum,
+            "p95_latency_seconds": round(self._p95(), 3),
+            "error_rate": round(self._error_rate(), 4),
+        }
+
+
+limiter = AdaptiveLimiter(
+    scheduler,
+    minimum=AGENT_MIN_CONCURRENCY,
+    maximum=AGENT_MAX_CONCURRENCY,
+    initial=AGENT_INITIAL_CONCURRENCY,
+)
@@ -1,72 +1,109 @@
+import asyncio
+import contextlib
 import json
-import re
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from google.adk.runners import InMemoryRunner
-from agents.gemini_agent import root_agent
-from agents.dot_tech_agent import tech_agent
-from agents.mongodb_agent import root_agent as mongodb_agent
-from agents.elevenlabs_agent import root_agent as elevenlabs_agent
+from agents import cassettes
+from agents.code_reviewer_agent import root_agent as code_reviewer_agent
+from agents.code_reviewer_agent.agent import GITHUB_TOKEN
+from agents.github import close_github_client
+from agents.models import hedge_stats, usage_snapshot
+from agents.scanner import shutdown_pool
+from agents.tracing import trace_store
+from agents.sidekick_agent.agent import root_agent as sidekick_agent
+from agents.tool_cache import tool_cache
+from app.answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from app.clients import get_http_client, close_http_client
+from app.batches import batches, BATCH_FORMATS, CsvValidationError
+from app.db import (
+    result_writer, record_check, event_id_for, query_prize_checks, query_stored_results,
+    list_events, close_pool, get_pool, DEFAULT_EVENT_NAME,
+)
+from app.prefetch import prefetches
+from app.prizes import PRIZES
+from app.readiness import readiness, register_agent_checks
+from app.results import (
+    RESULTS_MAX_ROWS, FilterError, result_store, parse_filters, csv_lines, jsonl_lines, to_parquet,
+)
+from app.limiter import limiter
+from app.metrics import registry
+from app.runner import run_agent, final_text
+from app.scheduler import scheduler, Priority
+from app.similarity import close_index, index_in_background, originality_evidence
+from app.tasks import queue_enabled, task_waiter
+
+async def database_check():
+    pool = await get_pool()
+    await pool.fetchval("SELECT 1")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    register_agent_checks(readiness, [prize.agent for prize in PRIZES.values()])
+    if result_writer.enabled:
+        readiness.register("database", database_check)
+        result_writer.start()
+    # Warm-up runs in the background so /health stays live; /ready gates traffic until it is done.
+    warmup_task = asyncio.create_task(readiness.warm_up())
+    yield
+    warmup_task.cancel()
+    # The warm-up probes through the shared HTTP client; let it unwind before closing it.
+    with contextlib.suppress(asyncio.CancelledError):
+        await warmup_task
+    shutdown_pool()
+    await close_index()
+    if result_writer.enabled:
+        await result_writer.stop()
+        await close_pool()
+    await close_github_client()
+    await close_http_client()
 
 app = FastAPI(
     title="MLH Sidekick API",
     description="Backend API for MLH Sidekick",
     version="0.1.0",
+    lifespan=lifespan,
 )
 class HealthResponse(BaseModel):
     status: str
     message: str
 
+class ReadyResponse(BaseModel):
+    status: str
+    dependencies: dict
+
 class PrizeCheckRequest(BaseModel):
     repo_url: str
     project_number: str
+    priority: Priority = "interactive"
 
 class TechPrizeCheckRequest(BaseModel):
     project_url: str
+    priority: Priority = "interactive"
 
 class MongoDBPrizeCheckRequest(BaseModel):
     repo_url: str
+    priority: Priority = "interactive"
 
 class ElevenLabsPrizeCheckRequest(BaseModel):
     repo_url: str
+    priority: Priority = "interactive"
 
-def find_json_in_history(history):
-    valid_json = None
-    all_text = []
-
-    for event in history:
-        if hasattr(event, "content") and event.content and hasattr(event.content, "role"):
-            if event.content.role == "model":
-                for part in event.content.parts:
-                    if part.text:
-                        text = part.text
-                        all_text.append(text)
-                        
-                        json_block = re.search(r"```json\s*(\{.*?\})\s*```", text, re.DOTALL)
-                        if json_block:
-                            try:
-                                valid_json = json.loads(json_block.group(1))
-                                continue 
-                            except: pass
-                        
-                        raw_json = re.search(r"(\{.*\})", text, re.DOTALL)
-                        if raw_json:
-                            try:
-                                valid_json = json.loads(raw_json.group(1))
-                            except: pass
-    
-    if valid_json:
-        return valid_json
-        
-    return {
-        "final_determination": "NEEDS_MANUAL_REVIEW",
-        "notes": "Agent failed to output valid JSON.",
-        "raw_logs": all_text[-1] if all_text else "No response text found."
-    }
+class ChatRequest(BaseModel):
+    message: str
+
+class PrefetchRequest(BaseModel):
+    repo_urls: list[str]
+
+class CodeReviewRequest(BaseModel):
+    repo_url: str
+    priority: Priority = "interactive"
 
 @app.get("/")
 def read_root():
@@ -76,18 +113,50 @@ def read_root():
 def health_check():
     return HealthResponse(status="healthy", message="API is running")
 
+@app.get("/ready", response_model=ReadyResponse)
+async def readiness_check(refresh: bool = False):
+    if refresh and readiness.warmup_finished:
+        await readiness.recheck()
+    body = ReadyResponse(
+        status="ready" if readiness.is_ready else "warming_up",
+        dependencies=readiness.as_dict(),
+    )
+    return JSONResponse(status_code=200 if readiness.is_ready else 503, content=body.model_dump())
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "scheduler": scheduler.stats(),
+        "limiter": limiter.stats(),
+        "llm_hedging": hedge_stats,
+        "llm_usage": usage_snapshot(),
+        "mcp_tool_cache": tool_cache.snapshot(),
+        "answer_cache": answer_cache.snapshot(),
+        "metrics": registry.snapshot(),
+    }
+
+async def judge(prize_name, fields, priority):
+    """Runs one prize check here, or hands it to a worker and waits when JUDGING_MODE=queue."""
+    index_in_background(fields.get("repo_url"), GITHUB_TOKEN)
+    if queue_enabled():
+        stored = await task_waiter.submit(prize_name, fields, priority)
+        result = stored.pop("result")
+        result_store.add(stored)
+        return result
+    prize = PRIZES[prize_name]
+    with cassettes.judging():
+        result = await run_agent(prize.agent, prize.build_prompt(fields), priority)
+    await record_check(prize_name, fields, result)
+    return result
+
 @app.post("/api/agents/check-gemini-prize")
 async def check_gemini_prize(request: PrizeCheckRequest):
     try:
-        prompt = (
-            f"Please check this project for the Gemini Prize.\n"
-            f"GitHub Repository: {request.repo_url}\n"
-            f"Submitted Project Number: {request.project_number}\n\n"
-            f"SYSTEM INSTRUCTION: Do NOT explain your plan. Use the tools immediately. Output ONLY the final JSON object."
+        clean_result = await judge(
+            "Gemini",
+            {"repo_url": request.repo_url, "project_number": request.project_number},
+            request.priority,
         )
-        runner = InMemoryRunner(agent=root_agent)
-        history = await runner.run_debug(prompt, verbose=False)
-        clean_result = find_json_in_history(history)
         
         return {"result": clean_result}
         
@@ -98,20 +167,8 @@ async def check_gemini_prize(request: PrizeCheckRequest):
 @app.post("/api/agents/check-dot-tech-prize")
 async def check_dot_tech_prize(request: TechPrizeCheckRequest):
     try:
-        prompt = (
-            f"Please validate if this URL qualifies for the .Tech domain prize.\n"
-            f"Project URL: {request.project_url}\n\n"
-            f"Output ONLY the final JSON object."
-        )
-        
-        # Initialize Runner with the Tech Agent
-        runner = InMemoryRunner(agent=tech_agent)
-        
-        # Run the agent (async)
-        history = await runner.run_debug(prompt, verbose=False)
-        
-        # Parse result
-        clean_result = find_json_in_history(history)
+        # Run the Tech Agent in its priority class and parse the result
+        clean_result = await judge(".Tech", {"project_url": request.project_url}, request.priority)
         
         return {"result": clean_result}
 
@@ -122,15 +179,7 @@ async def check_dot_tech_prize(request: TechPrizeCheckRequest):
 @app.post("/api/agents/check-mongodb-prize")
 async def check_mongodb_prize(request: MongoDBPrizeCheckRequest):
     try:
-        prompt = (
-            f"Please check this project for the MongoDB Prize.\n"
-            f"GitHub Repository: {request.repo_url}\n\n"
-            f"SYSTEM INSTRUCTION: Do NOT explain your plan. Use the tools immediately. Output ONLY the final JSON object."
-        )
-        
-        runner = InMemoryRunner(agent=mongodb_agent)
-        history = await runner.run_debug(prompt, verbose=False)
-        clean_result = find_json_in_history(history)
+        clean_result = await judge("MongoDB", {"repo_url": request.repo_url}, request.priority)
         
         return {"result": clean_result}
         
@@ -141,15 +190,7 @@ async def check_mongodb_prize(request: MongoDBPrizeCheckRequest):
 @app.post("/api/agents/check-elevenlabs-prize")
 async def check_elevenlabs_prize(request: ElevenLabsPrizeCheckRequest):
     try:
-        prompt = (
-            f"Please check this project for the ElevenLabs Prize.\n"
-            f"GitHub Repository: {request.repo_url}\n\n"
-            f"SYSTEM INSTRUCTION: Do NOT explain your plan. Use the tools immediately. Output ONLY the final JSON object."
-        )
-        
-        runner = InMemoryRunner(agent=elevenlabs_agent)
-        history = await runner.run_debug(prompt, verbose=False)
-        clean_result = find_json_in_history(history)
+        clean_result = await judge("ElevenLabs", {"repo_url": request.repo_url}, request.priority)
         
         return {"result": clean_result}
         
@@ -157,3 +198,230 @@ async def check_elevenlabs_prize(request: ElevenLabsPrizeCheckRequest):
         print(f"Error running ElevenLabs agent: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/agents/code-review")
+async def code_review(request: CodeReviewRequest):
+    try:
+        # Similarity evidence is best effort; the review still runs without it.
+        try:
+            similarity = await originality_evidence(request.repo_url, GITHUB_TOKEN)
+        except Exception as e:
+            print(f"Error computing similarity evidence: {e}")
+            similarity = {"error": str(e)}
+
+        prompt = (
+            f"Please review this GitHub repository: {request.repo_url}\n\n"
+            "Similarity evidence from the cross-submission index "
+            "(MinHash over normalized source):\n"
+            f"{json.dumps(similarity, indent=2)}\n\n"
+            "Use near_duplicate_submissions for originality_choice and template_matches / "
+            "max_template_overlap_percent for boilerplate_choice.\n"
+            "Output ONLY the final JSON object."
+        )
+        clean_result = await run_agent(code_reviewer_agent, prompt, request.priority)
+
+        return {"result": clean_result, "similarity": similarity}
+
+    except Exception as e:
+        print(f"Error running code reviewer agent: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/agents/chat")
+async def chat(request: ChatRequest):
+    if ANSWER_CACHE_ENABLED:
+        cached = answer_cache.lookup(request.message)
+        if cached is not None:
+            return {"response": cached["answer"], "cached": True}
+    try:
+        response = await run_agent(sidekick_agent, request.message, parse=final_text)
+    except Exception as e:
+        print(f"Error running Sidekick agent: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if ANSWER_CACHE_ENABLED and response:
+        answer_cache.store(request.message, response)
+    return {"response": response, "cached": False}
+
+@app.post("/api/prefetch")
+async def create_prefetch(request: PrefetchRequest):
+    """Validates and resolves an upload's repositories, then warms their snapshots in the
+    background."""
+    try:
+        job = await prefetches.start(request.repo_urls, GITHUB_TOKEN)
+    except Exception as e:
+        print(f"Error prefetching repositories: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return job.as_dict()
+
+@app.get("/api/prefetch/{prefetch_id}")
+def get_prefetch(prefetch_id: str):
+    job = prefetches.get(prefetch_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Prefetch not found")
+    return job.as_dict()
+
+@app.get("/api/runs")
+def list_runs(
+    agent: str | None = None,
+    min_duration_ms: float | None = None,
+    limit: int = Query(default=50, le=500),
+):
+    """Most recent traced runs first; filter by agent or minimum duration to find slow ones."""
+    return trace_store.recent(agent, min_duration_ms, limit)
+
+@app.get("/api/runs/{run_id}/trace")
+def get_run_trace(run_id: str, fmt: str = Query(default="json", alias="format")):
+    trace = trace_store.get(run_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if fmt == "chrome":
+        return JSONResponse(
+            trace.chrome_trace(),
+            headers={"Content-Disposition": f'attachment; filename="trace_{run_id}.json"'},
+        )
+    if fmt != "json":
+        raise HTTPException(status_code=422, detail="format must be one of ['json', 'chrome']")
+    return trace.as_dict()
+
+
+@app.post("/api/batches")
+async def create_batch(
+    request: Request,
+    prizes: list[str] = Query(default=["Gemini"]),
+    event: str = DEFAULT_EVENT_NAME,
+    prefetch: str | None = None,
+):
+    """Streams a Devpost CSV export (raw request body) and starts judging rows as they arrive.
+
+    `prefetch` is the id of the upload's POST /api/prefetch job; the commit SHAs it resolved
+    are stored on the submissions.
+    """
+    unknown = [p for p in prizes if p not in PRIZES]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown prizes: {unknown}")
+
+    event_id = await event_id_for(event) if result_writer.enabled else None
+    batch = batches.create(prizes, event_id, prefetches.get(prefetch) if prefetch else None)
+    try:
+        await batch.ingest(request.stream())
+    except CsvValidationError as e:
+        batch.fail(str(e))
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"Error ingesting batch {batch.id}: {e}")
+        batch.fail(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    return batch.as_dict()
+
+@app.get("/api/batches/{batch_id}")
+def get_batch(batch_id: str):
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.as_dict()
+
+@app.post("/api/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str):
+    """Stops judging a batch; the results written so far stay downloadable."""
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    try:
+        await batch.cancel()
+    except Exception as e:
+        print(f"Error cancelling batch {batch_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return batch.as_dict()
+
+@app.get("/api/batches/{batch_id}/results")
+def get_batch_results(batch_id: str, fmt: str = Query(default="csv", alias="format")):
+    batch = batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if fmt not in BATCH_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {list(BATCH_FORMATS)}")
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        batch.stream_results(fmt),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="judging_results_{batch_id}.{fmt}"'
+        },
+    )
+
+def _result_filters(request: Request):
+    params = {}
+    for key, value in request.query_params.multi_items():
+        params.setdefault(key, []).append(value)
+    try:
+        return parse_filters(params)
+    except FilterError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+async def _stored_results(filters, offset=0, limit=None):
+    await result_writer.flush()
+    try:
+        return await query_stored_results(filters, offset, limit)
+    except FilterError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/api/results")
+async def query_results(
+    request: Request, offset: int = 0, limit: int = Query(default=100, le=1000)
+):
+    """Typed judgments filtered by any result column, e.g. ?prize=MongoDB&uses_atlas=true.
+
+    Served from Postgres when DATABASE_URL is set, otherwise from the in-memory store.
+    """
+    filters = _result_filters(request)
+    if result_writer.enabled:
+        return await _stored_results(filters, offset, limit)
+    return result_store.query(filters, offset=offset, limit=limit)
+
+@app.get("/api/results/export")
+async def export_results(request: Request, fmt: str = Query(default="csv", alias="format")):
+    filters = _result_filters(request)
+    if result_writer.enabled:
+        rows = (await _stored_results(filters, limit=RESULTS_MAX_ROWS))["items"]
+    else:
+        rows = result_store.iter_rows(filters)
+    if fmt == "parquet":
+        try:
+            body = to_parquet(rows)
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        return Response(
+            body,
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": 'attachment; filename="judging_results.parquet"'},
+        )
+    if fmt == "jsonl":
+        return StreamingResponse(
+            jsonl_lines(rows),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="judging_results.jsonl"'},
+        )
+    if fmt == "csv":
+        return StreamingResponse(
+            csv_lines(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="judging_results.csv"'},
+        )
+    raise HTTPException(status_code=422, detail="format must be one of ['csv', 'jsonl', 'parquet']")
+
+@app.get("/api/events")
+async def get_events():
+    if not result_writer.enabled:
+        raise HTTPException(status_code=503, detail="DATABASE_URL is not configured")
+    return await list_events()
+
+@app.get("/api/events/{event_id}/results")
+async def get_event_results(
+    event_id: str,
+    prize: str | None = None,
+    final_determination: str | None = None,
+    offset: int = 0,
+    limit: int = Query(default=100, le=1000),
+):
+    if not result_writer.enabled:
+        raise HTTPException(status_code=503, detail="DATABASE_URL is not configured")
+    await result_writer.flush()
+    return await query_prize_checks(event_id, prize, final_determination, offset, limit)
@@ -0,0 +1,211 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from agents.github import (
+    GRAPHQL_BATCH_SIZE, REF_PREFETCH_TTL_SECONDS, parse_repo_url, resolve_default_branches,
+    resolve_ref,
+)
+from agents.snapshots import get_snapshot
+
+from .metrics import registry
+from .similarity import index_submission
+
+# GraphQL batches (or single ref lookups without a token) in flight at once.
+PREFETCH_RESOLVE_CONCURRENCY = int(os.getenv("PREFETCH_RESOLVE_CONCURRENCY", "4"))
+# Repository tarballs downloaded at once while warming snapshots.
+PREFETCH_SNAPSHOT_CONCURRENCY = int(os.getenv("PREFETCH_SNAPSHOT_CONCURRENCY", "4"))
+PREFETCH_WARM_SNAPSHOTS = os.getenv("PREFETCH_WARM_SNAPSHOTS", "true").lower() == "true"
+PREFETCH_RETENTION = int(os.getenv("PREFETCH_RETENTION", "20"))
+
+INVALID_URL = "invalid_url"
+NOT_FOUND = "not_found"
+EMPTY = "empty"
+RESOLVED = "resolved"
+READY = "ready"
+SNAPSHOT_FAILED = "snapshot_failed"
+ERROR = "error"
+# Reported for repositories the token can read but that are not public; judges and the
+# public Devpost page may not be able to open them.
+PRIVATE = "private"
+
+# Statuses that mean a check on this repository cannot succeed.
+PROBLEM_STATUSES = (INVALID_URL, NOT_FOUND, EMPTY, ERROR)
+
+
+def normalize_repo_url(url):
+    """Canonical https://github.com/<owner>/<repo> form, or None if it is not a repository URL."""
+    parsed = parse_repo_url(url)
+    if parsed is None:
+        return None
+    return f"https://github.com/{parsed[0]}/{parsed[1]}"
+
+
+class PrefetchJob:
+    """Validates, resolves and warms the repositories of one upload ahead of judging."""
+
+    def __init__(self, urls):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.status = "resolving"
+        # One entry per distinct repository; "rows" keeps the original 1-based row numbers.
+        self.repos = OrderedDict()
+        self.invalid = []
+        for row_number, url in enumerate(urls, start=1):
+            normalized = normalize_repo_url(url)
+            if normalized is None:
+                self.invalid.append({
+                    "row": row_number, "url": url, "status": INVALID_URL,
+                    "error": "Not a GitHub repository URL",
+                })
+                continue
+            owner, repo = parse_repo_url(normalized)
+            key = (owner.lower(), repo.lower())
+            entry = self.repos.setdefault(key, {
+                "url": normalized, "owner": owner, "repo": repo, "rows": [],
+                "status": None, "sha": None, "private": None, "error": None,
+            })
+            entry["rows"].append(row_number)
+        self._warmer = None
+
+    def sha_for(self, url):
+        """The default-branch SHA this job resolved for a repository URL, if any."""
+        parsed = parse_repo_url(url)
+        if parsed is None:
+            return None
+        entry = self.repos.get((parsed[0].lower(), parsed[1].lower()))
+        return entry["sha"] if entry else None
+
+    def counts(self):
+        counts = {INVALID_URL: len(self.invalid)}
+        for entry in self.repos.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        counts[PRIVATE] = sum(1 for entry in self.repos.values() if entry["private"])
+        return counts
+
+    def problems(self):
+        problems = list(self.invalid)
+        for entry in self.repos.values():
+            if entry["status"] in PROBLEM_STATUSES:
+                status, error = entry["status"], entry["error"]
+            elif entry["private"]:
+                # Still judged with the token that can read it, but flagged for the coach.
+                status, error = PRIVATE, "Repository is private"
+            else:
+                continue
+            problems.extend(
+                {"row": row, "url": entry["url"], "status": status, "error": error}
+                for row in entry["rows"]
+            )
+        return sorted(problems, key=lambda p: p["row"])
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "repositories": len(self.repos),
+            "counts": self.counts(),
+            "problems": self.problems(),
+        }
+
+    async def _resolve_batch(self, entries, token):
+        try:
+            resolved = await resolve_default_branches(
+                [(e["owner"], e["repo"]) for e in entries], token, REF_PREFETCH_TTL_SECONDS
+            )
+        except Exception as e:
+            for entry in entries:
+                entry["status"], entry["error"] = ERROR, str(e)
+            return
+        for entry in entries:
+            info = resolved[(entry["owner"], entry["repo"])]
+            entry["private"] = info["private"] if info else None
+            if info is None:
+                entry["status"] = NOT_FOUND
+                entry["error"] = "Repository does not exist or is private"
+            elif info["sha"] is None:
+                entry["status"], entry["error"] = EMPTY, "Repository has no commits"
+            else:
+                entry["status"], entry["sha"] = RESOLVED, info["sha"]
+
+    async def _resolve_one(self, entry, token):
+        try:
+            entry["sha"] = await resolve_ref(
+                entry["owner"], entry["repo"], None, token, REF_PREFETCH_TTL_SECONDS
+            )
+            entry["status"] = RESOLVED
+        except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status in (404, 451):
+                entry["status"] = NOT_FOUND
+            else:
+                entry["status"] = EMPTY if status == 409 else ERROR
+            entry["error"] = str(e)
+
+    async def resolve(self, token):
+        """Resolves every default-branch SHA; GraphQL needs a token, so REST is used without one."""
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(PREFETCH_RESOLVE_CONCURRENCY)
+        entries = list(self.repos.values())
+
+        async def bounded(coro):
+            async with semaphore:
+                await coro
+
+        if token:
+            size = GRAPHQL_BATCH_SIZE
+            batches = [entries[i:i + size] for i in range(0, len(entries), size)]
+            await asyncio.gather(*(bounded(self._resolve_batch(b, token)) for b in batches))
+        else:
+            await asyncio.gather(*(bounded(self._resolve_one(e, token)) for e in entries))
+        registry.histogram("prefetch_resolve_seconds").observe(time.perf_counter() - started)
+        self.status = "warming" if PREFETCH_WARM_SNAPSHOTS else "done"
+
+    async def warm(self, token):
+        semaphore = asyncio.Semaphore(PREFETCH_SNAPSHOT_CONCURRENCY)
+
+        async def warm_one(entry):
+            async with semaphore:
+                try:
+                    await get_snapshot(entry["url"], token, entry["sha"])
+                    entry["status"] = READY
+                except Exception as e:
+                    entry["status"], entry["error"] = SNAPSHOT_FAILED, str(e)
+                    return
+                await index_submission(entry["url"], token, entry["sha"])
+
+        await asyncio.gather(*(warm_one(e) for e in self.repos.values() if e["status"] == RESOLVED))
+        self.status = "done"
+
+    def start_warming(self, token):
+        if PREFETCH_WARM_SNAPSHOTS:
+            self._warmer = asyncio.create_task(self.warm(token))
+
+
+class PrefetchRegistry:
+    def __init__(self, retention):
+        self.retention = retention
+        self.jobs = OrderedDict()
+
+    async def start(self, urls, token):
+        """Resolves the upload's repositories before returning, then warms snapshots in the
+        background."""
+        job = PrefetchJob(urls)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.retention:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status != "done":
+                break
+            self.jobs.popitem(last=False)
+        await job.resolve(token)
+        job.start_warming(token)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+
+prefetches = PrefetchRegistry(PREFETCH_RETENTION)
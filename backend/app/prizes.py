@@ -0,0 +1,69 @@
+from agents.gemini_agent import root_agent as gemini_agent
+from agents.dot_tech_agent import tech_agent
+from agents.mongodb_agent import root_agent as mongodb_agent
+from agents.elevenlabs_agent import root_agent as elevenlabs_agent
+
+REPO_INSTRUCTION = (
+    "SYSTEM INSTRUCTION: Do NOT explain your plan. Use the tools immediately. "
+    "Output ONLY the final JSON object."
+)
+
+
+def gemini_prompt(repo_url, project_number):
+    return (
+        f"Please check this project for the Gemini Prize.\n"
+        f"GitHub Repository: {repo_url}\n"
+        f"Submitted Project Number: {project_number}\n\n"
+        f"{REPO_INSTRUCTION}"
+    )
+
+
+def dot_tech_prompt(project_url):
+    return (
+        f"Please validate if this URL qualifies for the .Tech domain prize.\n"
+        f"Project URL: {project_url}\n\n"
+        f"Output ONLY the final JSON object."
+    )
+
+
+def mongodb_prompt(repo_url):
+    return (
+        f"Please check this project for the MongoDB Prize.\n"
+        f"GitHub Repository: {repo_url}\n\n"
+        f"{REPO_INSTRUCTION}"
+    )
+
+
+def elevenlabs_prompt(repo_url):
+    return (
+        f"Please check this project for the ElevenLabs Prize.\n"
+        f"GitHub Repository: {repo_url}\n\n"
+        f"{REPO_INSTRUCTION}"
+    )
+
+
+class Prize:
+    def __init__(self, name, agent, build_prompt, result_column):
+        self.name = name
+        self.agent = agent
+        self.build_prompt = build_prompt
+        self.result_column = result_column
+
+
+# Keyed by the names the dashboard shows; build_prompt takes submission_fields().
+PRIZES = {
+    "Gemini": Prize(
+        "Gemini", gemini_agent,
+        lambda f: gemini_prompt(f["repo_url"], f["project_number"]), "Gemini_Result",
+    ),
+    ".Tech": Prize(
+        ".Tech", tech_agent, lambda f: dot_tech_prompt(f["project_url"]), "DotTech_Result",
+    ),
+    "MongoDB": Prize(
+        "MongoDB", mongodb_agent, lambda f: mongodb_prompt(f["repo_url"]), "MongoDB_Result",
+    ),
+    "ElevenLabs": Prize(
+        "ElevenLabs", elevenlabs_agent, lambda f: elevenlabs_prompt(f["repo_url"]),
+        "ElevenLabs_Result",
+    ),
+}
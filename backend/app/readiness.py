@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+
+from .clients import get_http_client
+
+OPENROUTER_KEY_URL = "https://openrouter.ai/api/v1/key"
+
+WARMUP_ATTEMPTS = int(os.getenv("WARMUP_ATTEMPTS", "5"))
+WARMUP_BACKOFF_SECONDS = float(os.getenv("WARMUP_BACKOFF_SECONDS", "2"))
+WARMUP_CHECK_TIMEOUT_SECONDS = float(os.getenv("WARMUP_CHECK_TIMEOUT_SECONDS", "30"))
+# Required dependencies still down after warm-up are probed again this often until they are up.
+READINESS_REPROBE_SECONDS = float(os.getenv("READINESS_REPROBE_SECONDS", "30"))
+
+
+class Dependency:
+    def __init__(self, name, check, required=True):
+        self.name = name
+        self.check = check
+        self.required = required
+        self.ready = False
+        self.latency_ms = None
+        self.error = None
+        self.checked_at = None
+        self.attempts = 0
+
+    def as_dict(self):
+        return {
+            "ready": self.ready,
+            "required": self.required,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            "attempts": self.attempts,
+        }
+
+
+class Readiness:
+    """Tracks whether every upstream the agents depend on has been reached at least once."""
+
+    def __init__(self):
+        self.dependencies = {}
+        self.warmup_started = False
+        self.warmup_finished = False
+
+    def register(self, name, check, required=True):
+        self.dependencies[name] = Dependency(name, check, required)
+
+    @property
+    def is_ready(self):
+        return self.warmup_finished and all(
+            dep.ready for dep in self.dependencies.values() if dep.required
+        )
+
+    async def _run(self, dep):
+        for attempt in range(1, WARMUP_ATTEMPTS + 1):
+            dep.attempts = attempt
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(dep.check(), timeout=WARMUP_CHECK_TIMEOUT_SECONDS)
+            except Exception as e:
+                dep.ready = False
+                dep.error = f"{type(e).__name__}: {e}"
+                print(f"Warm-up check {dep.name} failed (attempt {attempt}): {dep.error}")
+                if attempt < WARMUP_ATTEMPTS:
+                    await asyncio.sleep(WARMUP_BACKOFF_SECONDS * attempt)
+                continue
+            finally:
+                dep.checked_at = time.time()
+            dep.ready = True
+            dep.error = None
+            dep.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            return
+
+    async def warm_up(self):
+        self.warmup_started = True
+        try:
+            await asyncio.gather(*(self._run(dep) for dep in self.dependencies.values()))
+        finally:
+            self.warmup_finished = True
+        await self._reprobe()
+
+    async def _reprobe(self):
+        """Keeps probing the required dependencies that are down, so /ready recovers on its own."""
+        while not self.is_ready:
+            await asyncio.sleep(READINESS_REPROBE_SECONDS)
+            down = [dep for dep in self.dependencies.values() if dep.required and not dep.ready]
+            await self.recheck(down)
+
+    async def recheck(self, dependencies=None):
+        """Re-runs each check once; used by /ready?refresh=true to report current latencies."""
+        for dep in self.dependencies.values() if dependencies is None else dependencies:
+            dep.attempts += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(dep.check(), timeout=WARMUP_CHECK_TIMEOUT_SECONDS)
+                dep.ready, dep.error = True, None
+                dep.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            except Exception as e:
+                dep.ready, dep.error = False, f"{type(e).__name__}: {e}"
+            dep.checked_at = time.time()
+
+    def as_dict(self):
+        return {name: dep.as_dict() for name, dep in self.dependencies.items()}
+
+
+def openrouter_check(api_key):
+    async def check():
+        if not api_key:
+            raise RuntimeError("No OpenRouter API key configured")
+        response = await get_http_client().get(
+            OPENROUTER_KEY_URL, headers={"Authorization": f"Bearer {api_key}"},
+        )
+        response.raise_for_status()
+    return check
+
+
+def mcp_tools_check(toolset):
+    async def check():
+        tools = await toolset.get_tools()
+        if not tools:
+            raise RuntimeError("MCP server returned no tools")
+    return check
+
+
+def register_agent_checks(readiness, agents):
+    # Probe the key each model was built with; agents read it from st.secrets or the environment.
+    keys = {}
+    for agent in agents:
+        if hasattr(agent.model, "api_key"):
+            keys.setdefault(agent.model.api_key, []).append(agent.name)
+    for api_key, names in keys.items():
+        name = "openrouter" if len(keys) == 1 else f"openrouter:{','.join(names)}"
+        readiness.register(name, openrouter_check(api_key))
+    for agent in agents:
+        for toolset in agent.tools:
+            if hasattr(toolset, "get_tools"):
+                readiness.register(f"github_mcp:{agent.name}", mcp_tools_check(toolset))
+
+
+readiness = Readiness()
@@ -0,0 +1,79 @@
+"""Re-evaluates recorded agent runs offline.
+
+Usage:
+    AGENT_CASSETTE_MODE=replay uv run python -m app.replay [cassette_dir] [--json]
+
+Each cassette's prompt is run again with the current instructions and models while
+every GitHub MCP tool call is served from the cassette. Prints the recorded and new
+verdict and timing per run.
+"""
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from agents import cassettes
+from app.prizes import PRIZES
+from app.runner import run_agent
+
+
+async def replay(directory):
+    agents = {prize.agent.name: prize.agent for prize in PRIZES.values()}
+    rows = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl.gz"))):
+        cassette = cassettes.Cassette.load(path)
+        agent = agents.get(cassette.agent_name)
+        if agent is None:
+            print(f"Skipping {path}: unknown agent {cassette.agent_name}", file=sys.stderr)
+            continue
+        started = time.perf_counter()
+        try:
+            with cassettes.judging():
+                result = await run_agent(agent, cassette.prompt)
+            error = None
+        except Exception as e:
+            result, error = {}, str(e)
+        recorded = cassette.header.get("result") or {}
+        rows.append({
+            "cassette": os.path.basename(path),
+            "agent": cassette.agent_name,
+            "recorded_determination": recorded.get("final_determination"),
+            "replayed_determination": result.get("final_determination"),
+            "changed": recorded.get("final_determination") != result.get("final_determination"),
+            "recorded_seconds": cassette.header.get("duration_seconds"),
+            "replayed_seconds": round(time.perf_counter() - started, 3),
+            "error": error,
+        })
+    return rows
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    directory = args[0] if args else cassettes.AGENT_CASSETTE_DIR
+    if cassettes.AGENT_CASSETTE_MODE != "replay":
+        sys.exit("Set AGENT_CASSETTE_MODE=replay so tool calls are served from the cassettes.")
+    cassettes.AGENT_CASSETTE_DIR = directory
+
+    rows = asyncio.run(replay(directory))
+    if "--json" in sys.argv:
+        print(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        marker = "CHANGED" if row["changed"] else "same"
+        print(
+            f"{marker:7} {row['cassette']}: {row['recorded_determination']} -> "
+            f"{row['replayed_determination']} "
+            f"({row['recorded_seconds']}s -> {row['replayed_seconds']}s)"
+            + (f" error: {row['error']}" if row["error"] else "")
+        )
+    changed = sum(1 for row in rows if row["changed"])
+    print(f"{len(rows)} runs replayed, {changed} verdicts changed")
+
+
+if __name__ == "__main__":
+    main()
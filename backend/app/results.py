@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import os
+import time
+from collections import deque
+
+RESULTS_MAX_ROWS = int(os.getenv("RESULTS_MAX_ROWS", "100000"))
+
+# Typed columns shared by every prize; fields a prize does not report stay None.
+RESULT_SCHEMA = {
+    "batch_id": str,
+    "row_number": int,
+    "project_title": str,
+    "submission_url": str,
+    "prize": str,
+    "final_determination": str,
+    "usage_detected": bool,
+    "usage_evidence": str,
+    "model_used": str,
+    "project_number_valid": bool,
+    "project_number_notes": str,
+    "is_ai_studio_prototype": bool,
+    "domain_url": str,
+    "detected_tld": str,
+    "is_active": bool,
+    "http_status": int,
+    "primary_language": str,
+    "driver_library": str,
+    "uses_atlas": bool,
+    "connection_method": str,
+    "integration_type": str,
+    "features_detected": str,
+    "api_key_found": bool,
+    "notes": str,
+    "error": str,
+    "checked_at": float,
+}
+RESULT_COLUMNS = list(RESULT_SCHEMA)
+
+# Prize-specific names for the shared usage_detected column.
+USAGE_FIELDS = ("gemini_usage_detected", "mongodb_usage_detected", "elevenlabs_usage_detected")
+
+
+def _coerce(value, kind):
+    if value is None or value == "":
+        return None
+    if kind is bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("true", "yes", "1")
+        return bool(value)
+    if kind is int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if kind is float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+def flatten_result(prize, result, **context):
+    """Maps one agent JSON result onto the typed RESULT_SCHEMA columns."""
+    result = result if isinstance(result, dict) else {"error": str(result)}
+    raw = dict(result)
+    raw["usage_detected"] = next((raw[f] for f in USAGE_FIELDS if f in raw), None)
+    raw["notes"] = raw.get("notes") or raw.get("raw_logs")
+    raw.update(context)
+    raw["prize"] = prize
+    raw.setdefault("checked_at", time.time())
+    return {column: _coerce(raw.get(column), kind) for column, kind in RESULT_SCHEMA.items()}
+
+
+def _matches(row, filters):
+    for column, expected in filters.items():
+        value = row.get(column)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class FilterError(ValueError):
+    pass
+
+
+_BOOL_VALUES = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+
+
+def _parse_filter_value(column, value):
+    kind = RESULT_SCHEMA[column]
+    if kind is str:
+        return value
+    if kind is bool:
+        if value.strip().lower() not in _BOOL_VALUES:
+            raise FilterError(f"{column} must be true or false, got {value!r}")
+        return _BOOL_VALUES[value.strip().lower()]
+    try:
+        return kind(value)
+    except ValueError:
+        raise FilterError(f"{column} expects a {kind.__name__} value, got {value!r}")
+
+
+def parse_filters(params):
+    """Converts query-string values into typed filters on known columns.
+
+    Raises FilterError for a value that does not fit its column, rather than
+    silently matching None or False.
+    """
+    filters = {}
+    for column, value in params.items():
+        if column not in RESULT_SCHEMA or value is None:
+            continue
+        values = value if isinstance(value, list) else [value]
+        typed = [_parse_filter_value(column, v) for v in values]
+        filters[column] = typed[0] if len(typed) == 1 else typed
+    return filters
+
+
+class ResultStore:
+    """Keeps the most recent flattened judgments in memory for querying and export."""
+
+    def __init__(self, max_rows):
+        self.rows = deque(maxlen=max_rows)
+
+    def add(self, row):
+        self.rows.append(row)
+
+    def query(self, filters=None, offset=0, limit=100):
+        filters = filters or {}
+        matched = [row for row in self.rows if _matches(row, filters)]
+        return {
+            "total": len(matched),
+            "offset": offset,
+            "limit": limit,
+            "items": matched[offset:offset + limit],
+        }
+
+    def iter_rows(self, filters=None):
+        filters = filters or {}
+        for row in list(self.rows):
+            if _matches(row, filters):
+                yield row
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def to_parquet(rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {str: pa.string(), int: pa.int64(), bool: pa.bool_(), float: pa.float64()}
+    schema = pa.schema([(column, arrow_types[kind]) for column, kind in RESULT_SCHEMA.items()])
+    rows = list(rows)
+    table = pa.table(
+        {column: [row[column] for row in rows] for column in RESULT_COLUMNS}, schema=schema
+    )
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+result_store = ResultStore(RESULTS_MAX_ROWS)
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from agents import cassettes, tracing
+from agents.run_context import RunContext, current_run, payload_size
+
+from .limiter import limiter, classify_exception, classify_tool_result, OK, THROTTLED
+from .metrics import registry
+from .scheduler import scheduler, INTERACTIVE
+
+AGENT_RUN_TIMEOUT_SECONDS = float(os.getenv("AGENT_RUN_TIMEOUT_SECONDS", "600"))
+# Model texts kept per run; the verdict JSON is in the last turns.
+AGENT_TEXT_RING_SIZE = int(os.getenv("AGENT_TEXT_RING_SIZE", "8"))
+AGENT_EVIDENCE_REFS = int(os.getenv("AGENT_EVIDENCE_REFS", "50"))
+# Tool response bytes a run keeps in its ADK session as model context; past this the oldest
+# responses are replaced by a note. 0 keeps them all.
+AGENT_SESSION_PAYLOAD_BYTES = int(os.getenv("AGENT_SESSION_PAYLOAD_BYTES", str(4 * 1024 * 1024)))
+RUN_USER_ID = "sidekick"
+# Tool-call arguments that identify what was read, kept as evidence references.
+EVIDENCE_ARGUMENTS = ("owner", "repo", "path", "ref", "query", "repo_url")
+
+def find_json_in_texts(texts):
+    valid_json = None
+
+    for text in texts:
+        json_block = re.search(r"```json\s*(\{.*?\})\s*```", text, re.DOTALL)
+        if json_block:
+            try:
+                valid_json = json.loads(json_block.group(1))
+                continue 
+            except: pass
+        
+        raw_json = re.search(r"(\{.*\})", text, re.DOTALL)
+        if raw_json:
+            try:
+                valid_json = json.loads(raw_json.group(1))
+            except: pass
+    
+    if valid_json:
+        return valid_json
+        
+    return {
+        "final_determination": "NEEDS_MANUAL_REVIEW",
+        "notes": "Agent failed to output valid JSON.",
+        "raw_logs": texts[-1] if texts else "No response text found."
+    }
+
+def final_text(texts):
+    """The text of the last model turn, for agents that answer in prose."""
+    return texts[-1] if texts else ""
+
+RELEASED_TOOL_RESPONSE = {
+    "released": "This response was dropped from the conversation to bound memory; "
+    "call the tool again if it is still needed."
+}
+
+class RunTranscript:
+    """What a run keeps of its event stream: the last few model texts and compact
+    references to the tool calls that produced the evidence.
+
+    Tool responses stay in the ADK session as model context; once they add up to more
+    than AGENT_SESSION_PAYLOAD_BYTES the oldest are replaced by a short note, in place, so
+    the session stops holding them. `retained_bytes` is the payload the run holds now
+    (texts, evidence, tool responses in the session) and `peak_bytes` the most it held at
+    once. These are payload sizes, not process memory.
+    """
+
+    def __init__(self, run, session_budget=None):
+        self.run = run
+        self.session_budget = (
+            AGENT_SESSION_PAYLOAD_BYTES if session_budget is None else session_budget
+        )
+        self.texts = deque(maxlen=AGENT_TEXT_RING_SIZE)
+        # (function_response, size) of the responses still in the session, oldest first.
+        self.responses = deque()
+        self.response_bytes = 0
+        self.retained_bytes = 0
+        self.peak_bytes = 0
+        self.released_tool_responses = 0
+        self.throttled_tool_calls = 0
+
+    def _hold(self, size):
+        self.retained_bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.retained_bytes)
+        self.run.retained_payload_bytes = self.peak_bytes
+
+    def _release(self, size):
+        self.retained_bytes -= size
+
+    def _keep_text(self, text):
+        self._hold(len(text))
+        if len(self.texts) == self.texts.maxlen:
+            self._release(len(self.texts[0]))
+        self.texts.append(text)
+
+    def _keep_evidence(self, name, args):
+        if len(self.run.evidence) >= AGENT_EVIDENCE_REFS:
+            return
+        ref = {"tool": name}
+        ref.update((k, args[k]) for k in EVIDENCE_ARGUMENTS if args.get(k) not in (None, ""))
+        self._hold(payload_size(ref))
+        self.run.evidence.append(ref)
+
+    def _keep_response(self, function_response):
+        sizes = self.run.tool_response_sizes
+        size = sizes.pop(getattr(function_response, "id", None), None)
+        if size is None:
+            size = payload_size(function_response.response)
+        self._hold(size)
+        self.responses.append((function_response, size))
+        self.response_bytes += size
+        # The newest response has not reached the model yet; it is never dropped.
+        while self.session_budget and self.response_bytes > self.session_budget:
+            if len(self.responses) == 1:
+                break
+            released, released_size = self.responses.popleft()
+            released.response = dict(RELEASED_TOOL_RESPONSE)
+            self.response_bytes -= released_size
+            self._release(released_size)
+            self.released_tool_responses += 1
+
+    def consume(self, event):
+        content = getattr(event, "content", None)
+        if not content or not content.parts or getattr(event, "partial", False):
+            return
+        text = "".join(part.text for part in content.parts if part.text)
+        if text and content.role == "model":
+            self._keep_text(text)
+        for part in content.parts:
+            if part.function_call:
+                self._keep_evidence(part.function_call.name, part.function_call.args or {})
+            if part.function_response:
+                response = part.function_response.response
+                if classify_tool_result(response) == THROTTLED:
+                    self.throttled_tool_calls += 1
+                    limiter.record_throttled_tool(part.function_response.name)
+                self._keep_response(part.function_response)
+
+async def _stream_run(runner, prompt, transcript):
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id=RUN_USER_ID
+    )
+    try:
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        events = runner.run_async(
+            user_id=RUN_USER_ID, session_id=session.id, new_message=message
+        )
+        async for event in events:
+            transcript.consume(event)
+    finally:
+        # The session still holds the run's recent tool responses; drop it as soon as the run ends.
+        await runner.session_service.delete_session(
+            app_name=runner.app_name, user_id=RUN_USER_ID, session_id=session.id
+        )
+
+async def run_agent(agent, prompt, priority=INTERACTIVE, parse=find_json_in_texts):
+    run = RunContext(agent.name, prompt)
+    token = current_run.set(run)
+    trace = tracing.begin_run(run)
+    outcome = "error"
+    try:
+        cassettes.begin_run(run)
+        queue_span = trace.start("queue wait", "queue", priority=priority) if trace else None
+        async with scheduler.slot(priority):
+            if trace:
+                trace.end(queue_span)
+            started = time.perf_counter()
+            run_span = trace.start("agent run", "agent") if trace else None
+            if run_span:
+                trace.scope = run_span.id
+            try:
+                runner = InMemoryRunner(agent=agent)
+                transcript = RunTranscript(run)
+                await asyncio.wait_for(
+                    _stream_run(runner, prompt, transcript), timeout=AGENT_RUN_TIMEOUT_SECONDS
+                )
+            except Exception as e:
+                outcome = classify_exception(e)
+                limiter.record(time.perf_counter() - started, outcome)
+                raise
+            finally:
+                if trace:
+                    trace.end(run_span)
+                    trace.scope = trace.root.id
+            duration = time.perf_counter() - started
+            throttled = transcript.throttled_tool_calls > 0
+            limiter.record(duration, THROTTLED if throttled else OK, backed_off=throttled)
+        registry.histogram(
+            "agent_run_retained_payload_bytes", agent=agent.name
+        ).observe(run.retained_payload_bytes)
+        registry.counter(
+            "agent_tool_responses_released_total", agent=agent.name
+        ).inc(transcript.released_tool_responses)
+        parse_span = None
+        if trace:
+            parse_span = trace.start("parse result", "parse", texts=len(transcript.texts))
+        result = parse(list(transcript.texts))
+        if trace:
+            trace.end(parse_span)
+        cassettes.end_run(run, result, duration)
+        outcome = OK
+        return result
+    finally:
+        usage = run.usage
+        cached = usage["cached_input_tokens"]
+        uncached = usage["input_tokens"] - cached
+        registry.counter("llm_input_tokens_total", agent=agent.name, cache="hit").inc(cached)
+        registry.counter("llm_input_tokens_total", agent=agent.name, cache="miss").inc(uncached)
+        if trace:
+            trace.finish(
+                outcome=outcome, priority=priority,
+                retained_payload_bytes=run.retained_payload_bytes,
+                tool_calls=trace.count("tool"),
+                llm_turns=usage["turns"], input_tokens=usage["input_tokens"],
+                cached_input_tokens=usage["cached_input_tokens"], uncached_input_tokens=uncached,
+                output_tokens=usage["output_tokens"],
+            )
+        current_run.reset(token)
@@ -0,0 +1,144 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Literal
+
+from .metrics import registry
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+Priority = Literal["interactive", "bulk"]
+
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "16"))
+# Share of the current capacity bulk work can never take, so a single check never waits
+# behind a batch. A fraction keeps the split fair when the limiter shrinks capacity.
+AGENT_INTERACTIVE_RESERVED_FRACTION = float(
+    os.getenv("AGENT_INTERACTIVE_RESERVED_FRACTION", "0.25")
+)
+AGENT_INTERACTIVE_WEIGHT = int(os.getenv("AGENT_INTERACTIVE_WEIGHT", "4"))
+AGENT_BULK_WEIGHT = int(os.getenv("AGENT_BULK_WEIGHT", "1"))
+
+
+class PriorityScheduler:
+    """Admits agent runs by priority class.
+
+    Free slots are handed out by weighted fair queuing between the classes that
+    have waiters, and a `reserved_fraction` of the capacity is kept free of bulk work.
+    """
+
+    def __init__(self, capacity, reserved_fraction, weights):
+        self._capacity = capacity
+        self.reserved_fraction = reserved_fraction
+        self.weights = weights
+        self.in_use = {p: 0 for p in PRIORITIES}
+        self.served = {p: 0 for p in PRIORITIES}
+        self.waiters = {p: deque() for p in PRIORITIES}
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value):
+        self._capacity = max(1, int(value))
+        self._dispatch()
+
+    @property
+    def reserved(self):
+        return math.ceil(self._capacity * self.reserved_fraction)
+
+    def _bulk_limit(self):
+        # Never starve bulk entirely, even when capacity shrinks below the reservation.
+        return max(1, self._capacity - self.reserved)
+
+    def _can_run(self, priority):
+        if sum(self.in_use.values()) >= self._capacity:
+            return False
+        if priority == BULK:
+            return self.in_use[BULK] < self._bulk_limit()
+        return True
+
+    def _grant(self, priority):
+        self.in_use[priority] += 1
+        self.served[priority] += 1
+        registry.gauge("agent_in_flight", priority=priority).set(self.in_use[priority])
+
+    def _dispatch(self):
+        while True:
+            candidates = [p for p in PRIORITIES if self.waiters[p] and self._can_run(p)]
+            if not candidates:
+                return
+            priority = min(candidates, key=lambda p: self.served[p] / self.weights[p])
+            waiter = self.waiters[priority].popleft()
+            registry.gauge("agent_queue_depth", priority=priority).set(len(self.waiters[priority]))
+            if waiter.done():
+                continue
+            self._grant(priority)
+            waiter.set_result(None)
+
+    async def acquire(self, priority):
+        if not self.waiters[priority] and self._can_run(priority):
+            self._grant(priority)
+            return
+
+        if not self.waiters[priority]:
+            # A class that was idle rejoins at the current virtual time instead of
+            # claiming a burst of credit for the period it had nothing queued.
+            active = [self.served[p] / self.weights[p] for p in PRIORITIES if self.waiters[p]]
+            if active:
+                caught_up = min(active) * self.weights[priority]
+                self.served[priority] = max(self.served[priority], caught_up)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[priority].append(waiter)
+        registry.gauge("agent_queue_depth", priority=priority).set(len(self.waiters[priority]))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we were cancelled; hand it on.
+                self.release(priority)
+            else:
+                try:
+                    self.waiters[priority].remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, priority):
+        self.in_use[priority] -= 1
+        registry.gauge("agent_in_flight", priority=priority).set(self.in_use[priority])
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority=INTERACTIVE):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        queued_at = time.perf_counter()
+        await self.acquire(priority)
+        registry.histogram("agent_queue_wait_seconds", priority=priority).observe(
+            time.perf_counter() - queued_at
+        )
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self):
+        return {
+            "capacity": self._capacity,
+            "reserved_interactive": self.reserved,
+            "in_flight": dict(self.in_use),
+            "queued": {p: len(q) for p, q in self.waiters.items()},
+        }
+
+
+scheduler = PriorityScheduler(
+    capacity=AGENT_MAX_CONCURRENCY,
+    reserved_fraction=AGENT_INTERACTIVE_RESERVED_FRACTION,
+    weights={INTERACTIVE: AGENT_INTERACTIVE_WEIGHT, BULK: AGENT_BULK_WEIGHT},
+)
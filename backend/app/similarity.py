@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+
+from agents.github import parse_repo_url
+from agents.snapshots import get_snapshot
+
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "similarity_index.pkl")
+# Known starter kits and templates, as comma-separated GitHub URLs.
+SIMILARITY_TEMPLATE_REPOS = [
+    url.strip() for url in os.getenv("SIMILARITY_TEMPLATE_REPOS", "").split(",") if url.strip()
+]
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.5"))
+# New entries are written to SIMILARITY_INDEX_PATH at most this often, in one save.
+SIMILARITY_SAVE_DELAY_SECONDS = float(os.getenv("SIMILARITY_SAVE_DELAY_SECONDS", "30"))
+# Judged and prefetched submissions indexed at once in the background.
+SIMILARITY_INDEX_CONCURRENCY = int(os.getenv("SIMILARITY_INDEX_CONCURRENCY", "4"))
+# Bumped when normalization changes; signatures from another version are not comparable.
+INDEX_VERSION = 2
+
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_TOKENS = 5
+MAX_SOURCE_FILE_BYTES = 512 * 1024
+
+SOURCE_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".java", ".kt", ".go", ".rs", ".rb", ".php", ".cs",
+    ".c", ".cc", ".cpp", ".h", ".hpp", ".swift", ".dart", ".vue", ".svelte", ".html", ".css",
+    ".scss", ".ipynb",
+}
+# Generated files say nothing about originality and would dominate the signature.
+SKIPPED_FILES = {"package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Cargo.lock"}
+
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]")
+# Strings and comments are matched in one left-to-right pass, so "https://..." or "#fff"
+# is a string rather than the start of a comment, and "don't" in a comment is not a string.
+_STRINGS = (
+    r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\''
+    r'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+)
+_SLASH_COMMENTS = r"|/\*[\s\S]*?\*/|//[^\n]*"
+_HASH_COMMENTS = r"|#[^\n]*"
+# In Python and Ruby "//" is an operator; "#" starts comments only in these languages.
+_HASH_COMMENT_EXTENSIONS = {".py", ".rb", ".ipynb"}
+_STRIP_RES = {
+    "hash": re.compile(_STRINGS + _HASH_COMMENTS),
+    "slash": re.compile(_STRINGS + _SLASH_COMMENTS),
+    "php": re.compile(_STRINGS + _SLASH_COMMENTS + _HASH_COMMENTS),
+}
+
+# Fixed seeds so signatures stay comparable across processes and restarts.
+_rng = np.random.default_rng(20240601)
+_MAX = np.iinfo(np.uint64).max
+_A = _rng.integers(1, _MAX, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, _MAX, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def _strip(match):
+    return '""' if match.group(0)[0] in "\"'" else " "
+
+
+def normalize_source(text, extension=".js"):
+    """Drops comments and string contents and collapses whitespace, so renames of
+    literals or reformatting do not hide a copied file."""
+    if extension in _HASH_COMMENT_EXTENSIONS:
+        style = "hash"
+    else:
+        style = "php" if extension == ".php" else "slash"
+    return _TOKEN_RE.findall(_STRIP_RES[style].sub(_strip, text))
+
+
+def shingle_hashes(tokens):
+    hashes = set()
+    for i in range(max(0, len(tokens) - SHINGLE_TOKENS + 1)):
+        shingle = " ".join(tokens[i:i + SHINGLE_TOKENS]).encode("utf-8")
+        hashes.add(int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "little"))
+    return hashes
+
+
+def repo_shingles(snapshot):
+    hashes = set()
+    for relative, absolute in snapshot.iter_files():
+        name = os.path.basename(relative)
+        extension = os.path.splitext(name)[1].lower()
+        if name in SKIPPED_FILES or extension not in SOURCE_EXTENSIONS:
+            continue
+        if os.path.getsize(absolute) > MAX_SOURCE_FILE_BYTES:
+            continue
+        with open(absolute, "r", encoding="utf-8", errors="ignore") as f:
+            hashes |= shingle_hashes(normalize_source(f.read(), extension))
+    return hashes
+
+
+def minhash(hashes, chunk=8192):
+    signature = np.full(NUM_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+    with np.errstate(over="ignore"):
+        for start in range(0, len(values), chunk):
+            block = values[start:start + chunk]
+            # Multiply-add hashing modulo 2**64; uint64 overflow is the modulus.
+            permuted = np.outer(_A, block) + _B[:, None]
+            signature = np.minimum(signature, permuted.min(axis=1))
+    return signature
+
+
+class SimilarityIndex:
+    """MinHash signatures of analyzed repositories with an LSH band index.
+
+    A query only compares against repositories that share at least one band,
+    so lookups stay sublinear in the number of indexed repositories.
+    """
+
+    def __init__(self):
+        self.signatures = {}
+        self.metadata = {}
+        self.buckets = [defaultdict(set) for _ in range(BANDS)]
+        self.templates = set()
+
+    def _bands(self, signature):
+        for band in range(BANDS):
+            rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            yield band, hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+
+    def add(self, key, signature, **metadata):
+        """Indexes a repository; a None signature (no source to shingle) only stores metadata."""
+        if key in self.metadata:
+            self.metadata[key].update(metadata)
+        else:
+            self.metadata[key] = metadata
+            if signature is not None:
+                self.signatures[key] = signature
+                for band, bucket in self._bands(signature):
+                    self.buckets[band][bucket].add(key)
+        if self.metadata[key].get("kind") == "template" and key in self.signatures:
+            self.templates.add(key)
+
+    def candidates(self, signature):
+        # Templates are few and usually much smaller than the submission that extends
+        # them, so their Jaccard score is low; they are always compared directly.
+        found = set(self.templates)
+        for band, bucket in self._bands(signature):
+            found |= self.buckets[band].get(bucket, set())
+        return found
+
+    def query(self, signature, size, exclude_repo=None, threshold=SIMILARITY_THRESHOLD):
+        matches = []
+        if not size:
+            return matches
+        for key in self.candidates(signature):
+            # Other commits of the same repository are not evidence of copying.
+            if exclude_repo and key.split("@")[0] == exclude_repo:
+                continue
+            jaccard = float(np.mean(self.signatures[key] == signature))
+            meta = self.metadata[key]
+            other_size = meta.get("shingles", 0)
+            # |A ∩ B| from the Jaccard estimate and both set sizes, then as a share of A.
+            shared = jaccard * (size + other_size) / (1 + jaccard) if jaccard else 0
+            overlap = min(1.0, shared / size) if size else 0.0
+            # Every template overlap is reported; it is what the boilerplate question needs.
+            if jaccard >= threshold or (meta.get("kind") == "template" and overlap >= 0.01):
+                matches.append({
+                    "key": key,
+                    "repo_url": meta.get("repo_url"),
+                    "kind": meta.get("kind"),
+                    "jaccard": round(jaccard, 3),
+                    "overlap_percent": round(overlap * 100, 1),
+                })
+        return sorted(matches, key=lambda m: m["jaccard"], reverse=True)
+
+    def state(self):
+        """A copy of what save() writes; take it on the event loop, where the index is mutated."""
+        return {
+            "version": INDEX_VERSION,
+            "signatures": dict(self.signatures),
+            "metadata": {key: dict(meta) for key, meta in self.metadata.items()},
+        }
+
+    def save(self, path=SIMILARITY_INDEX_PATH, state=None):
+        state = state or self.state()
+        # A temp file of its own per save, so concurrent saves never write the same file.
+        fd, tmp = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", dir=os.path.dirname(os.path.abspath(path))
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(state, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path=SIMILARITY_INDEX_PATH):
+        index = cls()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != INDEX_VERSION:
+                print(f"Ignoring {path}: built with another source normalization; re-indexing")
+                return index
+            for key, meta in data["metadata"].items():
+                # Older indexes stored an all-max signature for repositories without source.
+                signature = data["signatures"].get(key) if meta.get("shingles") else None
+                index.add(key, signature, **meta)
+        return index
+
+
+similarity_index = SimilarityIndex.load()
+_templates_indexed = False
+_save_lock = asyncio.Lock()
+_index_slots = asyncio.Semaphore(SIMILARITY_INDEX_CONCURRENCY)
+_indexing = {}
+_background = set()
+_dirty = False
+_saver = None
+
+
+async def save_index():
+    """Writes the index if it changed since the last save."""
+    global _dirty
+    # Saves run one at a time, each writing the state as of when it started.
+    async with _save_lock:
+        if not _dirty:
+            return
+        _dirty = False
+        state = similarity_index.state()
+        try:
+            await asyncio.to_thread(similarity_index.save, SIMILARITY_INDEX_PATH, state)
+        except BaseException:
+            _dirty = True
+            raise
+
+
+async def _save_later():
+    while _dirty:
+        await asyncio.sleep(SIMILARITY_SAVE_DELAY_SECONDS)
+        try:
+            await save_index()
+        except Exception as e:
+            print(f"Error saving the similarity index: {e}")
+
+
+def _schedule_save():
+    # Pickling the whole index is O(n); one save per delay instead of one per new repo.
+    global _dirty, _saver
+    _dirty = True
+    if _saver is None or _saver.done():
+        _saver = asyncio.create_task(_save_later())
+
+
+async def close_index():
+    """Writes pending changes; called at shutdown."""
+    if _saver is not None:
+        _saver.cancel()
+    await save_index()
+
+
+async def _index_snapshot(snapshot, repo_url, kind):
+    hashes = await asyncio.to_thread(repo_shingles, snapshot)
+    # An empty set would give an all-max signature that "matches" every other empty repo.
+    signature = await asyncio.to_thread(minhash, hashes) if hashes else None
+    similarity_index.add(
+        snapshot.key, signature, repo_url=repo_url, kind=kind, shingles=len(hashes)
+    )
+    _schedule_save()
+
+
+async def index_repo(repo_url, token, kind="submission", ref=None):
+    snapshot = await get_snapshot(repo_url, token, ref)
+    if snapshot.key not in similarity_index.metadata:
+        # Concurrent checks of one submission (one per prize) shingle it once.
+        task = _indexing.get(snapshot.key)
+        if task is None:
+            task = asyncio.ensure_future(_index_snapshot(snapshot, repo_url, kind))
+            _indexing[snapshot.key] = task
+            task.add_done_callback(lambda _: _indexing.pop(snapshot.key, None))
+        await asyncio.shield(task)
+    elif kind == "template":
+        similarity_index.add(snapshot.key, None, kind="template")
+    return snapshot
+
+
+async def index_submission(repo_url, token, ref=None):
+    """Adds a judged or prefetched submission to the index; a failure only loses evidence."""
+    if not repo_url or parse_repo_url(repo_url) is None:
+        return
+    async with _index_slots:
+        try:
+            await index_repo(repo_url, token, ref=ref)
+        except Exception as e:
+            print(f"Could not index {repo_url} for similarity: {e}")
+
+
+def index_in_background(repo_url, token, ref=None):
+    """Schedules index_submission without waiting for it, for the judging paths."""
+    task = asyncio.create_task(index_submission(repo_url, token, ref))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def index_templates(token):
+    global _templates_indexed
+    if _templates_indexed:
+        return
+    for url in SIMILARITY_TEMPLATE_REPOS:
+        try:
+            await index_repo(url, token, kind="template")
+        except Exception as e:
+            print(f"Could not index template {url}: {e}")
+    _templates_indexed = True
+
+
+async def originality_evidence(repo_url, token):
+    """Near-duplicate submissions and template overlap for one repository."""
+    await index_templates(token)
+    snapshot = await index_repo(repo_url, token)
+    signature = similarity_index.signatures.get(snapshot.key)
+    if signature is None:
+        return {
+            "commit": snapshot.sha,
+            "status": "insufficient_content",
+            "detail": "No source files with enough code to compare against other submissions.",
+            "indexed_repositories": len(similarity_index.signatures),
+            "near_duplicate_submissions": [],
+            "template_matches": [],
+            "max_template_overlap_percent": None,
+        }
+    size = similarity_index.metadata[snapshot.key]["shingles"]
+    matches = similarity_index.query(signature, size, exclude_repo=snapshot.key.split("@")[0])
+    templates = [m for m in matches if m["kind"] == "template"]
+    return {
+        "commit": snapshot.sha,
+        "status": "ok",
+        "indexed_repositories": len(similarity_index.signatures),
+        "near_duplicate_submissions": [m for m in matches if m["kind"] != "template"],
+        "template_matches": templates,
+        "max_template_overlap_percent": max((m["overlap_percent"] for m in templates), default=0.0),
+    }
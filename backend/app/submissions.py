@@ -0,0 +1,93 @@
+import codecs
+import csv
+import re
+
+# Column names in the Devpost submission export.
+COL_TITLE = "Project Title"
+COL_GITHUB = "Submission Url"
+COL_GEMINI_NUM = (
+    "If You Are Submitting To The Best Use Of Gemini Api Prize Category, "
+    "Please Provide Your Gemini Project Number."
+)
+COL_DOMAIN = (
+    "List All Of The Domain Names Your Team Has Registered With Go Daddy Registry "
+    "During This Hackathon."
+)
+
+REQUIRED_COLUMNS = [COL_GITHUB, COL_GEMINI_NUM, COL_DOMAIN]
+
+_DOMAIN_RE = re.compile(r'(https?://[^\s]+)|(www\.[^\s]+)|([a-zA-Z0-9-]+\.tech)')
+
+
+def missing_columns(columns):
+    return [c for c in REQUIRED_COLUMNS if c not in columns]
+
+
+def extract_domain(raw_domain):
+    # Extract first URL-like string
+    raw_domain = str(raw_domain or "").strip()
+    url_match = _DOMAIN_RE.search(raw_domain)
+    return url_match.group(0) if url_match else raw_domain
+
+
+def submission_fields(row):
+    """Keeps only the fields the prize checks need, dropping the long free-text columns."""
+    def value(column):
+        raw = row.get(column, "")
+        return "" if raw is None else str(raw).strip()
+
+    return {
+        "project_title": value(COL_TITLE) or "N/A",
+        "repo_url": value(COL_GITHUB),
+        "project_number": value(COL_GEMINI_NUM),
+        "project_url": extract_domain(value(COL_DOMAIN)),
+    }
+
+
+class CsvValidationError(ValueError):
+    pass
+
+
+class CsvRecordParser:
+    """Turns arbitrary byte chunks into parsed CSV records.
+
+    A record is only handed to the csv module once its quotes are balanced, so
+    quoted free-text fields that contain newlines can span chunk boundaries.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._pending = ""
+        self._record = []
+        self._quotes = 0
+
+    def _records_from(self, text, final=False):
+        # Only \n (and so \r\n) ends a line; str.splitlines() would also split on
+        # form feeds, \x1c-\x1e, \x85 and \u2028 inside unquoted free-text fields.
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        lines = [line + "\n" for line in lines]
+        if final and self._pending:
+            lines.append(self._pending)
+            self._pending = ""
+
+        for line in lines:
+            self._record.append(line)
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                record = "".join(self._record)
+                self._record, self._quotes = [], 0
+                if record.strip():
+                    yield next(csv.reader([record]))
+
+        if final and self._record:
+            record = "".join(self._record)
+            self._record, self._quotes = [], 0
+            if record.strip():
+                yield next(csv.reader([record]))
+
+    def feed(self, chunk):
+        return list(self._records_from(self._decoder.decode(chunk)))
+
+    def close(self):
+        return list(self._records_from(self._decoder.decode(b"", final=True), final=True))
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+
+from .db import database_configured, get_pool, new_id
+
+# inline: the API process runs agents itself. queue: the API enqueues JudgingTask rows
+# and `python -m app.worker` processes run them.
+JUDGING_MODE = os.getenv("JUDGING_MODE", "inline").lower()
+# A leased task is reclaimed by another worker once its lease runs out without a heartbeat.
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "120"))
+WORKER_MAX_ATTEMPTS = int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))
+# How often the API checks the table for tasks it is waiting on.
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", "1"))
+# Longest a single check waits for a worker before the request fails.
+TASK_WAIT_TIMEOUT_SECONDS = float(os.getenv("TASK_WAIT_TIMEOUT_SECONDS", "900"))
+# Finished tasks are followed by "finishedSeq", drawn when the task finishes. A finish that
+# drew a lower value can still commit after a higher one is read, so followers keep
+# re-reading completions newer than this before moving their cursor past them.
+TASK_SETTLE_SECONDS = float(os.getenv("TASK_SETTLE_SECONDS", "30"))
+TASK_CHANNEL = "judging_tasks"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_COLUMNS = (
+    '"id", "finishedSeq", "prize", "rowNumber", "fields", "status", "result", "error"'
+)
+TASK_COLUMNS = [
+    "id", "eventId", "batchId", "submissionId", "rowNumber", "prize", "fields", "priority",
+]
+# "finishedSeq" is a bigserial; finishing a task draws it again from the column's sequence.
+NEXT_FINISHED_SEQ = """nextval(pg_get_serial_sequence('"JudgingTask"', 'finishedSeq'))"""
+
+
+def decode(value):
+    """Json columns come back from asyncpg as text."""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def queue_enabled():
+    return JUDGING_MODE == "queue" and database_configured()
+
+
+def task_record(
+    prize, fields, priority, event_id=None, batch_id=None, submission_id=None, row_number=None,
+):
+    return (
+        new_id(), event_id, batch_id, submission_id, row_number, prize, json.dumps(fields),
+        priority,
+    )
+
+
+async def enqueue_tasks(records):
+    """Inserts task records (see task_record) with COPY and wakes idle workers."""
+    if not records:
+        return
+    pool = await get_pool()
+    async with pool.acquire() as conn, conn.transaction():
+        await conn.copy_records_to_table("JudgingTask", records=records, columns=TASK_COLUMNS)
+        await conn.execute(f"NOTIFY {TASK_CHANNEL}")
+
+
+async def expire_tasks():
+    """Fails running tasks whose lease ran out after the last allowed attempt."""
+    pool = await get_pool()
+    return await pool.fetch(
+        'UPDATE "JudgingTask" SET "status" = $1, "error" = $2, "finishedAt" = now(),'
+        f' "finishedSeq" = {NEXT_FINISHED_SEQ}, "leaseOwner" = NULL '
+        'WHERE "status" = $3 AND "leaseExpiresAt" < now() AND "attempts" >= $4 RETURNING *',
+        FAILED, f"Lease expired {WORKER_MAX_ATTEMPTS} times; the worker running it likely crashed",
+        RUNNING, WORKER_MAX_ATTEMPTS,
+    )
+
+
+async def lease_tasks(worker_id, limit):
+    """Claims up to `limit` queued or lease-expired tasks, interactive ones first.
+
+    SKIP LOCKED lets any number of workers lease concurrently without waiting on
+    each other's rows or leasing the same task twice.
+    """
+    pool = await get_pool()
+    return await pool.fetch(
+        'WITH leased AS ('
+        '  SELECT "id" FROM "JudgingTask"'
+        '  WHERE "status" = $4 OR ("status" = $5 AND "leaseExpiresAt" < now() AND "attempts" < $6)'
+        '  ORDER BY ("priority" = \'interactive\') DESC, "createdAt"'
+        '  LIMIT $2 FOR UPDATE SKIP LOCKED'
+        ') '
+        'UPDATE "JudgingTask" t SET "status" = $5, "leaseOwner" = $1,'
+        '  "leaseExpiresAt" = now() + make_interval(secs => $3), "heartbeatAt" = now(),'
+        '  "attempts" = t."attempts" + 1, "startedAt" = COALESCE(t."startedAt", now()) '
+        'FROM leased WHERE t."id" = leased."id" RETURNING t.*',
+        worker_id, limit, WORKER_LEASE_SECONDS, QUEUED, RUNNING, WORKER_MAX_ATTEMPTS,
+    )
+
+
+async def heartbeat(worker_id, task_ids):
+    """Extends the leases this worker still holds; returns the ids it has lost."""
+    if not task_ids:
+        return set()
+    pool = await get_pool()
+    rows = await pool.fetch(
+        'UPDATE "JudgingTask" SET "leaseExpiresAt" = now() + make_interval(secs => $3),'
+        ' "heartbeatAt" = now() '
+        'WHERE "id" = ANY($2::text[]) AND "leaseOwner" = $1 AND "status" = $4 RETURNING "id"',
+        worker_id, list(task_ids), WORKER_LEASE_SECONDS, RUNNING,
+    )
+    return set(task_ids) - {row["id"] for row in rows}
+
+
+async def complete_task(task_id, worker_id, result, status=DONE, error=None):
+    """Stores the outcome; returns False if the lease was lost and another worker owns the
+    task."""
+    pool = await get_pool()
+    outcome = await pool.execute(
+        'UPDATE "JudgingTask" SET "status" = $3, "result" = $4, "error" = $5, "finishedAt" = now(),'
+        f' "finishedSeq" = {NEXT_FINISHED_SEQ}, "leaseOwner" = NULL, "leaseExpiresAt" = NULL '
+        'WHERE "id" = $1 AND "leaseOwner" = $2',
+        task_id, worker_id, status, json.dumps(result, default=str), error,
+    )
+    return outcome == "UPDATE 1"
+
+
+async def retry_task(task_id, worker_id, error):
+    pool = await get_pool()
+    await pool.execute(
+        'UPDATE "JudgingTask" SET "status" = $3, "error" = $4,'
+        ' "leaseOwner" = NULL, "leaseExpiresAt" = NULL '
+        'WHERE "id" = $1 AND "leaseOwner" = $2',
+        task_id, worker_id, QUEUED, error,
+    )
+
+
+async def release_tasks(worker_id):
+    """Puts this worker's running tasks back in the queue without counting the attempt."""
+    pool = await get_pool()
+    await pool.execute(
+        'UPDATE "JudgingTask" SET "status" = $2, "leaseOwner" = NULL, "leaseExpiresAt" = NULL,'
+        ' "attempts" = GREATEST("attempts" - 1, 0) '
+        'WHERE "leaseOwner" = $1 AND "status" = $3',
+        worker_id, QUEUED, RUNNING,
+    )
+
+
+async def cancel_tasks(batch_id):
+    """Cancels a batch's queued and running tasks. Clearing the lease makes the running
+    ones' heartbeats fail, so their workers stop them and cannot store a result."""
+    pool = await get_pool()
+    outcome = await pool.execute(
+        'UPDATE "JudgingTask" SET "status" = $2, "leaseOwner" = NULL, "leaseExpiresAt" = NULL '
+        'WHERE "batchId" = $1 AND "status" IN ($3, $4)',
+        batch_id, CANCELLED, QUEUED, RUNNING,
+    )
+    return int(outcome.split()[-1])
+
+
+async def finished_tasks(batch_id, after=0, skip=(), limit=500):
+    """Finished tasks of a batch with "finishedSeq" above `after`, lowest first, leaving out
+    the ids in `skip` (ones already read above the cursor)."""
+    pool = await get_pool()
+    return await pool.fetch(
+        f'SELECT {FINISHED_COLUMNS} FROM "JudgingTask" '
+        'WHERE "batchId" = $1 AND "finishedAt" IS NOT NULL AND "finishedSeq" > $2'
+        ' AND NOT ("id" = ANY($3::text[])) '
+        'ORDER BY "finishedSeq" LIMIT $4',
+        batch_id, after, list(skip), limit,
+    )
+
+
+class TaskWaiter:
+    """Lets API requests await tasks run by workers, with one polling query for all of them."""
+
+    def __init__(self):
+        self.waiting = {}
+        self._poller = None
+
+    async def submit(self, prize, fields, priority, timeout=TASK_WAIT_TIMEOUT_SECONDS):
+        """Enqueues one check and returns the stored {**row, "result": ...} once a worker
+        finishes it."""
+        record = task_record(prize, fields, priority)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[record[0]] = future
+        try:
+            await enqueue_tasks([record])
+            if self._poller is None or self._poller.done():
+                self._poller = asyncio.create_task(self._poll())
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No worker finished the {prize} check within {timeout:.0f}s")
+        finally:
+            self.waiting.pop(record[0], None)
+
+    async def _poll(self):
+        pool = await get_pool()
+        while self.waiting:
+            await asyncio.sleep(TASK_POLL_SECONDS)
+            try:
+                rows = await pool.fetch(
+                    'SELECT "id", "status", "result", "error" FROM "JudgingTask" '
+                    'WHERE "id" = ANY($1::text[]) AND "status" IN ($2, $3)',
+                    list(self.waiting), DONE, FAILED,
+                )
+            except Exception as e:
+                print(f"Error polling judging tasks: {e}")
+                continue
+            for row in rows:
+                future = self.waiting.get(row["id"])
+                if future is None or future.done():
+                    continue
+                stored = decode(row["result"])
+                # A failed task also stores its row with {"error": ...}; it is not a verdict.
+                if row["status"] == DONE and stored:
+                    future.set_result(stored)
+                else:
+                    future.set_exception(RuntimeError(row["error"] or "Judging task failed"))
+
+
+task_waiter = TaskWaiter()
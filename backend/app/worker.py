@@ -0,0 +1,164 @@
+"""Judging worker: `python -m app.worker`.
+
+Leases JudgingTask rows from Postgres, runs the prize agents and stores the
+verdicts. Run as many replicas as needed; the API only enqueues and serves results.
+"""
+import asyncio
+import os
+import signal
+import socket
+import uuid
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import asyncpg
+
+from agents import cassettes
+from agents.github import close_github_client
+from agents.scanner import shutdown_pool
+
+from .clients import close_http_client, get_http_client
+from .db import DATABASE_URL, close_pool, database_configured, record_check, result_writer
+from .prizes import PRIZES
+from .results import flatten_result
+from .runner import run_agent
+from .tasks import (
+    DONE, FAILED, TASK_CHANNEL, WORKER_LEASE_SECONDS, WORKER_MAX_ATTEMPTS,
+    complete_task, decode, expire_tasks, heartbeat, lease_tasks, release_tasks, retry_task,
+)
+
+# Tasks one worker runs at once; the in-process scheduler still applies underneath.
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))
+# Idle workers are woken by NOTIFY; polling only picks up leases that expired.
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "5"))
+# On SIGTERM, running tasks get this long to finish before they are handed back to the queue.
+WORKER_SHUTDOWN_GRACE_SECONDS = float(os.getenv("WORKER_SHUTDOWN_GRACE_SECONDS", "30"))
+
+
+class Worker:
+    def __init__(self, concurrency):
+        self.id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.running = {}
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+
+    def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+
+    async def _process(self, task):
+        prize_name = task["prize"]
+        prize = PRIZES[prize_name]
+        fields = decode(task["fields"])
+        try:
+            with cassettes.judging():
+                result = await run_agent(prize.agent, prize.build_prompt(fields), task["priority"])
+            status, error = DONE, None
+        except Exception as e:
+            if task["attempts"] < WORKER_MAX_ATTEMPTS:
+                print(f"Worker {self.id}: {prize_name} task {task['id']} failed, retrying: {e}")
+                await retry_task(task["id"], self.id, str(e))
+                return
+            print(f"Worker {self.id}: {prize_name} task {task['id']} failed: {e}")
+            result, status, error = {"error": str(e)}, FAILED, str(e)
+
+        row = flatten_result(
+            prize_name, result,
+            batch_id=task["batchId"], row_number=task["rowNumber"],
+            project_title=fields.get("project_title"),
+            submission_url=fields.get("repo_url") or fields.get("project_url"),
+        )
+        # Record the verdict only if this worker still held the lease, so a reclaimed task is
+        # stored once.
+        if not await complete_task(task["id"], self.id, {**row, "result": result}, status, error):
+            print(f"Worker {self.id}: lost the lease on task {task['id']}; discarding its result")
+            return
+        if task["submissionId"]:
+            result_writer.add_prize_check(task["eventId"], task["submissionId"], row, result)
+        else:
+            await record_check(prize_name, fields, result)
+
+    def _finished(self, task_id, job):
+        self.running.pop(task_id, None)
+        self.wakeup.set()
+        if not job.cancelled() and job.exception() is not None:
+            print(f"Worker {self.id}: error finishing task {task_id}: {job.exception()}")
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(WORKER_LEASE_SECONDS / 3)
+            try:
+                lost = await heartbeat(self.id, list(self.running))
+            except Exception as e:
+                print(f"Worker {self.id}: heartbeat failed: {e}")
+                continue
+            for task_id in lost:
+                job = self.running.get(task_id)
+                if job is not None:
+                    print(f"Worker {self.id}: lease on task {task_id} expired; cancelling it")
+                    job.cancel()
+
+    async def _lease(self):
+        await expire_tasks()
+        for task in await lease_tasks(self.id, self.concurrency - len(self.running)):
+            job = asyncio.create_task(self._process(task))
+            job.add_done_callback(lambda job, task_id=task["id"]: self._finished(task_id, job))
+            self.running[task["id"]] = job
+
+    async def run(self):
+        listener = await asyncpg.connect(DATABASE_URL)
+        await listener.add_listener(TASK_CHANNEL, lambda *args: self.wakeup.set())
+        heartbeater = asyncio.create_task(self._heartbeat())
+        print(f"Worker {self.id} started with concurrency {self.concurrency}")
+        try:
+            while not self.stopping:
+                self.wakeup.clear()
+                if len(self.running) < self.concurrency:
+                    try:
+                        await self._lease()
+                    except Exception as e:
+                        print(f"Worker {self.id}: error leasing tasks: {e}")
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), WORKER_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.running:
+                await asyncio.wait(
+                    list(self.running.values()), timeout=WORKER_SHUTDOWN_GRACE_SECONDS
+                )
+            jobs = list(self.running.values())
+            for job in jobs:
+                job.cancel()
+            # A cancelled job may still be writing its result; let it unwind before its lease is
+            # handed back, or it could complete a task another worker has already leased.
+            await asyncio.gather(*jobs, return_exceptions=True)
+            heartbeater.cancel()
+            await listener.close()
+            await release_tasks(self.id)
+            print(f"Worker {self.id} stopped")
+
+
+async def main():
+    if not database_configured():
+        raise SystemExit("DATABASE_URL must point at Postgres to run a worker")
+    get_http_client()
+    result_writer.start()
+    worker = Worker(WORKER_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        shutdown_pool()
+        await result_writer.stop()
+        await close_pool()
+        await close_github_client()
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,20 +1,51 @@
 import streamlit as st
 import pandas as pd
-import requests
 import json
-import re
+import requests
+from requests.adapters import HTTPAdapter
+from app.results import RESULT_COLUMNS
+from app.submissions import COL_GITHUB, COL_GEMINI_NUM, COL_DOMAIN
 
 # --- Configuration ---
 # API Base URL (Assumes you run FastAPI on localhost:8000)
 API_URL = "http://localhost:8000"
+# Size of the connection pool shared by the dashboard's API calls.
+MAX_PARALLEL_REQUESTS = 16
+# Rows of the upload shown (and parsed) in the dashboard; the backend parses the rest.
+PREVIEW_ROWS = 5
 
 st.set_page_config(page_title="MLH Sidekick", page_icon="🤖", layout="wide")
 st.title("MLH Sidekick 🤖")
 
+# Columns describing the submission itself; already present on every dashboard row.
+RESULT_CONTEXT_COLUMNS = {
+    "batch_id", "row_number", "project_title", "submission_url", "prize", "checked_at",
+}
+# Column prefix per prize where the prize name is not a valid prefix.
+PRIZE_PREFIXES = {".Tech": "DotTech"}
+RESULT_FIELD_COLUMNS = [c for c in RESULT_COLUMNS if c not in RESULT_CONTEXT_COLUMNS]
+
+def result_columns(prizes):
+    """The fixed dashboard columns for the selected prizes; add_rows needs the same set on
+    every row."""
+    return ["Project Title", "Submission Url"] + [
+        f"{PRIZE_PREFIXES.get(prize, prize)}_{name}"
+        for prize in prizes for name in RESULT_FIELD_COLUMNS
+    ]
+
 # --- Helper to call API ---
+@st.cache_resource
+def get_session():
+    # One pooled session per Streamlit server so calls reuse keep-alive connections.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_PARALLEL_REQUESTS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 def call_api(endpoint, payload):
     try:
-        response = requests.post(f"{API_URL}{endpoint}", json=payload)
+        response = get_session().post(f"{API_URL}{endpoint}", json=payload)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.ConnectionError:
@@ -22,6 +53,42 @@ def call_api(endpoint, payload):
     except Exception as e:
         return {"error": str(e)}
 
+def start_batch(uploaded_file, prizes, prefetch_id=None):
+    """Streams the upload to the backend, which starts judging rows as they arrive."""
+    uploaded_file.seek(0)
+    try:
+        response = get_session().post(
+            f"{API_URL}/api/batches",
+            params={"prizes": prizes, "prefetch": prefetch_id},
+            data=uploaded_file,
+            headers={"Content-Type": "text/csv"},
+        )
+    except requests.exceptions.ConnectionError:
+        return {"error": "Could not connect to backend API. Is it running?"}
+    if not response.ok:
+        try:
+            return {"error": response.json().get("detail", response.text)}
+        except ValueError:
+            return {"error": response.text}
+    return response.json()
+
+def cancel_batch(batch_id):
+    """Stops the backend judging the batch; runs as the Cancel button's callback."""
+    try:
+        get_session().post(f"{API_URL}/api/batches/{batch_id}/cancel").raise_for_status()
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not cancel batch {batch_id}: {e}")
+
+def stream_batch_results(batch_id):
+    """Yields each flattened check result as soon as the backend writes it."""
+    with get_session().get(
+        f"{API_URL}/api/batches/{batch_id}/results", params={"format": "jsonl"}, stream=True,
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
 # --- Sidebar Navigation ---
 page = st.sidebar.radio("Select View", ["Coaches", "Fellowship"])
 
@@ -35,14 +102,16 @@ if page == "Coaches":
     uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        # The backend parses the full upload; the dashboard only reads a preview and the repo
+        # column.
+        df = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
         st.write("### Preview Data")
-        st.dataframe(df.head())
+        st.dataframe(df)
 
         # --- Column Mapping ---
-        col_github = "Submission Url"
-        col_gemini_num = "If You Are Submitting To The Best Use Of Gemini Api Prize Category, Please Provide Your Gemini Project Number."
-        col_domain = "List All Of The Domain Names Your Team Has Registered With Go Daddy Registry During This Hackathon."
+        col_github = COL_GITHUB
+        col_gemini_num = COL_GEMINI_NUM
+        col_domain = COL_DOMAIN
         
         # Verify columns exist
         missing_cols = [c for c in [col_github, col_gemini_num, col_domain] if c not in df.columns]
@@ -51,6 +120,30 @@ if page == "Coaches":
         else:
             st.success("Required columns found!")
 
+            # Start fetching repositories while the coach reviews the preview and picks prizes.
+            if st.session_state.get("prefetch_file_id") != uploaded_file.file_id:
+                st.session_state.prefetch_file_id = uploaded_file.file_id
+                uploaded_file.seek(0)
+                urls = pd.read_csv(uploaded_file, usecols=[col_github])[col_github]
+                repo_urls = [str(url).strip() if pd.notna(url) else "" for url in urls]
+                st.session_state.prefetch = call_api("/api/prefetch", {"repo_urls": repo_urls})
+
+            prefetch = st.session_state.get("prefetch") or {}
+            if "error" in prefetch:
+                st.warning(f"Could not prefetch repositories: {prefetch['error']}")
+            elif prefetch.get("problems"):
+                st.warning(
+                    f"{len(prefetch['problems'])} submission(s) have an invalid, private or "
+                    "missing repository."
+                )
+                with st.expander("Repositories that need attention"):
+                    st.dataframe(pd.DataFrame(prefetch["problems"]))
+            elif prefetch:
+                st.caption(
+                    f"All {prefetch['repositories']} repositories resolved; "
+                    "fetching them in the background."
+                )
+
             # --- Prize Selection ---
             st.subheader("Select Prizes to Judge")
             prizes = st.multiselect(
@@ -59,62 +152,66 @@ if page == "Coaches":
                 default=["Gemini"]
             )
 
-            if st.button("Run Judges"):
-                results_data = []
+            if st.button("Run Judges") and prizes:
+                st.session_state.batch_id = None
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                status_text.text("Uploading submissions...")
+                batch = start_batch(uploaded_file, prizes, prefetch.get("id"))
+                if "error" in batch:
+                    st.error(batch["error"])
+                    st.stop()
 
-                for index, row in df.iterrows():
-                    status_text.text(f"Processing row {index + 1}/{len(df)}...")
-                    progress_bar.progress((index + 1) / len(df))
+                st.session_state.batch_id = batch["id"]
+                # Clicking Cancel reruns the script, which stops following the batch; the
+                # callback runs first and stops it on the backend. Results written so far
+                # stay downloadable.
+                st.button("Cancel Run", on_click=cancel_batch, args=(batch["id"],))
+                table = st.empty()
+                live_table = None
 
-                    # Basic info
-                    row_result = {
-                        "Project Title": row.get("Project Title", "N/A"),
-                        "Submission Url": row.get(col_github, "N/A")
-                    }
-                    
-                    repo_url = str(row.get(col_github, "")).strip()
-
-                    # 1. GEMINI
-                    if "Gemini" in prizes:
-                        project_num = str(row.get(col_gemini_num, "")).strip()
-                        payload = {"repo_url": repo_url, "project_number": project_num}
-                        data = call_api("/api/agents/check-gemini-prize", payload)
-                        row_result["Gemini_Result"] = json.dumps(data.get("result", data))
-
-                    # 2. .TECH
-                    if ".Tech" in prizes:
-                        raw_domain = str(row.get(col_domain, "")).strip()
-                        # Extract first URL-like string
-                        url_match = re.search(r'(https?://[^\s]+)|(www\.[^\s]+)|([a-zA-Z0-9-]+\.tech)', raw_domain)
-                        clean_url = url_match.group(0) if url_match else raw_domain
-                        
-                        payload = {"project_url": clean_url}
-                        data = call_api("/api/agents/check-dot-tech-prize", payload)
-                        row_result["DotTech_Result"] = json.dumps(data.get("result", data))
-
-                    # 3. MONGODB
-                    if "MongoDB" in prizes:
-                        payload = {"repo_url": repo_url}
-                        data = call_api("/api/agents/check-mongodb-prize", payload)
-                        row_result["MongoDB_Result"] = json.dumps(data.get("result", data))
-
-                    # 4. ELEVENLABS
-                    if "ElevenLabs" in prizes:
-                        payload = {"repo_url": repo_url}
-                        data = call_api("/api/agents/check-elevenlabs-prize", payload)
-                        row_result["ElevenLabs_Result"] = json.dumps(data.get("result", data))
-
-                    results_data.append(row_result)
+                pending_rows = {}
+                columns = result_columns(prizes)
+                total = batch["total_checks"]
+                try:
+                    for done_count, record in enumerate(stream_batch_results(batch["id"]), start=1):
+                        pending = pending_rows.setdefault(record["row_number"], {
+                            "result": {
+                                **dict.fromkeys(columns),
+                                "Project Title": record["project_title"],
+                                "Submission Url": record["submission_url"],
+                            },
+                            "remaining": len(prizes),
+                        })
+                        prefix = PRIZE_PREFIXES.get(record["prize"], record["prize"])
+                        # One typed column per result field instead of a JSON string per prize;
+                        # fields a prize does not report stay None so every row has every column.
+                        pending["result"].update(
+                            (f"{prefix}_{name}", record.get(name)) for name in RESULT_FIELD_COLUMNS
+                        )
+                        pending["remaining"] -= 1
+                        if pending["remaining"] == 0:
+                            row_result = pending_rows.pop(record["row_number"])["result"]
+                            if live_table is None:
+                                live_table = table.dataframe(
+                                    pd.DataFrame([row_result], columns=columns)
+                                )
+                            else:
+                                live_table.add_rows(pd.DataFrame([row_result], columns=columns))
+
+                        status_text.text(f"Completed {done_count}/{total} checks...")
+                        progress_bar.progress(min(done_count / total, 1.0))
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Lost the connection to batch {batch['id']}: {e}")
 
                 status_text.text("Processing Complete!")
-                
-                results_df = pd.DataFrame(results_data)
-                st.dataframe(results_df)
 
-                csv = results_df.to_csv(index=False).encode('utf-8')
-                st.download_button("Download Results CSV", csv, "judging_results.csv", "text/csv")
+            if st.session_state.get("batch_id"):
+                # The backend streams the CSV from its spool; the dashboard keeps no results.
+                st.link_button(
+                    "Download Results CSV",
+                    f"{API_URL}/api/batches/{st.session_state.batch_id}/results?format=csv",
+                )
 
 # ==========================================
 # FELLOWSHIP PAGE
@@ -0,0 +1,58 @@
+import pytest
+
+from app.submissions import CsvRecordParser
+
+UPLOAD = (
+    'Project Title,Submission Url,Notes\r\n'
+    'Alpha,https://github.com/a/alpha,"multi\r\nline, with a comma"\r\n'
+    'Beta,https://github.com/b/beta,"she said ""hi"""\r\n'
+    'Gamma,https://github.com/c/gamma,plain\r\n'
+).encode("utf-8")
+
+EXPECTED = [
+    ["Project Title", "Submission Url", "Notes"],
+    ["Alpha", "https://github.com/a/alpha", "multi\r\nline, with a comma"],
+    ["Beta", "https://github.com/b/beta", 'she said "hi"'],
+    ["Gamma", "https://github.com/c/gamma", "plain"],
+]
+
+
+def parse(chunks):
+    parser = CsvRecordParser()
+    records = []
+    for chunk in chunks:
+        records.extend(parser.feed(chunk))
+    return records + parser.close()
+
+
+def test_parses_a_whole_upload():
+    assert parse([UPLOAD]) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_records_survive_every_chunk_boundary(size):
+    chunks = [UPLOAD[i:i + size] for i in range(0, len(UPLOAD), size)]
+    assert parse(chunks) == EXPECTED
+
+
+def test_multibyte_characters_split_across_chunks():
+    upload = "Project Title\nCafé ☕\n".encode("utf-8")
+    chunks = [upload[i:i + 1] for i in range(len(upload))]
+    assert parse(chunks) == [["Project Title"], ["Café ☕"]]
+
+
+def test_only_newlines_end_a_record():
+    text = "Project Title,Notes\na\x0cb,c\x1cd\x1de\x1ef\x85g h\n"
+    assert parse([text.encode("utf-8")]) == [
+        ["Project Title", "Notes"],
+        ["a\x0cb", "c\x1cd\x1de\x1ef\x85g h"],
+    ]
+
+
+def test_byte_order_mark_and_missing_final_newline():
+    upload = "﻿Project Title,Notes\nAlpha,last".encode("utf-8")
+    assert parse([upload]) == [["Project Title", "Notes"], ["Alpha", "last"]]
+
+
+def test_blank_lines_are_skipped():
+    assert parse([b"Project Title\n\nAlpha\n\r\n"]) == [["Project Title"], ["Alpha"]]
@@ -0,0 +1,58 @@
+from agents import dependencies
+from agents.dependencies import DIRECT, TRANSITIVE, parse_manifests, parse_yarn_lock
+from agents.snapshots import SKIPPED_FILES_NAME, Snapshot
+
+YARN_BERRY_LOCK = """\
+# This file is generated by running "yarn install" inside your project.
+
+__metadata:
+  version: 6
+  cacheKey: 8
+
+"@google/generative-ai@npm:^0.21.0":
+  version: 0.21.0
+  resolution: "@google/generative-ai@npm:0.21.0"
+
+"mongodb@npm:^6.3.0, mongodb@npm:^6.5.0":
+  version: 6.5.0
+  resolution: "mongodb@npm:6.5.0"
+"""
+
+YARN_CLASSIC_LOCK = """\
+# yarn lockfile v1
+
+
+mongoose@^8.0.0:
+  version "8.1.0"
+  resolved "https://registry.yarnpkg.com/mongoose/-/mongoose-8.1.0.tgz"
+"""
+
+
+def test_yarn_berry_metadata_is_not_a_package():
+    deps = parse_yarn_lock(YARN_BERRY_LOCK, "yarn.lock")
+    assert [(d.package, d.version) for d in deps] == [
+        ("@google/generative-ai", "0.21.0"), ("mongodb", "6.5.0"),
+    ]
+    assert all(d.scope == TRANSITIVE for d in deps)
+
+
+def test_yarn_classic_lock():
+    deps = parse_yarn_lock(YARN_CLASSIC_LOCK, "yarn.lock")
+    assert [(d.package, d.version) for d in deps] == [("mongoose", "8.1.0")]
+
+
+def test_oversized_manifests_are_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(dependencies, "MAX_MANIFEST_BYTES", 64)
+    (tmp_path / "package.json").write_text('{"dependencies": {"mongodb": "^6.0.0"}}')
+    (tmp_path / "requirements.txt").write_text("pymongo==4.6.0\n" * 10)
+    # Left out of the snapshot by SNAPSHOT_MAX_FILE_BYTES.
+    (tmp_path / SKIPPED_FILES_NAME).write_text(
+        '{"package-lock.json": 3000000, "data.csv": 9000000}'
+    )
+
+    deps, manifests, errors, skipped = parse_manifests(Snapshot("o", "r", "sha", str(tmp_path)))
+
+    assert [(d.package, d.scope) for d in deps] == [("mongodb", DIRECT)]
+    assert manifests == ["package.json"]
+    assert errors == {}
+    assert sorted(skipped) == ["package-lock.json", "requirements.txt"]
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agents import github
+from agents.github import GraphQLError, resolve_default_branches
+from agents.tool_cache import pin_ref
+
+SHA = "a" * 40
+
+
+def serve(monkeypatch, body):
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=body))
+    client = httpx.AsyncClient(base_url=github.GITHUB_API_URL, transport=transport)
+    monkeypatch.setattr(github, "github_client", lambda: client)
+
+
+def resolve(repos):
+    return asyncio.run(resolve_default_branches(repos, "token"))
+
+
+def test_missing_repositories_are_none_only_with_a_not_found_error(monkeypatch):
+    node = {"isPrivate": False, "defaultBranchRef": {"name": "main", "target": {"oid": SHA}}}
+    serve(monkeypatch, {
+        "data": {"r0": node, "r1": None},
+        "errors": [{"type": "NOT_FOUND", "path": ["r1"], "message": "Could not resolve"}],
+    })
+    resolved = resolve([("o", "found"), ("o", "gone")])
+    assert resolved[("o", "found")]["sha"] == SHA
+    assert resolved[("o", "gone")] is None
+
+
+@pytest.mark.parametrize("body", [
+    {"data": None, "errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]},
+    {"data": {"r0": None}, "errors": [{"type": "FORBIDDEN", "path": ["r0"], "message": "SAML"}]},
+    {"data": {"r0": None}},
+])
+def test_other_graphql_errors_fail_the_request(monkeypatch, body):
+    serve(monkeypatch, body)
+    with pytest.raises(GraphQLError):
+        resolve([("o", "r")])
+
+
+def test_ref_arguments_are_pinned_to_the_resolved_commit(monkeypatch):
+    async def resolve_ref(_owner, _repo, ref, _token):
+        return SHA if ref in (None, "main") else ref
+
+    monkeypatch.setattr("agents.tool_cache.resolve_ref", resolve_ref)
+    file_args = {"owner": "o", "repo": "r", "path": "a.py", "ref": "refs/heads/main"}
+    tree_args = {"owner": "o", "repo": "r"}
+    search_args = {"query": "repo:o/r"}
+    for tool, args in [
+        ("get_file_contents", file_args), ("get_repository_tree", tree_args),
+        ("search_code", search_args),
+    ]:
+        asyncio.run(pin_ref(tool, args, "token"))
+
+    assert file_args == {"owner": "o", "repo": "r", "path": "a.py", "sha": SHA}
+    assert tree_args["tree_sha"] == SHA
+    assert search_args == {"query": "repo:o/r"}
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app import limiter as limiter_module
+from app.limiter import (
+    ERROR, OK, THROTTLED, TIMEOUT, AdaptiveLimiter, classify_exception, classify_tool_result,
+)
+from app.scheduler import BULK, INTERACTIVE, PriorityScheduler
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(limiter_module, "AGENT_BACKOFF_COOLDOWN_SECONDS", 0)
+    scheduler = PriorityScheduler(8, 0.25, {INTERACTIVE: 4, BULK: 1})
+    return AdaptiveLimiter(scheduler, minimum=2, maximum=16, initial=8)
+
+
+def saturate(limiter):
+    limiter.target.in_use[BULK] = limiter.limit
+
+
+def test_grows_by_one_after_a_healthy_saturated_window(limiter):
+    saturate(limiter)
+    for _ in range(8):
+        limiter.record(1.0, OK)
+    assert limiter.limit == 9
+    assert limiter.target.capacity == 9
+
+
+def test_does_not_grow_without_demand(limiter):
+    for _ in range(32):
+        limiter.record(1.0, OK)
+    assert limiter.limit == 8
+
+
+def test_does_not_grow_when_latency_is_over_target(limiter, monkeypatch):
+    monkeypatch.setattr(limiter_module, "AGENT_LATENCY_TARGET_SECONDS", 10)
+    saturate(limiter)
+    for _ in range(16):
+        limiter.record(30.0, OK)
+    assert limiter.limit == 8
+
+
+@pytest.mark.parametrize("outcome", [THROTTLED, TIMEOUT])
+def test_halves_on_throttling_and_timeouts(limiter, outcome):
+    limiter.record(1.0, outcome)
+    assert limiter.limit == 4
+    limiter.record(1.0, outcome)
+    limiter.record(1.0, outcome)
+    assert limiter.limit == 2
+
+
+def test_backoff_cooldown(limiter, monkeypatch):
+    monkeypatch.setattr(limiter_module, "AGENT_BACKOFF_COOLDOWN_SECONDS", 60)
+    limiter.record(1.0, THROTTLED)
+    limiter.record(1.0, THROTTLED)
+    assert limiter.limit == 4
+
+
+def test_throttled_tool_call_backs_off_once(limiter):
+    limiter.record_throttled_tool("get_file_contents")
+    assert limiter.limit == 4
+    # The run that saw the throttled call is recorded without halving again.
+    limiter.record(1.0, THROTTLED, backed_off=True)
+    assert limiter.limit == 4
+
+
+@pytest.mark.parametrize("exc, outcome", [
+    (asyncio.TimeoutError(), TIMEOUT),
+    (RuntimeError("litellm.RateLimitError: 429 Too Many Requests"), THROTTLED),
+    (RuntimeError("Request timed out"), TIMEOUT),
+    (ValueError("bad"), ERROR),
+])
+def test_classify_exception(exc, outcome):
+    assert classify_exception(exc) == outcome
+
+
+def mcp_result(text, is_error=True):
+    return {"content": [{"type": "text", "text": text}], "isError": is_error}
+
+
+@pytest.mark.parametrize("response, outcome", [
+    (mcp_result("ok", is_error=False), OK),
+    (mcp_result("API rate limit exceeded for user"), THROTTLED),
+    (mcp_result("You have exceeded a secondary rate limit"), THROTTLED),
+    ({"error": "Client error '429 Too Many Requests' for url"}, THROTTLED),
+    (mcp_result("Not Found"), ERROR),
+    (mcp_result("line 429 of rate_limit.py", is_error=False), OK),
+    ("plain text", OK),
+])
+def test_classify_tool_result(response, outcome):
+    assert classify_tool_result(response) == outcome
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import asyncpg
+import pytest
+
+from app import db
+from app.db import ResultWriter
+
+
+@pytest.fixture
+def writer(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "DB_QUARANTINE_PATH", str(tmp_path / "quarantine.jsonl"))
+    writer = ResultWriter()
+    writer.enabled = True
+    writer.written = []
+    writer.down = False
+
+    async def copy(units):
+        if writer.down:
+            raise OSError("connection refused")
+        records = [r for unit in units for rs in unit.values() for r in rs]
+        if any("\x00" in str(field) for record in records for field in record):
+            raise asyncpg.CharacterNotInRepertoireError("invalid byte sequence")
+        written = {r[0] for r in writer.written + records}
+        checks = [r for unit in units for r in unit.get("PrizeCheck", [])]
+        if any(check[2] not in written for check in checks):
+            raise asyncpg.ForeignKeyViolationError("submission is not present")
+        writer.written.extend(records)
+
+    writer._copy = copy
+    return writer
+
+
+def add_rows(writer, titles):
+    for title in titles:
+        submission_id = writer.add_submission("event", {"project_title": title, "repo_url": "u"})
+        row = {"prize": "Gemini", "usage_evidence": "src/app.py line 4", "checked_at": 0}
+        writer.add_prize_check("event", submission_id, row, {"title": title})
+
+
+def quarantined():
+    with open(db.DB_QUARANTINE_PATH, encoding="utf-8") as lines:
+        return [json.loads(line) for line in lines]
+
+
+def test_bad_rows_are_quarantined_and_the_rest_written(writer):
+    add_rows(writer, ["a", "b", "bad\x00", "c", "d"])
+    asyncio.run(writer.flush())
+
+    assert writer._pending() == 0
+    titles = {r[4] for r in writer.written if len(r) == len(db.SUBMISSION_COLUMNS)}
+    assert titles == {"a", "b", "c", "d"}
+    # The check and evidence of the bad row are quarantined with it; the others are written.
+    entries = quarantined()
+    assert [list(e["rows"]) for e in entries] == [["Submission"], ["PrizeCheck", "Evidence"]]
+    assert entries[0]["rows"]["Submission"][0]["projectTitle"] == "bad\x00"
+    assert entries[0]["error"].startswith("CharacterNotInRepertoireError")
+
+
+def test_rows_stay_buffered_while_the_database_is_down(writer):
+    add_rows(writer, ["a", "b"])
+    writer.down = True
+    with pytest.raises(RuntimeError):
+        asyncio.run(writer.flush())
+    assert writer._pending() == 6
+
+    writer.down = False
+    asyncio.run(writer.flush())
+    assert writer._pending() == 0
+    assert len(writer.written) == 6
+
+
+def test_a_full_buffer_starts_one_flush_that_stop_waits_for(writer, monkeypatch):
+    monkeypatch.setattr(db, "DB_WRITE_BATCH_SIZE", 3)
+    copy = writer._copy
+
+    async def slow_copy(units):
+        await asyncio.sleep(0.05)
+        await copy(units)
+
+    writer._copy = slow_copy
+
+    async def scenario():
+        add_rows(writer, ["a"])
+        flushing = writer._size_flush
+        assert flushing is not None
+        add_rows(writer, ["b", "c"])
+        assert writer._size_flush is flushing
+        await writer.stop()
+        assert flushing.done()
+
+    asyncio.run(scenario())
+    assert writer._pending() == 0
+    assert len(writer.written) == 9
@@ -0,0 +1,22 @@
+import pytest
+
+from app.results import FilterError, parse_filters
+
+
+def test_filters_are_typed_by_column():
+    params = {
+        "prize": ["MongoDB"], "uses_atlas": ["True"], "http_status": ["200", "301"], "page": ["2"],
+    }
+    assert parse_filters(params) == {
+        "prize": "MongoDB", "uses_atlas": True, "http_status": [200, 301],
+    }
+
+
+@pytest.mark.parametrize("params", [
+    {"uses_atlas": ["maybe"]},
+    {"http_status": ["ok"]},
+    {"checked_at": ["yesterday"]},
+])
+def test_invalid_filter_values_are_rejected(params):
+    with pytest.raises(FilterError):
+        parse_filters(params)
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from agents.run_context import RunContext, payload_size, tool_response_size
+from app.runner import RELEASED_TOOL_RESPONSE, RunTranscript
+
+
+def event(role, *parts):
+    return SimpleNamespace(content=SimpleNamespace(role=role, parts=list(parts)), partial=False)
+
+
+def part(text=None, call=None, response=None):
+    return SimpleNamespace(text=text, function_call=call, function_response=response)
+
+
+def tool_turn(transcript, size):
+    args = {"owner": "o", "repo": "r", "path": "a.py"}
+    call = SimpleNamespace(name="get_file_contents", args=args)
+    response = SimpleNamespace(name="get_file_contents", response={"content": "y" * size})
+    transcript.consume(event("model", part(text="reading"), part(call=call)))
+    transcript.consume(event("user", part(response=response)))
+    return response
+
+
+def test_old_tool_responses_are_released_from_the_session_past_the_budget():
+    run = RunContext("agent", "prompt")
+    transcript = RunTranscript(run, session_budget=25_000)
+    responses = [tool_turn(transcript, 10_000) for _ in range(21)]
+
+    assert all(r.response == RELEASED_TOOL_RESPONSE for r in responses[:-2])
+    assert all(len(r.response["content"]) == 10_000 for r in responses[-2:])
+    assert transcript.released_tool_responses == 19
+    assert 20_000 < transcript.retained_bytes < 25_000
+    assert 30_000 < run.retained_payload_bytes < 35_000
+    assert run.retained_payload_bytes == transcript.peak_bytes
+
+
+def test_the_newest_response_is_kept_even_over_the_budget():
+    transcript = RunTranscript(RunContext("agent", "prompt"), session_budget=1_000)
+    first, second = tool_turn(transcript, 5_000), tool_turn(transcript, 5_000)
+    assert first.response == RELEASED_TOOL_RESPONSE
+    assert len(second.response["content"]) == 5_000
+
+
+def test_texts_leaving_the_ring_are_released():
+    transcript = RunTranscript(RunContext("agent", "prompt"))
+    for _ in range(transcript.texts.maxlen + 5):
+        transcript.consume(event("model", part(text="z" * 1_000)))
+    assert transcript.retained_bytes == transcript.texts.maxlen * 1_000
+    assert len(transcript.texts) == transcript.texts.maxlen
+
+
+def test_payload_size_counts_strings_without_serializing():
+    assert payload_size({"content": [{"text": "x" * 100}], "isError": False}) == 100 + 18 + 8
+    assert tool_response_size("call", {"text": "abc"}) == 7
@@ -0,0 +1,29 @@
+import re
+
+from agents import scanner
+from agents.scanner import scan_files
+
+
+def test_overlapping_signatures_are_all_reported(monkeypatch, tmp_path):
+    signatures = [("connection", rb"mongodb\+srv://\S+"), ("host", rb"cluster0\.\w+\.net")]
+    monkeypatch.setattr(scanner, "COMBINED_PATTERN", re.compile(rb"mongodb\+srv://\S+|cluster0"))
+    monkeypatch.setattr(
+        scanner, "SIGNATURE_PATTERNS", [(name, re.compile(p)) for name, p in signatures]
+    )
+    (tmp_path / "db.py").write_text('\n\nURI = "mongodb+srv://u:p@cluster0.abc.net/db"\n')
+
+    hits, counts, _, _, _ = scan_files(str(tmp_path), ["db.py"])
+    assert counts == {"connection": 1, "host": 1}
+    assert [hit["line"] for hit in hits["connection"] + hits["host"]] == [3, 3]
+
+
+def test_binary_and_missing_files_are_skipped_not_scanned(tmp_path):
+    (tmp_path / "app.js").write_text("import { GoogleGenAI } from '@google/genai';\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\0\0@google/genai")
+    hits, counts, scanned, files, skipped = scan_files(
+        str(tmp_path), ["app.js", "logo.png", "deleted.txt"]
+    )
+    assert (files, skipped) == (1, 2)
+    assert counts == {"gemini_js_sdk": 1}
+    assert hits["gemini_js_sdk"][0]["file"] == "app.js"
+    assert scanned == (tmp_path / "app.js").stat().st_size
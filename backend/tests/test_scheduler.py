@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import BULK, INTERACTIVE, PriorityScheduler
+
+
+def make_scheduler(capacity=8, reserved_fraction=0.25):
+    return PriorityScheduler(capacity, reserved_fraction, {INTERACTIVE: 4, BULK: 1})
+
+
+async def fill(scheduler, priority, count):
+    """Starts `count` acquires and returns the tasks that were admitted and those still queued."""
+    tasks = [asyncio.create_task(scheduler.acquire(priority)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return [t for t in tasks if t.done()], [t for t in tasks if not t.done()]
+
+
+def test_bulk_never_takes_the_interactive_reserve():
+    async def scenario():
+        scheduler = make_scheduler(capacity=8)
+        admitted, queued = await fill(scheduler, BULK, 10)
+        assert len(admitted) == 6 and len(queued) == 4
+        await scheduler.acquire(INTERACTIVE)
+        assert scheduler.in_use == {INTERACTIVE: 1, BULK: 6}
+        for task in queued:
+            task.cancel()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("capacity, bulk_slots", [(16, 12), (8, 6), (4, 3), (2, 1), (1, 1)])
+def test_reserve_scales_with_capacity(capacity, bulk_slots):
+    scheduler = make_scheduler(capacity=16)
+    scheduler.capacity = capacity
+    assert scheduler._bulk_limit() == bulk_slots
+
+
+def test_shrinking_capacity_keeps_bulk_share():
+    async def scenario():
+        scheduler = make_scheduler(capacity=16)
+        # An AIMD halving from 16 to 8 still leaves bulk three quarters of the slots.
+        scheduler.capacity = 8
+        admitted, queued = await fill(scheduler, BULK, 8)
+        assert len(admitted) == 6
+        for task in queued:
+            task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_freed_slots_follow_the_weights():
+    async def scenario():
+        scheduler = make_scheduler(capacity=5, reserved_fraction=0)
+        for _ in range(5):
+            await scheduler.acquire(BULK)
+        order = []
+
+        async def waiter(priority):
+            await scheduler.acquire(priority)
+            order.append(priority)
+
+        tasks = [asyncio.create_task(waiter(p)) for p in [BULK] * 5 + [INTERACTIVE] * 5]
+        await asyncio.sleep(0)
+        for _ in range(5):
+            scheduler.release(BULK)
+        await asyncio.sleep(0)
+        # Interactive has four times the weight of bulk.
+        assert order.count(INTERACTIVE) == 4 and order.count(BULK) == 1
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        scheduler = make_scheduler(capacity=1, reserved_fraction=0)
+        await scheduler.acquire(INTERACTIVE)
+        waiter = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert not scheduler.waiters[INTERACTIVE]
+        scheduler.release(INTERACTIVE)
+        assert scheduler.in_use[INTERACTIVE] == 0
+
+    asyncio.run(scenario())
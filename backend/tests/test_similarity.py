@@ -0,0 +1,36 @@
+import asyncio
+
+from app import similarity
+from app.similarity import normalize_source
+
+
+def test_comment_markers_inside_strings_are_kept_as_code():
+    tokens = normalize_source('url = "https://example.com"; color = "#fff"; size = 1\n', ".js")
+    assert tokens[-3:] == ["size", "=", "1"]
+
+
+def test_python_floor_division_is_code_and_hash_starts_a_comment():
+    assert normalize_source("half = n // 2  # don't\nnext", ".py") == [
+        "half", "=", "n", "/", "/", "2", "next",
+    ]
+
+
+def test_apostrophe_in_a_comment_does_not_open_a_string():
+    tokens = normalize_source("a(); // it's done\nb(); /* can't */ c('x');", ".js")
+    assert tokens == ["a", "(", ")", ";", "b", "(", ")", ";", "c", "(", '"', '"', ")", ";"]
+
+
+def test_new_entries_are_saved_once_after_the_delay(monkeypatch, tmp_path):
+    saves = []
+    monkeypatch.setattr(similarity, "SIMILARITY_INDEX_PATH", str(tmp_path / "index.pkl"))
+    monkeypatch.setattr(similarity, "SIMILARITY_SAVE_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(similarity.similarity_index, "save", lambda path, state: saves.append(path))
+
+    async def scenario():
+        for _ in range(5):
+            similarity._schedule_save()
+        await asyncio.sleep(0.05)
+        await similarity.close_index()
+
+    asyncio.run(scenario())
+    assert len(saves) == 1
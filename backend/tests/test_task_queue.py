@@ -0,0 +1,159 @@
+import asyncio
+import os
+
+import pytest
+
+from app import db, tasks
+from app.scheduler import BULK, INTERACTIVE
+from app.tasks import (
+    CANCELLED, DONE, FAILED, NEXT_FINISHED_SEQ, QUEUED, RUNNING, cancel_tasks, complete_task,
+    TaskWaiter, enqueue_tasks, expire_tasks, finished_tasks, heartbeat, lease_tasks, task_record,
+)
+
+# A throwaway database with the Prisma schema pushed; its JudgingTask table is emptied.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="set TEST_DATABASE_URL to run the task queue tests"
+)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_URL", TEST_DATABASE_URL)
+
+    def run(scenario):
+        async def wrapped():
+            await (await db.get_pool()).execute('DELETE FROM "JudgingTask"')
+            try:
+                return await scenario()
+            finally:
+                await db.close_pool()
+        return asyncio.run(wrapped())
+
+    return run
+
+
+def records(count, priority=BULK, batch_id="batch"):
+    return [
+        task_record("Gemini", {"row": i}, priority, batch_id=batch_id, row_number=i)
+        for i in range(count)
+    ]
+
+
+def test_concurrent_workers_never_lease_the_same_task(queue):
+    async def scenario():
+        pool = await db.get_pool()
+        await enqueue_tasks(records(40))
+        leased = await asyncio.gather(*(lease_tasks(f"worker-{i}", 10) for i in range(8)))
+        ids = [task["id"] for batch in leased for task in batch]
+        assert len(ids) == len(set(ids)) == 40
+        owners = await pool.fetch('SELECT "leaseOwner", "status" FROM "JudgingTask"')
+        assert all(row["status"] == RUNNING and row["leaseOwner"] for row in owners)
+
+    queue(scenario)
+
+
+def test_interactive_tasks_are_leased_first(queue):
+    async def scenario():
+        await enqueue_tasks(records(5))
+        await enqueue_tasks(records(2, INTERACTIVE))
+        leased = await lease_tasks("worker", 3)
+        assert [task["priority"] for task in leased].count(INTERACTIVE) == 2
+
+    queue(scenario)
+
+
+def test_expired_lease_is_reclaimed_and_the_old_worker_cannot_complete(queue):
+    async def scenario():
+        pool = await db.get_pool()
+        await enqueue_tasks(records(1))
+        [task] = await lease_tasks("crashed", 1)
+        await pool.execute('UPDATE "JudgingTask" SET "leaseExpiresAt" = now() - interval \'1 s\'')
+        [again] = await lease_tasks("healthy", 1)
+        assert again["id"] == task["id"] and again["attempts"] == 2
+        assert not await complete_task(task["id"], "crashed", {"verdict": "late"})
+        assert await complete_task(task["id"], "healthy", {"verdict": "ok"})
+
+    queue(scenario)
+
+
+def test_lease_expired_on_the_last_attempt_fails_the_task(queue):
+    async def scenario():
+        pool = await db.get_pool()
+        await enqueue_tasks(records(1))
+        await lease_tasks("crashed", 1)
+        await pool.execute(
+            'UPDATE "JudgingTask" SET "attempts" = $1, "leaseExpiresAt" = now() - interval \'1 s\'',
+            tasks.WORKER_MAX_ATTEMPTS,
+        )
+        assert await lease_tasks("healthy", 1) == []
+        [expired] = await expire_tasks()
+        assert expired["status"] == FAILED
+        [finished] = await finished_tasks("batch")
+        assert finished["id"] == expired["id"]
+
+    queue(scenario)
+
+
+def test_finish_that_commits_late_is_still_followed(queue):
+    async def scenario():
+        pool = await db.get_pool()
+        await enqueue_tasks(records(2))
+        first, second = await lease_tasks("worker", 2)
+        async with pool.acquire() as slow:
+            transaction = slow.transaction()
+            await transaction.start()
+            # The first finish draws its finishedSeq, then commits after the second one.
+            await slow.execute(
+                'UPDATE "JudgingTask" SET "status" = $2, "finishedAt" = now(),'
+                f' "finishedSeq" = {NEXT_FINISHED_SEQ} WHERE "id" = $1',
+                first["id"], DONE,
+            )
+            assert await complete_task(second["id"], "worker", {"verdict": "ok"})
+            [seen] = await finished_tasks("batch")
+            assert seen["id"] == second["id"]
+            await transaction.commit()
+
+        assert await finished_tasks("batch", seen["finishedSeq"]) == []
+        [late] = await finished_tasks("batch", 0, [seen["id"]])
+        assert late["id"] == first["id"] and late["finishedSeq"] < seen["finishedSeq"]
+        assert await pool.fetchval(
+            'SELECT count(*) FROM "JudgingTask" WHERE "status" = $1', QUEUED
+        ) == 0
+
+    queue(scenario)
+
+
+def test_cancelling_a_batch_stops_its_queued_and_running_tasks(queue):
+    async def scenario():
+        pool = await db.get_pool()
+        await enqueue_tasks(records(3))
+        await enqueue_tasks(records(1, batch_id="other"))
+        [running] = await lease_tasks("worker", 1)
+        assert await cancel_tasks("batch") == 3
+        assert await heartbeat("worker", [running["id"]]) == {running["id"]}
+        assert not await complete_task(running["id"], "worker", {"verdict": "late"})
+        assert [task["batchId"] for task in await lease_tasks("worker", 10)] == ["other"]
+        statuses = await pool.fetch(
+            'SELECT DISTINCT "status" FROM "JudgingTask" WHERE "batchId" = $1', "batch"
+        )
+        assert [row["status"] for row in statuses] == [CANCELLED]
+
+    queue(scenario)
+
+
+def test_waiter_raises_for_a_failed_task_that_stored_its_row(queue, monkeypatch):
+    monkeypatch.setattr(tasks, "TASK_POLL_SECONDS", 0.01)
+
+    async def scenario():
+        waiter = TaskWaiter()
+        submitted = asyncio.create_task(waiter.submit("Gemini", {"row": 0}, INTERACTIVE, 5))
+        while not (leased := await lease_tasks("worker", 1)):
+            await asyncio.sleep(0.01)
+        stored = {"result": {"error": "boom"}}
+        await complete_task(leased[0]["id"], "worker", stored, FAILED, "boom")
+        with pytest.raises(RuntimeError, match="boom"):
+            await submitted
+
+    queue(scenario)